@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, status
+
+from app.core.responses import FastJSONResponse
+from app.services.roster_cache import roster_cache
+from app.services.warmup import readiness
 
 router = APIRouter()
 
@@ -6,3 +10,29 @@ router = APIRouter()
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@router.get(
+    "/ready",
+    responses={
+        200: {"description": "Прогрев завершён, воркер принимает нагрузку"},
+        503: {"description": "Прогрев ещё идёт"},
+    },
+)
+async def ready():
+    """Готовность воркера: 503, пока не открыты соединения пула и не загружены кэши"""
+    if not readiness.ready:
+        return FastJSONResponse(
+            {"status": "warming_up"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    assert readiness.warmup_seconds is not None
+    return {"status": "ready", "warmup_ms": round(readiness.warmup_seconds * 1000, 2)}
+
+
+@router.get("/health/cache")
+async def cache_stats():
+    """
+    Счётчики кэша составов команд текущего процесса; попадания и промахи - обращения
+    переназначения ревьюверов, создание PR кэш не использует
+    """
+    return {"roster": roster_cache.stats()}
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.core.metrics import metrics_registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в формате Prometheus: процесса или, при нескольких воркерах, сумма по всем"""
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -1,23 +1,36 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from app.database.base import get_db
+from fastapi import APIRouter, Depends, Header, Response, status
+
+from app.core.responses import FastJSONResponse
+from app.repositories import Repository
+from app.repositories.dependencies import get_repository
+from app.schemas import serializers
 from app.schemas.error import ErrorResponse
 from app.schemas.pull_request import (
+    PR_BATCH_MAX_ITEMS,
     MergePRRequest,
     PullRequestCreate,
+    PullRequestCreateBatchRequest,
+    PullRequestCreateBatchResponse,
     PullRequestCreateResponse,
-    PullRequestCreateResponseItem,
+    PullRequestMergeBatchRequest,
+    PullRequestMergeBatchResponse,
     PullRequestMergeResponse,
-    PullRequestMergeResponseItem,
-    PullRequestReassignResponseItem,
     ReassignPRRequest,
     ReassignPRResponse,
 )
+from app.services.idempotency_service import IdempotencyService
 from app.services.pull_request_service import PullRequestService
 
 router = APIRouter()
 
+IDEMPOTENCY_KEY = Header(
+    None,
+    max_length=255,
+    description="Ключ повтора: ответ на первый запрос с ключом возвращается на повторы",
+)
+
 
 @router.post(
     "/pullRequest/create",
@@ -29,11 +42,42 @@ router = APIRouter()
         409: {"model": ErrorResponse, "description": "PR уже существует"},
     },
 )
-async def create_pr(pr_data: PullRequestCreate, db: Session = Depends(get_db)):
+async def create_pr(
+    pr_data: PullRequestCreate,
+    repo: Repository = Depends(get_repository),
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY,
+):
     """Создать PR и автоматически назначить ревьюверов из команды"""
-    pr = PullRequestService.create_pr(db, pr_data)
-    pr_response = PullRequestCreateResponseItem.model_validate(pr)
-    return PullRequestCreateResponse(pr=pr_response)
+
+    async def create() -> Response:
+        pr_response = await PullRequestService.create_pr(repo, pr_data)
+        return FastJSONResponse(
+            PullRequestCreateResponse.model_construct(pr=pr_response),
+            status_code=status.HTTP_201_CREATED,
+        )
+
+    return await IdempotencyService.execute(
+        repo, "/pullRequest/create", idempotency_key, pr_data, create
+    )
+
+
+@router.post(
+    "/pullRequest/createBatch",
+    response_model=PullRequestCreateBatchResponse,
+    responses={
+        200: {"description": "Результат создания по каждому PR пакета"},
+        422: {"description": f"Пустой пакет или больше {PR_BATCH_MAX_ITEMS} PR"},
+    },
+)
+async def create_pr_batch(
+    request: PullRequestCreateBatchRequest, repo: Repository = Depends(get_repository)
+):
+    """Создать пакет PR и назначить ревьюверов; ошибки возвращаются по каждому PR"""
+    results = await PullRequestService.create_batch(repo, request.items)
+    created = sum(1 for result in results if result.result == "CREATED")
+    return FastJSONResponse(
+        PullRequestCreateBatchResponse.model_construct(created=created, results=results)
+    )
 
 
 @router.post(
@@ -44,11 +88,38 @@ async def create_pr(pr_data: PullRequestCreate, db: Session = Depends(get_db)):
         404: {"model": ErrorResponse, "description": "PR не найден"},
     },
 )
-async def merge_pr(request: MergePRRequest, db: Session = Depends(get_db)):
+async def merge_pr(
+    request: MergePRRequest,
+    repo: Repository = Depends(get_repository),
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY,
+):
     """Пометить PR как MERGED"""
-    pr = PullRequestService.merge_pr(db, request.pull_request_id)
-    pr_response = PullRequestMergeResponseItem.model_validate(pr)
-    return PullRequestMergeResponse(pr=pr_response)
+
+    async def merge() -> Response:
+        pr = await PullRequestService.merge_pr(repo, request.pull_request_id)
+        return FastJSONResponse({"pr": serializers.merged_pull_request(pr)})
+
+    return await IdempotencyService.execute(
+        repo, "/pullRequest/merge", idempotency_key, request, merge
+    )
+
+
+@router.post(
+    "/pullRequest/mergeBatch",
+    response_model=PullRequestMergeBatchResponse,
+    responses={
+        200: {"description": "Найденные PR в состоянии MERGED и id ненайденных"},
+        422: {"description": f"Пустой пакет или больше {PR_BATCH_MAX_ITEMS} PR"},
+    },
+)
+async def merge_pr_batch(
+    request: PullRequestMergeBatchRequest, repo: Repository = Depends(get_repository)
+):
+    """Пометить пакет PR как MERGED; ненайденные PR перечисляются в not_found"""
+    prs, not_found = await PullRequestService.merge_batch(repo, request.pull_request_ids)
+    return FastJSONResponse(
+        {"prs": [serializers.merged_pull_request(pr) for pr in prs], "not_found": not_found}
+    )
 
 
 @router.post(
@@ -63,8 +134,19 @@ async def merge_pr(request: MergePRRequest, db: Session = Depends(get_db)):
         },
     },
 )
-async def reassign_reviewer(request: ReassignPRRequest, db: Session = Depends(get_db)):
+async def reassign_reviewer(
+    request: ReassignPRRequest,
+    repo: Repository = Depends(get_repository),
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY,
+):
     """Переназначить ревьювера на другого из его команды"""
-    pr, new_reviewer_id = PullRequestService.reassign_reviewer(db, request)
-    pr_response = PullRequestReassignResponseItem.model_validate(pr)
-    return ReassignPRResponse(pr=pr_response, replaced_by=new_reviewer_id)
+
+    async def reassign() -> Response:
+        pr, new_reviewer_id = await PullRequestService.reassign_reviewer(repo, request)
+        return FastJSONResponse(
+            {"pr": serializers.pull_request(pr), "replaced_by": new_reviewer_id}
+        )
+
+    return await IdempotencyService.execute(
+        repo, "/pullRequest/reassign", idempotency_key, request, reassign
+    )
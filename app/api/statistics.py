@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
 
-from app.database.base import get_db
-from app.schemas.statistics import StatisticsResponse
+from fastapi import APIRouter, Depends, Query
+
+from app.core.responses import FastJSONResponse
+from app.models.pull_request import PRStatus
+from app.repositories import Repository
+from app.repositories.dependencies import get_repository
+from app.schemas.statistics import StatisticsFilters, StatisticsResponse
 from app.services.statistics_service import StatisticsService
 
 router = APIRouter()
@@ -13,8 +18,27 @@ router = APIRouter()
     response_model=StatisticsResponse,
     summary="Получить статистику по PR и назначениям ревьюверов",
     description="Возвращает общую статистику по PR (total, OPEN, MERGED) "
-    "и статистику назначений ревьюверов по пользователям",
+    "и статистику назначений ревьюверов по пользователям; "
+    "фильтры ограничивают множество PR, limit - число самых загруженных ревьюверов",
 )
-async def get_statistics(db: Session = Depends(get_db)):
+async def get_statistics(
+    team_name: Optional[str] = Query(None, description="Команда автора PR"),
+    status: Optional[PRStatus] = Query(None, description="Статус PR"),
+    created_from: Optional[datetime] = Query(None, description="PR созданы не раньше"),
+    created_to: Optional[datetime] = Query(None, description="PR созданы раньше"),
+    merged_from: Optional[datetime] = Query(None, description="PR смержены не раньше"),
+    merged_to: Optional[datetime] = Query(None, description="PR смержены раньше"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Топ-N ревьюверов"),
+    repo: Repository = Depends(get_repository),
+):
     """Получить статистику"""
-    return StatisticsService.get_statistics(db)
+    filters = StatisticsFilters(
+        team_name=team_name,
+        status=status,
+        created_from=created_from,
+        created_to=created_to,
+        merged_from=merged_from,
+        merged_to=merged_to,
+        limit=limit,
+    )
+    return FastJSONResponse(await StatisticsService.get_statistics(repo, filters))
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, Query, status
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from app.database.base import get_db
+from fastapi import APIRouter, Depends, Header, Query, Request, status
+
+from app.core.etag import etag_matches, make_etag, not_modified
+from app.core.responses import FastJSONResponse
+from app.repositories import Repository
+from app.repositories.dependencies import get_repository
+from app.schemas import serializers
 from app.schemas.error import ErrorResponse
-from app.schemas.team import TeamCreate, TeamCreateResponse, TeamResponse
+from app.schemas.team import TeamCreate, TeamCreateResponse, TeamImportResponse, TeamResponse
 from app.services.team_service import TeamService
 
 router = APIRouter()
@@ -18,11 +23,35 @@ router = APIRouter()
         400: {"model": ErrorResponse, "description": "Команда уже существует"},
     },
 )
-async def create_team(team_data: TeamCreate, db: Session = Depends(get_db)):
+async def create_team(team_data: TeamCreate, repo: Repository = Depends(get_repository)):
     """Создать команду с участниками (создаёт/обновляет пользователей)"""
-    team = TeamService.create_team(db, team_data)
-    team_response = TeamResponse.model_validate(team)
-    return TeamCreateResponse(team=team_response)
+    members = await TeamService.create_team(repo, team_data)
+    return FastJSONResponse(
+        {"team": serializers.team(team_data.team_name, members)},
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+@router.post(
+    "/team/import",
+    response_model=TeamImportResponse,
+    responses={200: {"description": "Результат импорта по каждой строке"}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def import_teams(request: Request, repo: Repository = Depends(get_repository)):
+    """Импорт команд из NDJSON: одна команда на строку, тело читается потоком"""
+    results = await TeamService.import_teams(repo, request.stream())
+    valid = [result for result in results if result.result != "INVALID"]
+    return FastJSONResponse(
+        TeamImportResponse.model_construct(
+            teams=len(valid), users=sum(result.members for result in valid), results=results
+        )
+    )
 
 
 @router.get(
@@ -30,13 +59,21 @@ async def create_team(team_data: TeamCreate, db: Session = Depends(get_db)):
     response_model=TeamResponse,
     responses={
         200: {"description": "Объект команды"},
+        304: {"description": "Команда не изменилась (If-None-Match)"},
         404: {"model": ErrorResponse, "description": "Команда не найдена"},
     },
 )
 async def get_team(
     team_name: str = Query(..., description="Уникальное имя команды"),
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    repo: Repository = Depends(get_repository),
 ):
-    """Получить команду с участниками"""
-    team = TeamService.get_team(db, team_name)
-    return TeamResponse.model_validate(team)
+    """Получить команду с участниками; ETag - версия состава команды"""
+    # версия читается до данных: изменение между запросами даст лишний 200, но не 304
+    version = await TeamService.get_team_version(repo, team_name)
+    etag = make_etag("team", team_name, version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    members = await TeamService.get_members(repo, team_name)
+    return FastJSONResponse(serializers.team(team_name, members), headers={"ETag": etag})
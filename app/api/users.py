@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from app.database.base import get_db
+from fastapi import APIRouter, Depends, Header, Query
+
+from app.core.etag import etag_matches, make_etag, not_modified
+from app.core.responses import FastJSONResponse
+from app.models.pull_request import PRStatus
+from app.repositories import Repository
+from app.repositories.dependencies import get_repository
+from app.schemas import serializers
 from app.schemas.error import ErrorResponse
-from app.schemas.pull_request import PullRequestShort
 from app.schemas.user import (
+    USER_REVIEWS_DEFAULT_LIMIT,
+    USER_REVIEWS_MAX_LIMIT,
     BulkDeactivateRequest,
     BulkDeactivateResponse,
     SetIsActiveRequest,
-    UserResponse,
     UserReviewResponse,
     UserSetIsActiveResponse,
 )
@@ -25,14 +31,13 @@ router = APIRouter()
         404: {"model": ErrorResponse, "description": "Пользователь не найден"},
     },
 )
-async def set_is_active(request: SetIsActiveRequest, db: Session = Depends(get_db)):
+async def set_is_active(request: SetIsActiveRequest, repo: Repository = Depends(get_repository)):
     """
     Установить флаг активности пользователя
     (при деактивации автоматически переназначаются ревьюверы в открытых PR)
     """
-    user, reassigned_count = UserService.set_is_active(db, request)
-    user_response = UserResponse.model_validate(user)
-    return UserSetIsActiveResponse(user=user_response, reassigned_prs=reassigned_count)
+    user, reassigned_count = await UserService.set_is_active(repo, request)
+    return FastJSONResponse({"user": serializers.user(user), "reassigned_prs": reassigned_count})
 
 
 @router.get(
@@ -40,17 +45,48 @@ async def set_is_active(request: SetIsActiveRequest, db: Session = Depends(get_d
     response_model=UserReviewResponse,
     responses={
         200: {"description": "Список PR'ов пользователя"},
+        304: {"description": "Страница не изменилась (If-None-Match)"},
+        400: {"model": ErrorResponse, "description": "Некорректный курсор"},
         404: {"model": ErrorResponse, "description": "Пользователь не найден"},
     },
 )
 async def get_user_reviews(
     user_id: str = Query(..., description="Идентификатор пользователя"),
-    db: Session = Depends(get_db),
+    status: Optional[PRStatus] = Query(None, description="Статус PR"),
+    limit: int = Query(
+        USER_REVIEWS_DEFAULT_LIMIT, ge=1, le=USER_REVIEWS_MAX_LIMIT, description="Размер страницы"
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    if_none_match: Optional[str] = Header(None),
+    repo: Repository = Depends(get_repository),
 ):
-    """Получить PR'ы, где пользователь назначен ревьювером"""
-    prs = UserService.get_user_reviews(db, user_id)
-    pr_shorts = [PullRequestShort.model_validate(pr) for pr in prs]
-    return UserReviewResponse(user_id=user_id, pull_requests=pr_shorts)
+    """
+    Получить PR'ы, где пользователь назначен ревьювером, постранично от новых к старым;
+    ETag - версия PR пользователя как ревьювера и параметры страницы
+    """
+    # версия читается до данных: изменение между запросами даст лишний 200, но не 304;
+    # у пользователя без назначений версии нет, ответ без ETag
+    version = await UserService.get_reviews_version(repo, user_id)
+    etag = None
+    if version is not None:
+        etag = make_etag("reviews", user_id, version, status, limit, cursor)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    # строка reviewer_stats ссылается на пользователя: при известной версии он существует
+    prs, next_cursor = await UserService.get_user_reviews(
+        repo, user_id, status, limit, cursor, user_exists=version is not None
+    )
+    response = FastJSONResponse(
+        {
+            "user_id": user_id,
+            "pull_requests": [serializers.pull_request_short(pr) for pr in prs],
+            "next_cursor": next_cursor,
+        }
+    )
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return response
 
 
 @router.post(
@@ -64,11 +100,17 @@ async def get_user_reviews(
         },
     },
 )
-async def bulk_deactivate(request: BulkDeactivateRequest, db: Session = Depends(get_db)):
+async def bulk_deactivate(
+    request: BulkDeactivateRequest, repo: Repository = Depends(get_repository)
+):
     """
     Массовая деактивация пользователей команды.
     (автоматически переназначаются ревьюверы в открытых PR)
     """
-    users, reassigned_count = UserService.bulk_deactivate(db, request)
-    user_responses = [UserResponse.model_validate(user) for user in users]
-    return BulkDeactivateResponse(deactivated_users=user_responses, reassigned_prs=reassigned_count)
+    users, reassigned_count = await UserService.bulk_deactivate(repo, request)
+    return FastJSONResponse(
+        {
+            "deactivated_users": [serializers.user(user) for user in users],
+            "reassigned_prs": reassigned_count,
+        }
+    )
@@ -0,0 +1,29 @@
+"""
+Пересчёт счётчиков статистики с нуля:
+python -m app.commands.rebuild_statistics
+"""
+
+import asyncio
+
+from app.database.base import SessionLocal, engine
+from app.repositories.postgres import PostgresRepository
+from app.services.statistics_service import StatisticsService
+
+
+async def rebuild_statistics() -> None:
+    """Пересчитать счётчики и вывести итоговую статистику"""
+    async with SessionLocal() as db:
+        repo = PostgresRepository(db)
+        await StatisticsService.rebuild_counters(repo)
+        statistics = await StatisticsService.get_statistics(repo)
+    await engine.dispose()
+
+    pr_stats = statistics.pr_stats
+    print(
+        f"PR: total={pr_stats.total_prs} open={pr_stats.open_prs} merged={pr_stats.merged_prs}; "
+        f"reviewers: {len(statistics.user_review_stats)}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_statistics())
@@ -0,0 +1,66 @@
+"""
+Запуск сервиса в production:
+python -m app.commands.serve
+
+APP_WORKERS процессов uvicorn (по умолчанию - по числу ядер) с циклом событий uvloop
+и парсером HTTP httptools. Каждый воркер создаёт свой пул соединений с бд;
+при заданном DB_MAX_CONNECTIONS пул воркера урезается до своей доли (Settings).
+При нескольких воркерах метрики Prometheus пишутся в каталог PROMETHEUS_MULTIPROC_DIR
+(по умолчанию - временный), и /metrics любого воркера отдаёт сумму по всем.
+"""
+
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import uvicorn
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_metrics_dir() -> str:
+    """
+    Каталог метрик воркеров: PROMETHEUS_MULTIPROC_DIR или новый временный; файлы прошлого
+    запуска удаляются, иначе счётчики продолжились бы с их значений. Переменная окружения
+    задаётся до запуска воркеров, которые читают её при импорте prometheus_client
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="prometheus-")
+    Path(path).mkdir(parents=True, exist_ok=True)
+    for stale in Path(path).glob("*.db"):
+        stale.unlink()
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+def serve() -> None:
+    """Запустить воркеры uvicorn"""
+    if settings.STORAGE_BACKEND == "memory" and settings.workers > 1:
+        raise SystemExit(
+            "STORAGE_BACKEND=memory keeps data in the worker process, set APP_WORKERS=1"
+        )
+
+    # uvicorn настраивает только свои логгеры: сообщения приложения пишет корневой
+    logging.basicConfig(level=logging.INFO)
+    logger.info(
+        "workers=%d, DB pool per worker: %d + %d overflow",
+        settings.workers,
+        settings.DB_POOL_SIZE,
+        settings.DB_MAX_OVERFLOW,
+    )
+    if settings.workers > 1 or "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        logger.info("Prometheus multiprocess metrics in %s", prepare_metrics_dir())
+    uvicorn.run(
+        "app.main:app",
+        host=settings.APP_HOST,
+        port=settings.APP_PORT,
+        workers=settings.workers,
+        loop="uvloop",
+        http="httptools",
+    )
+
+
+if __name__ == "__main__":
+    serve()
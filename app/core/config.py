@@ -1,4 +1,5 @@
-from typing import ClassVar, Optional
+import os
+from typing import ClassVar, Literal, Optional
 
 from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -11,14 +12,58 @@ class Settings(BaseSettings):
 
     APP_HOST: str = "0.0.0.0"
     APP_PORT: int = 8080
+    # число воркеров python -m app.commands.serve; None - по числу доступных ядер
+    APP_WORKERS: Optional[int] = None
 
-    DB_POOL_SIZE: int = 20
-    DB_MAX_OVERFLOW: int = 40
+    # пул воркера: больше параллельных транзакций, чем ядер бд, не ускоряет запросы, а только
+    # удлиняет очереди блокировок на общих строках (tests_results.md)
+    DB_POOL_SIZE: int = 6
+    DB_MAX_OVERFLOW: int = 0
+    # общий лимит соединений с бд всех воркеров: пул воркера (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    # урезается до своей доли; None - без общего лимита. Одно соединение пула воркера занято
+    # подпиской на изменения составов команд (LISTEN)
+    DB_MAX_CONNECTIONS: Optional[int] = None
+    # создать таблицы при старте (create_all): схему в production создают миграции alembic,
+    # флаг - для запуска без них (разработка, бенчмарки)
+    DB_CREATE_SCHEMA: bool = False
+    # соединений пула, открываемых при старте воркера до готовности (/ready); 0 - не открывать
+    DB_WARMUP_CONNECTIONS: int = 5
     DB_POOL_PRE_PING: bool = True
     DB_POOL_RECYCLE: int = 3600
     DB_POOL_TIMEOUT: int = 30
+    # подготовленных на сервере запросов в кэше каждого соединения (LRU): повторный запрос
+    # выполняется без разбора и с планом, сохранённым сервером; 0 - без кэша, каждый запрос
+    # подготавливается заново
+    DB_STATEMENT_CACHE_SIZE: int = 256
     DB_ECHO: bool = False
 
+    # заголовки X-DB-Queries/X-DB-Time-Ms в ответах
+    DEBUG: bool = False
+    # запросы дольше порога пишутся в лог с параметрами; 0 - не писать
+    SLOW_QUERY_MS: float = 200.0
+    # число одинаковых запросов за HTTP запрос, с которого пишется предупреждение о N+1
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+    # кэш составов команд для переназначения ревьюверов, секунды; 0 - без кэша
+    ROSTER_CACHE_TTL: float = 30.0
+    # загрузить составы всех команд в кэш при старте воркера
+    ROSTER_CACHE_WARMUP: bool = True
+    TEAM_IMPORT_BATCH_SIZE: int = 5000
+    # строка импорта длиннее порога не разбирается и не хранится целиком (результат INVALID)
+    TEAM_IMPORT_MAX_LINE_BYTES: int = 1024 * 1024
+    REVIEWER_SELECTION_STRATEGY: Literal["random", "least_loaded", "round_robin"] = "random"
+    # попытки /pullRequest/reassign, если PR изменился между чтением и записью
+    PR_UPDATE_ATTEMPTS: int = 3
+    # ответы POST с заголовком Idempotency-Key хранятся в бд IDEMPOTENCY_TTL секунд
+    IDEMPOTENCY_TTL: int = 24 * 3600
+    # ключ занят на время обработки запроса, но не дольше (после падения воркера ключ освободится)
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+    # каждый N-й запрос воркера с ключом удаляет пачку истёкших ключей
+    IDEMPOTENCY_PURGE_EVERY: int = 100
+    IDEMPOTENCY_PURGE_BATCH: int = 1000
+    # хранилище данных: memory - в памяти процесса, без бд, только для одного воркера
+    STORAGE_BACKEND: Literal["postgres", "memory"] = "postgres"
+
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "pr_reviewer_db"
@@ -46,5 +91,30 @@ class Settings(BaseSettings):
 
         return self
 
+    @model_validator(mode="after")
+    def split_connection_budget(self) -> "Settings":
+        """Урезает пул соединений воркера до доли DB_MAX_CONNECTIONS"""
+        if self.DB_MAX_CONNECTIONS is None:
+            return self
+
+        share = self.DB_MAX_CONNECTIONS // self.workers
+        if share < 2:
+            raise ValueError(
+                f"DB_MAX_CONNECTIONS={self.DB_MAX_CONNECTIONS} leaves less than 2 connections "
+                f"per worker ({self.workers} workers)"
+            )
+        self.DB_POOL_SIZE = min(self.DB_POOL_SIZE, share)
+        self.DB_MAX_OVERFLOW = min(self.DB_MAX_OVERFLOW, share - self.DB_POOL_SIZE)
+        return self
+
+    @property
+    def workers(self) -> int:
+        """Число воркеров: APP_WORKERS или число ядер, доступных процессу"""
+        if self.APP_WORKERS:
+            return self.APP_WORKERS
+        if hasattr(os, "sched_getaffinity"):
+            return len(os.sched_getaffinity(0))
+        return os.cpu_count() or 1
+
 
 settings = Settings()
@@ -0,0 +1,26 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+
+def make_etag(*parts: object) -> str:
+    """Сильный ETag из версии данных и параметров запроса"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Совпадает ли ETag с одним из перечисленных в If-None-Match (слабое сравнение, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """Ответ 304 на условный GET с совпавшим ETag"""
+    return Response(status_code=304, headers={"ETag": etag})
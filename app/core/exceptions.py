@@ -4,13 +4,20 @@ from fastapi import HTTPException, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
+from app.core.responses import FastJSONResponse
 
-async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
-    """Кастомный обработчик HTTP исключений"""
+
+def error_response(exc: HTTPException) -> JSONResponse:
+    """Ответ на HTTP исключение: ошибки сервисов ({"error": ...}) - как есть"""
     detail: Any = exc.detail
     if isinstance(detail, dict) and "error" in detail:
-        return JSONResponse(status_code=exc.status_code, content=detail)
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+        return FastJSONResponse(status_code=exc.status_code, content=detail)
+    return FastJSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+
+async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
+    """Кастомный обработчик HTTP исключений"""
+    return error_response(exc)
 
 
 async def validation_exception_handler(
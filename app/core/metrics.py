@@ -0,0 +1,248 @@
+"""
+Метрики Prometheus: HTTP по маршрутам, пул соединений бд и время бд по методам сервисов.
+При нескольких воркерах (app.commands.serve) метрики пишутся в файлы каталога
+PROMETHEUS_MULTIPROC_DIR, и /metrics любого воркера отдаёт сумму по всем
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Awaitable, Callable, List, Optional, TypeVar
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, Pool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP запросы по маршруту и статусу", ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP запроса по маршруту",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Время получения соединения из пула (ожидание свободного или создание нового)",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Соединение не получено за DB_POOL_TIMEOUT (QueuePool limit)"
+)
+# состояние пулов: при нескольких воркерах - сумма по живым воркерам
+POOL_SIZE = Gauge("db_pool_size", "Размер пула (DB_POOL_SIZE)", multiprocess_mode="livesum")
+POOL_MAX_OVERFLOW = Gauge(
+    "db_pool_max_overflow",
+    "Допустимое число соединений сверх пула (DB_MAX_OVERFLOW)",
+    multiprocess_mode="livesum",
+)
+POOL_TIMEOUT = Gauge(
+    "db_pool_timeout_seconds",
+    "Таймаут ожидания соединения (DB_POOL_TIMEOUT)",
+    multiprocess_mode="livemax",
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Соединения, выданные из пула", multiprocess_mode="livesum"
+)
+POOL_CHECKED_IN = Gauge(
+    "db_pool_checked_in", "Свободные соединения в пуле", multiprocess_mode="livesum"
+)
+# отрицательно, пока пул не заполнен: -DB_POOL_SIZE + открытые соединения
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Соединения сверх размера пула", multiprocess_mode="livesum"
+)
+SERVICE_DB_DURATION = Histogram(
+    "service_db_duration_seconds",
+    "Время запросов к бд за один вызов метода сервиса",
+    ["method"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+SERVICE_DB_STATEMENTS = Counter(
+    "service_db_statements_total", "Запросы к бд в методах сервисов", ["method"]
+)
+
+IDEMPOTENT_REPLAYS = Counter(
+    "idempotent_replays_total", "Ответы из хранилища на повтор по Idempotency-Key", ["scope"]
+)
+WARMUP_DURATION = Gauge(
+    "app_warmup_seconds", "Время прогрева воркера при старте: соединения пула и кэши"
+)
+
+
+@dataclass
+class DBTime:
+    """Время и число запросов к бд в текущем вызове метода сервиса"""
+
+    seconds: float = 0.0
+    statements: int = 0
+
+
+_db_time: ContextVar[Optional[DBTime]] = ContextVar("db_time", default=None)
+
+# (текст запроса, параметры, время в секундах) после каждого запроса к бд
+StatementListener = Callable[[str, Any, float], None]
+_statement_listeners: List[StatementListener] = []
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def track_db_time(fn: F) -> F:
+    """
+    Учитывать время бд метода сервиса в service_db_duration_seconds;
+    время вложенных отслеживаемых вызовов входит и во внешний
+    """
+    method = fn.__qualname__
+
+    @wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        parent = _db_time.get()
+        current = DBTime()
+        token = _db_time.set(current)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            _db_time.reset(token)
+            SERVICE_DB_DURATION.labels(method).observe(current.seconds)
+            SERVICE_DB_STATEMENTS.labels(method).inc(current.statements)
+            if parent is not None:
+                parent.seconds += current.seconds
+                parent.statements += current.statements
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    current = _db_time.get()
+    if current is not None:
+        current.seconds += elapsed
+        current.statements += 1
+    for listener in _statement_listeners:
+        listener(statement, parameters, elapsed)
+
+
+def on_statement(listener: StatementListener) -> None:
+    """
+    Передавать listener каждый запрос к бд с его временем; замер общий
+    с service_db_duration_seconds, движки инструментирует instrument_engines
+    """
+    if listener not in _statement_listeners:
+        _statement_listeners.append(listener)
+
+
+def instrument_engines() -> None:
+    """
+    Замер запросов на всех движках (в том числе тестовых); асинхронный движок
+    выполняет запросы в greenlet с контекстом вызывающей корутины, поэтому
+    время попадает в вызов метода сервиса
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений с замером времени получения соединения и числа таймаутов;
+    состояние пула, отмеченного report_pool_state, обновляется при выдаче и возврате соединений
+    """
+
+    reports_state = False
+
+    def connect(self) -> Any:
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+        return connection
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        record = super()._do_get()
+        self._report_state()
+        return record
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        self._report_state()
+
+    def _report_state(self) -> None:
+        if self.reports_state:
+            POOL_CHECKED_OUT.set(self.checkedout())
+            POOL_CHECKED_IN.set(self.checkedin())
+            POOL_OVERFLOW.set(self.overflow())
+
+
+def report_pool_state(pool: Pool) -> None:
+    """Писать в метрики db_pool_* состояние пула движка приложения (один пул на процесс)"""
+    assert isinstance(pool, InstrumentedQueuePool)
+    pool.reports_state = True
+    POOL_SIZE.set(pool.size())
+    POOL_MAX_OVERFLOW.set(pool._max_overflow)
+    POOL_TIMEOUT.set(pool.timeout())
+    pool._report_state()
+
+
+def multiprocess_mode() -> bool:
+    """Метрики пишутся в файлы каталога PROMETHEUS_MULTIPROC_DIR (несколько воркеров)"""
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Реестр для /metrics: метрики процесса или сумма по файлам всех воркеров"""
+    if not multiprocess_mode():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_process_dead() -> None:
+    """При остановке воркера: его значения live-метрик больше не входят в сумму"""
+    if multiprocess_mode():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Время и статусы HTTP запросов по шаблону маршрута (/team/get, а не URL с параметрами);
+    запросы вне маршрутов приложения учитываются как route="unmatched"
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # маршрут записывается в scope при сопоставлении запроса с ним
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
@@ -0,0 +1,139 @@
+"""
+Учёт запросов к бд в рамках HTTP запроса: число и время запросов, медленные запросы
+с параметрами и повторы запросов одного вида (N+1)
+"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Iterator, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import instrument_engines, on_statement
+
+logger = logging.getLogger(__name__)
+
+# управление транзакцией (точки сохранения сессии в тестах) запросами не считается
+TRANSACTION_CONTROL = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+# длина текста параметров в логе медленных запросов: пакетные запросы передают массивы
+MAX_LOGGED_PARAMETERS = 1000
+
+_PLACEHOLDER = r"\$\d+(?:::\w+(?: WITH(?:OUT)? TIME ZONE)?(?:\[\])?)?"
+_PLACEHOLDER_LIST = re.compile(rf"{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    """
+    Вид запроса: текст без лишних пробелов, списки параметров IN (...)
+    разной длины сведены к одному "?"
+    """
+    return _PLACEHOLDER_LIST.sub("?", _WHITESPACE.sub(" ", statement).strip())
+
+
+@dataclass
+class QueryStats:
+    """Запросы к бд, выполненные в рамках одного HTTP запроса (или блока кода)"""
+
+    statements: int = 0
+    seconds: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+
+    def record(self, statement: str, seconds: float) -> None:
+        if statement.lstrip().startswith(TRANSACTION_CONTROL):
+            return
+        self.statements += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Виды запросов, выполненные не меньше threshold раз"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """Учитывать запросы к бд, выполненные в текущем контексте"""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _format_parameters(parameters: Any) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_LOGGED_PARAMETERS:
+        return f"{text[:MAX_LOGGED_PARAMETERS]}... ({len(text)} chars)"
+    return text
+
+
+def _record_statement(statement: str, parameters: Any, elapsed: float) -> None:
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            "slow query %.1f ms: %s; parameters: %s",
+            elapsed * 1000,
+            _WHITESPACE.sub(" ", statement).strip(),
+            _format_parameters(parameters),
+        )
+
+
+def instrument_queries() -> None:
+    """
+    Учёт запросов к бд в QueryStats текущего контекста и лог медленных запросов;
+    время берётся из замера запросов метрик (instrument_engines)
+    """
+    instrument_engines()
+    on_statement(_record_statement)
+
+
+class QueryStatsMiddleware:
+    """
+    Учёт запросов к бд по HTTP запросам: повторы запроса одного вида
+    не меньше N_PLUS_ONE_THRESHOLD раз пишутся в лог, в режиме DEBUG число
+    и время запросов возвращаются в заголовках X-DB-Queries и X-DB-Time-Ms
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_queries() as stats:
+
+            async def send_with_headers(message: Message) -> None:
+                if message["type"] == "http.response.start" and settings.DEBUG:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.statements)
+                    headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.2f}"
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                for shape, count in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+                    logger.warning(
+                        "possible N+1: %d identical queries in %s %s: %s",
+                        count,
+                        scope["method"],
+                        scope["path"],
+                        shape,
+                    )
@@ -0,0 +1,17 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON ответ без повторной валидации по response_model:
+    dict/list сериализуются orjson, модели pydantic - сериализатором pydantic-core
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json(by_alias=True).encode()
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
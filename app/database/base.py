@@ -1,39 +1,50 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
 from app.core.config import settings
+from app.core.metrics import InstrumentedQueuePool, instrument_engines, report_pool_state
+from app.core.query_stats import instrument_queries
+
+
+def async_url(url: str) -> URL:
+    """Переводит URL бд на асинхронный драйвер asyncpg"""
+    return make_url(url).set(drivername="postgresql+asyncpg")
 
 
 assert settings.DATABASE_URL is not None, "DATABASE_URL must be set"
-engine = create_engine(
-    settings.DATABASE_URL,
-    poolclass=QueuePool,
+engine = create_async_engine(
+    async_url(settings.DATABASE_URL),
+    poolclass=InstrumentedQueuePool,
     pool_size=settings.DB_POOL_SIZE,
     max_overflow=settings.DB_MAX_OVERFLOW,
     pool_pre_ping=settings.DB_POOL_PRE_PING,
     pool_recycle=settings.DB_POOL_RECYCLE,
     pool_timeout=settings.DB_POOL_TIMEOUT,
+    connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
     echo=settings.DB_ECHO,
 )
+instrument_engines()
+instrument_queries()
+report_pool_state(engine.pool)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
-def get_db():
-    """Получение сессии бд"""
+async def get_db():
+    """Получение асинхронной сессии бд"""
     db = SessionLocal()
     try:
         yield db
     except Exception:
         try:
-            db.rollback()
+            await db.rollback()
         except Exception:
             pass
         raise
     finally:
         try:
-            db.close()
+            await db.close()
         except Exception:
             pass
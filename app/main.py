@@ -1,18 +1,64 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.exceptions import RequestValidationError
+from sqlalchemy import text
 
-from app.api import health, pull_requests, statistics, teams, users
+from app.api import health, metrics, pull_requests, statistics, teams, users
+from app.core.config import settings
 from app.core.exceptions import http_exception_handler, validation_exception_handler
+from app.core.metrics import MetricsMiddleware, mark_process_dead
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.responses import FastJSONResponse
 from app.database.base import Base, engine
+from app.services.roster_cache import roster_cache
+from app.services.warmup import warming_up
+
+# ключ advisory lock создания таблиц: воркеры app.commands.serve стартуют одновременно
+SCHEMA_LOCK_KEY = 7_260_001
+
+
+async def create_schema() -> None:
+    """Создать таблицы бд (DB_CREATE_SCHEMA) под advisory lock"""
+    async with engine.begin() as connection:
+        await connection.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY}
+        )
+        await connection.run_sync(Base.metadata.create_all)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Создание таблиц бд при DB_CREATE_SCHEMA, подписка кэша составов команд на изменения
+    из других воркеров, прогрев в фоне до готовности (/ready); при остановке - закрытие пула
+    и исключение метрик воркера из суммы по воркерам
+    """
+    try:
+        if settings.STORAGE_BACKEND != "postgres":
+            async with warming_up(None):
+                yield
+            return
+        if settings.DB_CREATE_SCHEMA:
+            await create_schema()
+        async with roster_cache.listen(engine), warming_up(engine):
+            yield
+        await engine.dispose()
+    finally:
+        mark_process_dead()
+
 
-Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="PR Reviewer Assignment Service",
     version="1.0.0",
     description="Service for assigning reviewers to PRs",
     response_model_by_alias=True,
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.add_exception_handler(HTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 
@@ -21,6 +67,7 @@ app.include_router(users.router, tags=["Users"])
 app.include_router(pull_requests.router, tags=["PullRequests"])
 app.include_router(health.router, tags=["Health"])
 app.include_router(statistics.router, tags=["Statistics"])
+app.include_router(metrics.router, tags=["Health"])
 
 
 @app.get("/")
@@ -1,5 +1,17 @@
+from app.models.idempotency import IdempotencyKey
+from app.models.pr_reviewer import PRReviewer
 from app.models.pull_request import PRStatus, PullRequest
+from app.models.statistics import PRCounters, ReviewerStats
 from app.models.team import Team
 from app.models.user import User
 
-__all__ = ["Team", "User", "PullRequest", "PRStatus"]
+__all__ = [
+    "Team",
+    "User",
+    "PullRequest",
+    "PRStatus",
+    "PRReviewer",
+    "PRCounters",
+    "ReviewerStats",
+    "IdempotencyKey",
+]
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, LargeBinary, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Модель ключа идемпотентности POST запроса (заголовок Idempotency-Key);
+    status_code и response пусты, пока запрос обрабатывается. После expires_at ключ
+    можно занять заново, истёкшие строки удаляются пачками
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    # маршрут запроса: один ключ в разных маршрутах - разные запросы
+    scope: Mapped[str] = mapped_column(String, primary_key=True)
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    # sha256 тела запроса: повтор ключа с другим телом - ошибка клиента
+    fingerprint: Mapped[str] = mapped_column(String, nullable=False)
+    status_code: Mapped[Optional[int]] = mapped_column(SmallInteger, nullable=True)
+    response: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
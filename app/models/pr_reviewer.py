@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import DateTime
+from sqlalchemy import Enum as SQLEnum
+from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql import func
+
+from app.database.base import Base
+
+if TYPE_CHECKING:
+    from .pull_request import PullRequest
+
+
+class PRReviewer(Base):
+    """
+    Модель назначения ревьювера на PR;
+    pr_status и pr_created_at копируют статус и время создания PR для постраничной выдачи
+    PR ревьювера по индексу без соединения с pull_requests
+    """
+
+    __tablename__ = "pr_reviewers"
+    __table_args__ = (
+        Index("ix_pr_reviewers_reviewer_page", "reviewer_id", "pr_created_at", "pull_request_id"),
+        Index(
+            "ix_pr_reviewers_reviewer_status_page",
+            "reviewer_id",
+            "pr_status",
+            "pr_created_at",
+            "pull_request_id",
+        ),
+    )
+
+    pull_request_id: Mapped[str] = mapped_column(
+        String, ForeignKey("pull_requests.pull_request_id", ondelete="CASCADE"), primary_key=True
+    )
+    reviewer_id: Mapped[str] = mapped_column(
+        String,
+        ForeignKey("users.user_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    assigned_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    # тип prstatus общий с pull_requests.status; PRStatus здесь не импортируется из-за цикла модулей
+    pr_status: Mapped[str] = mapped_column(
+        SQLEnum("OPEN", "MERGED", name="prstatus"), nullable=False, server_default="OPEN"
+    )
+    pr_created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    pull_request: Mapped["PullRequest"] = relationship("PullRequest", back_populates="reviewers")
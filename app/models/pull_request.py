@@ -2,13 +2,15 @@ import enum
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import JSON, DateTime
+from sqlalchemy import BigInteger, DateTime
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, String, event
+from sqlalchemy.ext.associationproxy import AssociationProxy, association_proxy
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
 from app.database.base import Base
+from app.models.pr_reviewer import PRReviewer
 
 if TYPE_CHECKING:
     from .user import User
@@ -22,7 +24,11 @@ class PRStatus(str, enum.Enum):
 
 
 class PullRequest(Base):
-    """Модель PR"""
+    """
+    Модель PR;
+    version растёт при каждом изменении статуса или ревьюверов PR:
+    замена ревьювера записывается, только если версия не изменилась с момента чтения
+    """
 
     __tablename__ = "pull_requests"
 
@@ -34,12 +40,33 @@ class PullRequest(Base):
     status: Mapped[PRStatus] = mapped_column(
         SQLEnum(PRStatus), nullable=False, default=PRStatus.OPEN, index=True
     )
-    assigned_reviewers: Mapped[list[str]] = mapped_column(JSON, nullable=False, default=list)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
     )
-    merged_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    merged_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1, server_default="1")
 
     author: Mapped["User"] = relationship(
         "User", foreign_keys=[author_id], back_populates="authored_prs"
     )
+    reviewers: Mapped[list[PRReviewer]] = relationship(
+        PRReviewer,
+        back_populates="pull_request",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        order_by=[PRReviewer.assigned_at, PRReviewer.reviewer_id],
+    )
+    assigned_reviewers: AssociationProxy[list[str]] = association_proxy(
+        "reviewers", "reviewer_id", creator=lambda reviewer_id: PRReviewer(reviewer_id=reviewer_id)
+    )
+
+
+@event.listens_for(PullRequest.reviewers, "append")
+def _copy_pr_fields_to_reviewer(target: PullRequest, value: PRReviewer, initiator: object) -> None:
+    """Новое назначение получает статус и время создания своего PR"""
+    if target.status is not None:
+        value.pr_status = target.status
+    if target.created_at is not None:
+        value.pr_created_at = target.created_at
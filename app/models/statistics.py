@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+PR_COUNTER_SLOTS = 8
+
+
+class PRCounters(Base):
+    """
+    Модель счётчиков PR;
+    счётчики разбиты на слоты, чтобы параллельные create/merge
+    не ждали блокировку одной строки, итог - сумма по слотам
+    """
+
+    __tablename__ = "pr_counters"
+
+    slot: Mapped[int] = mapped_column(SmallInteger, primary_key=True, autoincrement=False)
+    total_prs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    open_prs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    merged_prs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ReviewerStats(Base):
+    """
+    Модель счётчиков пользователя как ревьювера: все назначения,
+    текущая нагрузка (назначения в открытых PR) и время последнего назначения;
+    reviews_version растёт при каждом изменении PR пользователя как ревьювера
+    (ETag /users/getReview): все такие изменения меняют и счётчики
+    """
+
+    __tablename__ = "reviewer_stats"
+
+    user_id: Mapped[str] = mapped_column(
+        String, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True
+    )
+    assignments_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, index=True)
+    open_reviews_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0", index=True
+    )
+    last_assigned_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    reviews_version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=1, server_default="1"
+    )
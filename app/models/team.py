@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String
+from sqlalchemy import BigInteger, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database.base import Base
@@ -10,11 +10,15 @@ if TYPE_CHECKING:
 
 
 class Team(Base):
-    """Модель команды"""
+    """
+    Модель команды;
+    version растёт при каждом изменении состава команды (ETag /team/get)
+    """
 
     __tablename__ = "teams"
 
     team_name: Mapped[str] = mapped_column(String, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1, server_default="1")
     members: Mapped[list["User"]] = relationship(
         "User", back_populates="team", cascade="all, delete-orphan"
     )
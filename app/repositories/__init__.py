@@ -0,0 +1,21 @@
+from app.repositories.base import (
+    IdempotencyKeyContended,
+    IdempotencyRecord,
+    PullRequestRecord,
+    Repository,
+    ReviewKey,
+    ReviewRecord,
+    TeamRoster,
+    UserRecord,
+)
+
+__all__ = [
+    "Repository",
+    "UserRecord",
+    "PullRequestRecord",
+    "ReviewRecord",
+    "ReviewKey",
+    "TeamRoster",
+    "IdempotencyRecord",
+    "IdempotencyKeyContended",
+]
@@ -0,0 +1,298 @@
+"""
+Интерфейс хранилища сервисов. Методы записи - отдельные транзакции: изменения
+и счётчики статистики применяются вместе или не применяются. Проверки доменных
+правил и ошибки HTTP остаются в сервисах.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Protocol, Sequence, Set, Tuple
+
+from app.models.pull_request import PRStatus
+from app.schemas.pull_request import PullRequestCreate, PullRequestCreateBatchResult
+from app.schemas.statistics import PRStats, StatisticsFilters, UserReviewStats
+from app.schemas.team import TeamCreate
+
+# ключ страницы PR ревьювера: (pr_created_at, pull_request_id) последнего PR прошлой страницы
+ReviewKey = Tuple[datetime, str]
+
+
+class UserRecord(Protocol):
+    """Пользователь: модель User или запись хранилища в памяти"""
+
+    @property
+    def user_id(self) -> str:
+        ...
+
+    @property
+    def username(self) -> str:
+        ...
+
+    @property
+    def team_name(self) -> str:
+        ...
+
+    @property
+    def is_active(self) -> bool:
+        ...
+
+
+class PullRequestRecord(Protocol):
+    """PR с ревьюверами в порядке назначения"""
+
+    @property
+    def pull_request_id(self) -> str:
+        ...
+
+    @property
+    def pull_request_name(self) -> str:
+        ...
+
+    @property
+    def author_id(self) -> str:
+        ...
+
+    @property
+    def status(self) -> PRStatus:
+        ...
+
+    @property
+    def merged_at(self) -> Optional[datetime]:
+        ...
+
+    @property
+    def assigned_reviewers(self) -> Sequence[str]:
+        ...
+
+    @property
+    def version(self) -> int:
+        ...
+
+
+class ReviewRecord(Protocol):
+    """PR страницы ревьювера с ключом пагинации"""
+
+    @property
+    def pull_request_id(self) -> str:
+        ...
+
+    @property
+    def pull_request_name(self) -> str:
+        ...
+
+    @property
+    def author_id(self) -> str:
+        ...
+
+    @property
+    def status(self) -> PRStatus:
+        ...
+
+    @property
+    def pr_created_at(self) -> datetime:
+        ...
+
+
+@dataclass(frozen=True)
+class TeamRoster:
+    """Состав команды: все участники и индекс активных участников"""
+
+    team_name: str
+    member_ids: FrozenSet[str]
+    active_member_ids: Tuple[str, ...]
+    loaded_at: float
+
+    def candidates(self, exclude: Iterable[str]) -> List[str]:
+        """Активные участники команды, кроме исключённых"""
+        excluded = set(exclude)
+        return [user_id for user_id in self.active_member_ids if user_id not in excluded]
+
+    @classmethod
+    def build(cls, team_name: str, members: Iterable[Tuple[str, bool]]) -> "TeamRoster":
+        """Состав из пар (user_id, is_active), упорядоченных по user_id"""
+        members = list(members)
+        return cls(
+            team_name=team_name,
+            member_ids=frozenset(user_id for user_id, _ in members),
+            active_member_ids=tuple(user_id for user_id, is_active in members if is_active),
+            loaded_at=time.monotonic(),
+        )
+
+
+class IdempotencyRecord(Protocol):
+    """Ключ идемпотентности: status_code и response пусты, пока запрос обрабатывается"""
+
+    @property
+    def fingerprint(self) -> str:
+        ...
+
+    @property
+    def status_code(self) -> Optional[int]:
+        ...
+
+    @property
+    def response(self) -> Optional[bytes]:
+        ...
+
+
+class IdempotencyKeyContended(Exception):
+    """Ключ не удалось ни занять, ни прочитать: конкурентные запросы занимают и освобождают его"""
+
+
+class Repository(ABC):
+    """Хранилище команд, пользователей, PR и счётчиков статистики"""
+
+    # команды
+
+    @abstractmethod
+    async def create_team(self, team: TeamCreate) -> Optional[List[UserRecord]]:
+        """
+        Создать команду и создать/обновить её участников;
+        возвращает участников или None, если команда уже есть
+        """
+
+    @abstractmethod
+    async def import_teams(self, teams: Sequence[TeamCreate]) -> Set[str]:
+        """
+        Записать пачку команд одной транзакцией: команды создаются при отсутствии,
+        участники создаются/обновляются; возвращает имена созданных команд
+        """
+
+    @abstractmethod
+    async def team_version(self, team_name: str) -> Optional[int]:
+        """Версия состава команды или None, если команды нет"""
+
+    @abstractmethod
+    async def team_members(self, team_name: str) -> List[UserRecord]:
+        """Участники команды"""
+
+    @abstractmethod
+    async def user_roster(self, user_id: str) -> Optional[TeamRoster]:
+        """Состав команды пользователя или None, если пользователь не найден"""
+
+    # пользователи
+
+    @abstractmethod
+    async def user_exists(self, user_id: str) -> bool:
+        """Есть ли пользователь"""
+
+    @abstractmethod
+    async def set_is_active(
+        self, user_id: str, is_active: bool
+    ) -> Optional[Tuple[UserRecord, int]]:
+        """
+        Установить флаг активности; при деактивации ревьюверы в открытых PR
+        переназначаются; возвращает (пользователь, число PR с заменами)
+        или None, если пользователя нет
+        """
+
+    @abstractmethod
+    async def deactivate_users(
+        self, team_name: str, user_ids: Sequence[str]
+    ) -> Tuple[List[UserRecord], int]:
+        """
+        Деактивировать пользователей команды с переназначением ревьюверов;
+        возвращает (найденные в команде пользователи, число PR с заменами);
+        если найдены не все user_ids, ничего не меняется
+        """
+
+    @abstractmethod
+    async def reviews_version(self, user_id: str) -> Optional[int]:
+        """Версия PR пользователя как ревьювера или None, если назначений не было"""
+
+    @abstractmethod
+    async def user_reviews(
+        self,
+        user_id: str,
+        status: Optional[PRStatus],
+        limit: int,
+        after: Optional[ReviewKey],
+    ) -> Sequence[ReviewRecord]:
+        """До limit PR, где пользователь ревьювер, от новых к старым, после ключа after"""
+
+    # PR
+
+    @abstractmethod
+    async def create_pr(self, pr_data: PullRequestCreate) -> PullRequestCreateBatchResult:
+        """Создать PR и назначить до 2 ревьюверов из команды автора"""
+
+    @abstractmethod
+    async def create_batch(
+        self, items: Sequence[PullRequestCreate]
+    ) -> List[PullRequestCreateBatchResult]:
+        """Создать пакет PR одной транзакцией; результат - по каждому элементу"""
+
+    @abstractmethod
+    async def get_pull_request(self, pull_request_id: str) -> Optional[PullRequestRecord]:
+        """PR с ревьюверами или None"""
+
+    @abstractmethod
+    async def merge_pr(self, pull_request_id: str) -> Optional[PullRequestRecord]:
+        """Пометить PR как MERGED (повторный merge ничего не меняет); None, если PR нет"""
+
+    @abstractmethod
+    async def merge_batch(self, pull_request_ids: Sequence[str]) -> Sequence[PullRequestRecord]:
+        """
+        Пометить пакет PR как MERGED одной транзакцией (уже смерженные не меняются);
+        найденные PR в любом порядке, каждый один раз
+        """
+
+    @abstractmethod
+    async def replace_reviewer(
+        self, pull_request_id: str, old_reviewer_id: str, new_reviewer_id: str, version: int
+    ) -> Optional[PullRequestRecord]:
+        """
+        Заменить ревьювера PR, если версия PR всё ещё равна version;
+        None, если PR изменился после чтения (ничего не меняется)
+        """
+
+    # состояние стратегий выбора ревьюверов
+
+    @abstractmethod
+    async def open_review_counts(self, user_ids: Sequence[str]) -> Dict[str, int]:
+        """Назначения в открытых PR по user_id (только пользователи с назначениями)"""
+
+    @abstractmethod
+    async def last_assigned_at(self, user_ids: Sequence[str]) -> Dict[str, float]:
+        """Время последнего назначения (unix time) по user_id"""
+
+    # статистика
+
+    @abstractmethod
+    async def statistics(self, filters: StatisticsFilters) -> Tuple[PRStats, List[UserReviewStats]]:
+        """
+        Статистика по PR и назначениям ревьюверов;
+        без фильтров по PR - из счётчиков, с фильтрами - по отобранным PR
+        """
+
+    @abstractmethod
+    async def rebuild_counters(self) -> None:
+        """Пересчитать счётчики статистики с нуля"""
+
+    # ключи идемпотентности
+
+    @abstractmethod
+    async def reserve_idempotency_key(
+        self, scope: str, key: str, fingerprint: str, lock_seconds: float
+    ) -> Optional[IdempotencyRecord]:
+        """
+        Занять ключ на время обработки запроса (не дольше lock_seconds);
+        None - ключ занят этим вызовом, иначе - не истёкший ключ, занятый раньше.
+        IdempotencyKeyContended - ключ меняется конкурентными запросами быстрее попыток
+        """
+
+    @abstractmethod
+    async def save_idempotent_response(
+        self, scope: str, key: str, status_code: int, response: bytes, ttl: float
+    ) -> None:
+        """Сохранить ответ на запрос с занятым ключом на ttl секунд"""
+
+    @abstractmethod
+    async def release_idempotency_key(self, scope: str, key: str) -> None:
+        """Освободить ключ без ответа: запрос завершился сбоем, и его можно повторить"""
+
+    @abstractmethod
+    async def purge_idempotency_keys(self, limit: int) -> int:
+        """Удалить до limit истёкших ключей; возвращает число удалённых"""
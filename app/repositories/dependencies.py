@@ -0,0 +1,26 @@
+"""Хранилище запроса по настройке STORAGE_BACKEND"""
+
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database.base import get_db
+from app.repositories.base import Repository
+from app.repositories.memory import MemoryRepository, memory_storage
+from app.repositories.postgres import PostgresRepository
+
+
+async def _postgres_repository(db: AsyncSession = Depends(get_db)) -> AsyncIterator[Repository]:
+    yield PostgresRepository(db)
+
+
+async def _memory_repository() -> Repository:
+    return MemoryRepository(memory_storage)
+
+
+if settings.STORAGE_BACKEND == "memory":
+    get_repository: Callable[..., Any] = _memory_repository
+else:
+    get_repository = _postgres_repository
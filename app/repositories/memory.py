@@ -0,0 +1,742 @@
+"""
+Хранилище в памяти процесса: словари записей и вторичные индексы - активные участники
+команд, PR ревьюверов по статусу, число PR по статусу.
+
+Методы не уступают управление циклу событий (await внутри вызывает только такие же
+методы), поэтому выполняются атомарно относительно других корутин; RLock защищает
+данные от других потоков (TestClient, бенчмарки). Данные не сохраняются между запусками
+и не разделяются между процессами - хранилище рассчитано на один воркер.
+"""
+
+import bisect
+import dataclasses
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Counter as CounterType
+from typing import (
+    DefaultDict,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from app.models.pull_request import PRStatus
+from app.repositories.base import Repository, ReviewKey, TeamRoster, UserRecord
+from app.schemas.pull_request import (
+    PullRequestCreate,
+    PullRequestCreateBatchResult,
+    PullRequestCreateResponseItem,
+)
+from app.schemas.statistics import PRStats, StatisticsFilters, UserReviewStats
+from app.schemas.team import TeamCreate
+from app.services.reviewer_selection import get_strategy, plan_batch, plan_reassignments
+
+
+@dataclass
+class MemoryUser:
+    """Пользователь"""
+
+    user_id: str
+    username: str
+    team_name: str
+    is_active: bool
+
+
+@dataclass
+class MemoryPullRequest:
+    """
+    PR; reviewers - время назначения по ревьюверу в порядке назначения,
+    version растёт при каждом изменении статуса или ревьюверов
+    """
+
+    pull_request_id: str
+    pull_request_name: str
+    author_id: str
+    status: PRStatus
+    created_at: datetime
+    merged_at: Optional[datetime] = None
+    reviewers: Dict[str, datetime] = field(default_factory=dict)
+    version: int = 1
+
+    @property
+    def assigned_reviewers(self) -> List[str]:
+        return list(self.reviewers)
+
+    @property
+    def key(self) -> ReviewKey:
+        """Ключ PR в индексе PR ревьюверов"""
+        return self.created_at, self.pull_request_id
+
+
+@dataclass
+class ReviewerCounters:
+    """Счётчики ревьювера, как в reviewer_stats"""
+
+    assignments_count: int = 0
+    open_reviews_count: int = 0
+    last_assigned_at: Optional[datetime] = None
+    reviews_version: int = 1
+
+
+@dataclass
+class MemoryIdempotencyKey:
+    """Ключ идемпотентности; expires_at - по time.monotonic()"""
+
+    fingerprint: str
+    expires_at: float
+    status_code: Optional[int] = None
+    response: Optional[bytes] = None
+
+
+class MemoryReview(NamedTuple):
+    """PR страницы ревьювера"""
+
+    pull_request_id: str
+    pull_request_name: str
+    author_id: str
+    status: PRStatus
+    pr_created_at: datetime
+
+
+class MemoryStorage:
+    """
+    Данные хранилища в памяти; изменяются только под lock.
+    reviews - ключи (created_at, pull_request_id) PR ревьювера по возрастанию,
+    отдельно для всех PR (статус None) и для каждого статуса
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.team_versions: Dict[str, int] = {}
+        self.users: Dict[str, MemoryUser] = {}
+        # участники команды в порядке добавления и активные участники по user_id
+        self.team_members: DefaultDict[str, Dict[str, None]] = defaultdict(dict)
+        self.active_members: DefaultDict[str, List[str]] = defaultdict(list)
+        self.pull_requests: Dict[str, MemoryPullRequest] = {}
+        self.reviews: DefaultDict[Tuple[str, Optional[PRStatus]], List[ReviewKey]] = defaultdict(
+            list
+        )
+        self.reviewer_stats: Dict[str, ReviewerCounters] = {}
+        self.status_counts: CounterType[PRStatus] = Counter()
+        self.idempotency_keys: Dict[Tuple[str, str], MemoryIdempotencyKey] = {}
+
+    def load(
+        self,
+        teams: Iterable[str],
+        users: Iterable[Tuple[str, str, str, bool]],
+        pull_requests: Iterable[Tuple[str, str, str, str, datetime, Optional[datetime]]],
+        reviewers: Iterable[Tuple[str, str, datetime]],
+    ) -> None:
+        """
+        Загрузить данные без проверок, например для бенчмарков: строки в порядке колонок
+        teams, users, pull_requests и pr_reviewers (pull_request_id, reviewer_id, assigned_at);
+        счётчики статистики пересчитываются
+        """
+        with self.lock:
+            for team_name in teams:
+                self.team_versions.setdefault(team_name, 1)
+            for user_id, username, team_name, is_active in users:
+                self.put_user(user_id, username, team_name, is_active)
+            for pr_id, name, author_id, status, created_at, merged_at in pull_requests:
+                self.pull_requests[pr_id] = MemoryPullRequest(
+                    pr_id, name, author_id, PRStatus(status), created_at, merged_at
+                )
+            for pr_id, reviewer_id, assigned_at in reviewers:
+                pr = self.pull_requests[pr_id]
+                pr.reviewers[reviewer_id] = assigned_at
+                self.add_review(reviewer_id, pr)
+            self.rebuild_counters()
+
+    # индексы
+
+    def put_user(
+        self, user_id: str, username: str, team_name: str, is_active: bool
+    ) -> Optional[str]:
+        """Создать/обновить пользователя; возвращает прежнюю команду существующего пользователя"""
+        user = self.users.get(user_id)
+        previous_team = None
+        if user is not None:
+            previous_team = user.team_name
+            self.set_active(user, False)
+            if user.team_name != team_name:
+                del self.team_members[user.team_name][user_id]
+            user.username, user.team_name = username, team_name
+        else:
+            user = self.users[user_id] = MemoryUser(user_id, username, team_name, False)
+        self.team_members[team_name][user_id] = None
+        self.set_active(user, is_active)
+        return previous_team
+
+    def set_active(self, user: MemoryUser, is_active: bool) -> None:
+        """Изменить флаг активности и индекс активных участников команды"""
+        if user.is_active == is_active:
+            return
+        active = self.active_members[user.team_name]
+        if is_active:
+            bisect.insort(active, user.user_id)
+        else:
+            del active[bisect.bisect_left(active, user.user_id)]
+        user.is_active = is_active
+
+    def bump_team_versions(self, team_names: Iterable[str]) -> None:
+        for team_name in set(team_names):
+            if team_name in self.team_versions:
+                self.team_versions[team_name] += 1
+
+    def add_review(self, reviewer_id: str, pr: MemoryPullRequest) -> None:
+        for status in (None, pr.status):
+            bisect.insort(self.reviews[reviewer_id, status], pr.key)
+
+    def remove_review(self, reviewer_id: str, pr: MemoryPullRequest) -> None:
+        for status in (None, pr.status):
+            keys = self.reviews[reviewer_id, status]
+            del keys[bisect.bisect_left(keys, pr.key)]
+
+    def counters(self, user_id: str) -> ReviewerCounters:
+        counters = self.reviewer_stats.get(user_id)
+        if counters is None:
+            counters = self.reviewer_stats[user_id] = ReviewerCounters()
+        return counters
+
+    def change_assignment_counts(self, deltas: Mapping[str, int], now: datetime) -> None:
+        """Изменить счётчики назначений и нагрузку ревьюверов, как upsert reviewer_stats"""
+        for user_id, delta in deltas.items():
+            if not delta:
+                continue
+            counters = self.reviewer_stats.get(user_id)
+            if counters is None:
+                self.reviewer_stats[user_id] = ReviewerCounters(
+                    delta, delta, now if delta > 0 else None
+                )
+                continue
+            counters.assignments_count += delta
+            counters.open_reviews_count += delta
+            if delta > 0:
+                counters.last_assigned_at = now
+            counters.reviews_version += 1
+
+    def change_open_review_counts(self, deltas: Mapping[str, int]) -> None:
+        """Изменить нагрузку ревьюверов, у которых уже есть счётчики"""
+        for user_id, delta in deltas.items():
+            counters = self.reviewer_stats.get(user_id)
+            if delta and counters is not None:
+                counters.open_reviews_count += delta
+                counters.reviews_version += 1
+
+    def rebuild_counters(self) -> None:
+        """Пересчитать счётчики по PR; версии ревьюверов растут, как в PostgreSQL"""
+        self.status_counts = Counter(pr.status for pr in self.pull_requests.values())
+        for counters in self.reviewer_stats.values():
+            counters.assignments_count = 0
+            counters.open_reviews_count = 0
+            counters.last_assigned_at = None
+            counters.reviews_version += 1
+        for pr in self.pull_requests.values():
+            for reviewer_id, assigned_at in pr.reviewers.items():
+                counters = self.counters(reviewer_id)
+                counters.assignments_count += 1
+                if pr.status == PRStatus.OPEN:
+                    counters.open_reviews_count += 1
+                if counters.last_assigned_at is None or assigned_at > counters.last_assigned_at:
+                    counters.last_assigned_at = assigned_at
+
+
+# общее хранилище приложения при STORAGE_BACKEND=memory
+memory_storage = MemoryStorage()
+
+
+def _snapshot_pr(pr: MemoryPullRequest) -> MemoryPullRequest:
+    """Копия PR: изменения хранилища после ответа не видны вызывающему"""
+    return dataclasses.replace(pr, reviewers=dict(pr.reviewers))
+
+
+class MemoryRepository(Repository):
+    """Хранилище в памяти; возвращает копии записей"""
+
+    def __init__(self, storage: MemoryStorage):
+        self.storage = storage
+
+    # команды
+
+    async def create_team(self, team: TeamCreate) -> Optional[List[UserRecord]]:
+        storage = self.storage
+        with storage.lock:
+            if team.team_name in storage.team_versions:
+                return None
+
+            storage.team_versions[team.team_name] = 1
+            members_by_id = {member.user_id: member for member in team.members}
+            previous_teams = set()
+            for user_id in sorted(members_by_id):
+                member = members_by_id[user_id]
+                previous_team = storage.put_user(
+                    user_id, member.username, team.team_name, member.is_active
+                )
+                if previous_team is not None:
+                    previous_teams.add(previous_team)
+            storage.bump_team_versions(previous_teams - {team.team_name})
+            return self._members(team.team_name)
+
+    async def import_teams(self, teams: Sequence[TeamCreate]) -> Set[str]:
+        storage = self.storage
+        with storage.lock:
+            team_names = {team.team_name for team in teams}
+            created_teams = team_names - storage.team_versions.keys()
+            for team_name in created_teams:
+                storage.team_versions[team_name] = 1
+
+            # пользователь из нескольких строк пачки попадает в команду из последней
+            members: Dict[str, Tuple[str, str, bool]] = {}
+            for team in teams:
+                for member in team.members:
+                    members[member.user_id] = (member.username, team.team_name, member.is_active)
+            previous_teams = set()
+            for user_id in sorted(members):
+                previous_team = storage.put_user(user_id, *members[user_id])
+                if previous_team is not None:
+                    previous_teams.add(previous_team)
+            storage.bump_team_versions(previous_teams | team_names)
+            return created_teams
+
+    async def team_version(self, team_name: str) -> Optional[int]:
+        with self.storage.lock:
+            return self.storage.team_versions.get(team_name)
+
+    async def team_members(self, team_name: str) -> List[UserRecord]:
+        with self.storage.lock:
+            return self._members(team_name)
+
+    def _members(self, team_name: str) -> List[UserRecord]:
+        users = self.storage.users
+        return [
+            dataclasses.replace(users[user_id])
+            for user_id in self.storage.team_members.get(team_name, {})
+        ]
+
+    async def user_roster(self, user_id: str) -> Optional[TeamRoster]:
+        storage = self.storage
+        with storage.lock:
+            user = storage.users.get(user_id)
+            if user is None:
+                return None
+            return TeamRoster(
+                team_name=user.team_name,
+                member_ids=frozenset(storage.team_members[user.team_name]),
+                active_member_ids=tuple(storage.active_members[user.team_name]),
+                loaded_at=time.monotonic(),
+            )
+
+    # пользователи
+
+    async def user_exists(self, user_id: str) -> bool:
+        with self.storage.lock:
+            return user_id in self.storage.users
+
+    async def set_is_active(
+        self, user_id: str, is_active: bool
+    ) -> Optional[Tuple[MemoryUser, int]]:
+        storage = self.storage
+        with storage.lock:
+            user = storage.users.get(user_id)
+            if user is None:
+                return None
+            # состав команды не меняется: версия команды и кэш составов остаются прежними
+            if user.is_active == is_active:
+                return dataclasses.replace(user), 0
+
+            reassigned_count = 0
+            if not is_active:
+                reassigned_count = await self._reassign_reviewers([user_id])
+            storage.set_active(user, is_active)
+            storage.bump_team_versions([user.team_name])
+            return dataclasses.replace(user), reassigned_count
+
+    async def deactivate_users(
+        self, team_name: str, user_ids: Sequence[str]
+    ) -> Tuple[List[UserRecord], int]:
+        storage = self.storage
+        with storage.lock:
+            users = [
+                user
+                for user in map(storage.users.get, dict.fromkeys(user_ids))
+                if user is not None and user.team_name == team_name
+            ]
+            if len(users) != len(user_ids):
+                return [dataclasses.replace(user) for user in users], 0
+
+            active_user_ids = [user.user_id for user in users if user.is_active]
+            # все уже неактивны: состав команды не меняется
+            if not active_user_ids:
+                return [dataclasses.replace(user) for user in users], 0
+            reassigned_count = await self._reassign_reviewers(active_user_ids)
+            for user in users:
+                storage.set_active(user, False)
+            storage.bump_team_versions([team_name])
+            return [dataclasses.replace(user) for user in users], reassigned_count
+
+    async def _reassign_reviewers(self, user_ids: List[str]) -> int:
+        """
+        Переназначить ревьюверов в открытых PR пользователей user_ids;
+        возвращает количество PR, где были переназначены ревьюверы
+        """
+        storage = self.storage
+        pr_authors: Dict[str, str] = {}
+        pr_reviewers: Dict[str, List[str]] = {}
+        pr_ids = sorted(
+            {
+                pr_id
+                for user_id in user_ids
+                for _, pr_id in storage.reviews.get((user_id, PRStatus.OPEN), [])
+            }
+        )
+        for pr_id in pr_ids:
+            pr = storage.pull_requests[pr_id]
+            pr_authors[pr_id] = pr.author_id
+            pr_reviewers[pr_id] = pr.assigned_reviewers
+        if not pr_authors:
+            return 0
+
+        user_teams: Dict[str, str] = {}
+        team_candidates: Dict[str, List[str]] = {}
+        excluded = set(user_ids)
+        for team_name in {storage.users[user_id].team_name for user_id in user_ids}:
+            user_teams.update(dict.fromkeys(storage.team_members[team_name], team_name))
+            team_candidates[team_name] = [
+                user_id for user_id in storage.active_members[team_name] if user_id not in excluded
+            ]
+
+        strategy = get_strategy()
+        strategy_state = await strategy.load_state(
+            self, [user_id for candidates in team_candidates.values() for user_id in candidates]
+        )
+        replacements, removals, assignment_deltas = plan_reassignments(
+            user_ids,
+            pr_authors,
+            pr_reviewers,
+            user_teams,
+            team_candidates,
+            strategy,
+            strategy_state,
+        )
+        now = datetime.now(timezone.utc)
+        for pr_id, old_reviewer_id, new_reviewer_id in replacements:
+            self._replace(storage.pull_requests[pr_id], old_reviewer_id, new_reviewer_id, now)
+        for pr_id, reviewer_id in removals:
+            pr = storage.pull_requests[pr_id]
+            del pr.reviewers[reviewer_id]
+            pr.version += 1
+            storage.remove_review(reviewer_id, pr)
+        storage.change_assignment_counts(assignment_deltas, now)
+        return len(replacements) + len(removals)
+
+    def _replace(
+        self, pr: MemoryPullRequest, old_reviewer_id: str, new_reviewer_id: str, now: datetime
+    ) -> None:
+        """Заменить ревьювера PR; новый ревьювер - последний по времени назначения"""
+        del pr.reviewers[old_reviewer_id]
+        pr.reviewers[new_reviewer_id] = now
+        pr.version += 1
+        self.storage.remove_review(old_reviewer_id, pr)
+        self.storage.add_review(new_reviewer_id, pr)
+
+    async def reviews_version(self, user_id: str) -> Optional[int]:
+        with self.storage.lock:
+            counters = self.storage.reviewer_stats.get(user_id)
+            return counters.reviews_version if counters is not None else None
+
+    async def user_reviews(
+        self,
+        user_id: str,
+        status: Optional[PRStatus],
+        limit: int,
+        after: Optional[ReviewKey],
+    ) -> Sequence[MemoryReview]:
+        """Срез индекса PR ревьювера перед ключом after в обратном порядке"""
+        storage = self.storage
+        with storage.lock:
+            keys = storage.reviews.get((user_id, status), [])
+            end = bisect.bisect_left(keys, after) if after is not None else len(keys)
+            page = []
+            for _, pr_id in reversed(keys[max(end - limit, 0) : end]):
+                pr = storage.pull_requests[pr_id]
+                page.append(
+                    MemoryReview(
+                        pr.pull_request_id,
+                        pr.pull_request_name,
+                        pr.author_id,
+                        pr.status,
+                        pr.created_at,
+                    )
+                )
+            return page
+
+    # PR
+
+    async def create_pr(self, pr_data: PullRequestCreate) -> PullRequestCreateBatchResult:
+        storage = self.storage
+        with storage.lock:
+            author = storage.users.get(pr_data.author_id)
+            pr_exists = pr_data.pull_request_id in storage.pull_requests
+            if pr_exists or author is None:
+                return PullRequestCreateBatchResult(
+                    pull_request_id=pr_data.pull_request_id,
+                    result="PR_EXISTS" if pr_exists else "NOT_FOUND",
+                )
+
+            candidates = [
+                user_id
+                for user_id in storage.active_members[author.team_name]
+                if user_id != author.user_id
+            ]
+            reviewers = await get_strategy().choose(self, candidates, 2)
+            pr = PullRequestCreateResponseItem(
+                pull_request_id=pr_data.pull_request_id,
+                pull_request_name=pr_data.pull_request_name,
+                author_id=pr_data.author_id,
+                status=PRStatus.OPEN,
+                assigned_reviewers=sorted(reviewers),
+            )
+            self._insert([pr], datetime.now(timezone.utc))
+            return PullRequestCreateBatchResult(
+                pull_request_id=pr.pull_request_id, result="CREATED", pr=pr
+            )
+
+    async def create_batch(
+        self, items: Sequence[PullRequestCreate]
+    ) -> List[PullRequestCreateBatchResult]:
+        storage = self.storage
+        with storage.lock:
+            taken_pr_ids = {
+                item.pull_request_id
+                for item in items
+                if item.pull_request_id in storage.pull_requests
+            }
+            author_teams = {
+                storage.users[item.author_id].team_name
+                for item in items
+                if item.author_id in storage.users
+            }
+            user_teams: Dict[str, str] = {}
+            team_candidates: Dict[str, List[str]] = {}
+            for team_name in author_teams:
+                user_teams.update(dict.fromkeys(storage.team_members[team_name], team_name))
+                team_candidates[team_name] = list(storage.active_members[team_name])
+
+            strategy = get_strategy()
+            strategy_state = await strategy.load_state(self, list(user_teams))
+            results = plan_batch(
+                items, taken_pr_ids, user_teams, team_candidates, strategy, strategy_state
+            )
+            self._insert(
+                [result.pr for result in results if result.pr is not None],
+                datetime.now(timezone.utc),
+            )
+            return results
+
+    def _insert(self, prs: Sequence[PullRequestCreateResponseItem], now: datetime) -> None:
+        """Добавить PR с назначениями и изменить счётчики статистики"""
+        storage = self.storage
+        assignment_deltas: CounterType[str] = Counter()
+        for item in prs:
+            pr = storage.pull_requests[item.pull_request_id] = MemoryPullRequest(
+                item.pull_request_id,
+                item.pull_request_name,
+                item.author_id,
+                PRStatus.OPEN,
+                now,
+                reviewers=dict.fromkeys(item.assigned_reviewers, now),
+            )
+            for reviewer_id in pr.reviewers:
+                storage.add_review(reviewer_id, pr)
+            assignment_deltas.update(item.assigned_reviewers)
+        storage.status_counts[PRStatus.OPEN] += len(prs)
+        storage.change_assignment_counts(assignment_deltas, now)
+
+    async def get_pull_request(self, pull_request_id: str) -> Optional[MemoryPullRequest]:
+        with self.storage.lock:
+            pr = self.storage.pull_requests.get(pull_request_id)
+            return _snapshot_pr(pr) if pr is not None else None
+
+    async def merge_pr(self, pull_request_id: str) -> Optional[MemoryPullRequest]:
+        with self.storage.lock:
+            pr = self.storage.pull_requests.get(pull_request_id)
+            if pr is None:
+                return None
+            self._merge(pr)
+            return _snapshot_pr(pr)
+
+    async def merge_batch(self, pull_request_ids: Sequence[str]) -> List[MemoryPullRequest]:
+        storage = self.storage
+        with storage.lock:
+            prs = []
+            for pull_request_id in dict.fromkeys(pull_request_ids):
+                pr = storage.pull_requests.get(pull_request_id)
+                if pr is not None:
+                    self._merge(pr)
+                    prs.append(_snapshot_pr(pr))
+            return prs
+
+    def _merge(self, pr: MemoryPullRequest) -> None:
+        """Пометить открытый PR как MERGED; вызывается под блокировкой хранилища"""
+        if pr.status != PRStatus.OPEN:
+            return
+        storage = self.storage
+        for reviewer_id in pr.reviewers:
+            storage.remove_review(reviewer_id, pr)
+        pr.status = PRStatus.MERGED
+        pr.merged_at = datetime.now(timezone.utc)
+        pr.version += 1
+        for reviewer_id in pr.reviewers:
+            storage.add_review(reviewer_id, pr)
+        storage.status_counts[PRStatus.OPEN] -= 1
+        storage.status_counts[PRStatus.MERGED] += 1
+        storage.change_open_review_counts(dict.fromkeys(pr.reviewers, -1))
+
+    async def replace_reviewer(
+        self, pull_request_id: str, old_reviewer_id: str, new_reviewer_id: str, version: int
+    ) -> Optional[MemoryPullRequest]:
+        storage = self.storage
+        with storage.lock:
+            pr = storage.pull_requests[pull_request_id]
+            if pr.version != version:
+                return None
+            now = datetime.now(timezone.utc)
+            self._replace(pr, old_reviewer_id, new_reviewer_id, now)
+            storage.change_assignment_counts({old_reviewer_id: -1, new_reviewer_id: 1}, now)
+            return _snapshot_pr(pr)
+
+    # состояние стратегий выбора ревьюверов
+
+    async def open_review_counts(self, user_ids: Sequence[str]) -> Dict[str, int]:
+        with self.storage.lock:
+            stats = self.storage.reviewer_stats
+            return {
+                user_id: stats[user_id].open_reviews_count
+                for user_id in user_ids
+                if user_id in stats
+            }
+
+    async def last_assigned_at(self, user_ids: Sequence[str]) -> Dict[str, float]:
+        with self.storage.lock:
+            stats = self.storage.reviewer_stats
+            return {
+                user_id: assigned_at.timestamp()
+                for user_id in user_ids
+                if user_id in stats and (assigned_at := stats[user_id].last_assigned_at) is not None
+            }
+
+    # статистика
+
+    async def statistics(self, filters: StatisticsFilters) -> Tuple[PRStats, List[UserReviewStats]]:
+        storage = self.storage
+        with storage.lock:
+            assignments: Iterable[Tuple[str, int]]
+            if filters.filters_prs:
+                prs = [pr for pr in storage.pull_requests.values() if self._matches(pr, filters)]
+                status_counts = Counter(pr.status for pr in prs)
+                assignments = Counter(
+                    reviewer_id for pr in prs for reviewer_id in pr.reviewers
+                ).items()
+            else:
+                status_counts = storage.status_counts
+                assignments = (
+                    (user_id, counters.assignments_count)
+                    for user_id, counters in storage.reviewer_stats.items()
+                    if counters.assignments_count > 0
+                )
+
+            pr_stats = PRStats(
+                total_prs=sum(status_counts.values()),
+                open_prs=status_counts[PRStatus.OPEN],
+                merged_prs=status_counts[PRStatus.MERGED],
+            )
+            # по убыванию числа назначений, при равенстве - по user_id
+            order = [(-count, user_id) for user_id, count in assignments]
+            top = heapq.nsmallest(filters.limit, order) if filters.limit else sorted(order)
+            user_review_stats = [
+                UserReviewStats(
+                    user_id=user_id,
+                    username=storage.users[user_id].username,
+                    assignments_count=-count,
+                )
+                for count, user_id in top
+            ]
+            return pr_stats, user_review_stats
+
+    def _matches(self, pr: MemoryPullRequest, filters: StatisticsFilters) -> bool:
+        """Подходит ли PR под фильтры статистики; команда - текущая команда автора"""
+        if (
+            filters.team_name is not None
+            and self.storage.users[pr.author_id].team_name != filters.team_name
+        ):
+            return False
+        if filters.status is not None and pr.status != filters.status:
+            return False
+        if filters.created_from is not None and pr.created_at < filters.created_from:
+            return False
+        if filters.created_to is not None and pr.created_at >= filters.created_to:
+            return False
+        # PR без merged_at не попадает в окно merge, как сравнение с NULL в SQL
+        if filters.merged_from is not None and (
+            pr.merged_at is None or pr.merged_at < filters.merged_from
+        ):
+            return False
+        if filters.merged_to is not None and (
+            pr.merged_at is None or pr.merged_at >= filters.merged_to
+        ):
+            return False
+        return True
+
+    async def rebuild_counters(self) -> None:
+        with self.storage.lock:
+            self.storage.rebuild_counters()
+
+    # ключи идемпотентности
+
+    async def reserve_idempotency_key(
+        self, scope: str, key: str, fingerprint: str, lock_seconds: float
+    ) -> Optional[MemoryIdempotencyKey]:
+        keys = self.storage.idempotency_keys
+        with self.storage.lock:
+            now = time.monotonic()
+            stored = keys.get((scope, key))
+            if stored is not None and stored.expires_at > now:
+                return dataclasses.replace(stored)
+            keys[scope, key] = MemoryIdempotencyKey(fingerprint, now + lock_seconds)
+            return None
+
+    async def save_idempotent_response(
+        self, scope: str, key: str, status_code: int, response: bytes, ttl: float
+    ) -> None:
+        with self.storage.lock:
+            stored = self.storage.idempotency_keys.get((scope, key))
+            if stored is not None:
+                stored.status_code = status_code
+                stored.response = response
+                stored.expires_at = time.monotonic() + ttl
+
+    async def release_idempotency_key(self, scope: str, key: str) -> None:
+        keys = self.storage.idempotency_keys
+        with self.storage.lock:
+            stored = keys.get((scope, key))
+            if stored is not None and stored.status_code is None:
+                del keys[scope, key]
+
+    async def purge_idempotency_keys(self, limit: int) -> int:
+        keys = self.storage.idempotency_keys
+        with self.storage.lock:
+            now = time.monotonic()
+            expired = [name for name, stored in keys.items() if stored.expires_at <= now][:limit]
+            for name in expired:
+                del keys[name]
+            return len(expired)
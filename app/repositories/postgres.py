@@ -0,0 +1,1208 @@
+"""
+Хранилище в PostgreSQL: запросы через AsyncSession запроса; методы записи завершаются
+коммитом, составы команд читаются через кэш roster_cache
+"""
+
+import random
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import String, TextClause, any_, delete, func, literal, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import (
+    IdempotencyKey,
+    PRCounters,
+    PRReviewer,
+    PullRequest,
+    ReviewerStats,
+    Team,
+    User,
+)
+from app.models.pull_request import PRStatus
+from app.models.statistics import PR_COUNTER_SLOTS
+from app.repositories.base import (
+    IdempotencyKeyContended,
+    IdempotencyRecord,
+    Repository,
+    ReviewKey,
+    TeamRoster,
+    UserRecord,
+)
+from app.schemas.pull_request import (
+    PullRequestCreate,
+    PullRequestCreateBatchResult,
+    PullRequestCreateResponseItem,
+)
+from app.schemas.statistics import PRStats, StatisticsFilters, UserReviewStats
+from app.schemas.team import TeamCreate
+from app.services.reviewer_selection import get_strategy, plan_batch, plan_reassignments
+from app.services.roster_cache import ROSTER_CHANNEL, roster_cache
+
+# Создание PR одним запросом: data-modifying CTE видят один снимок,
+# поэтому pr_exists отражает состояние до вставки, а new_pr пуст при конфликте или без автора;
+# строки reviewer_stats обновляются в порядке user_id, как в change_assignment_counts;
+# {order_by} - сортировка кандидатов стратегии выбора ревьюверов
+CREATE_PR_SQL = """
+    WITH author AS (
+        SELECT user_id, team_name FROM users WHERE user_id = :author_id
+    ),
+    candidates AS (
+        SELECT u.user_id
+        FROM users u
+        JOIN author a ON u.team_name = a.team_name
+        LEFT JOIN reviewer_stats rs ON rs.user_id = u.user_id
+        WHERE u.is_active AND u.user_id <> a.user_id
+        ORDER BY {order_by}
+        LIMIT 2
+    ),
+    new_pr AS (
+        INSERT INTO pull_requests (pull_request_id, pull_request_name, author_id, status)
+        SELECT :pull_request_id, :pull_request_name, a.user_id, 'OPEN'
+        FROM author a
+        ON CONFLICT (pull_request_id) DO NOTHING
+        RETURNING pull_request_id, pull_request_name, author_id, status, created_at
+    ),
+    new_reviewers AS (
+        INSERT INTO pr_reviewers (pull_request_id, reviewer_id, pr_created_at)
+        SELECT p.pull_request_id, c.user_id, p.created_at
+        FROM new_pr p
+        CROSS JOIN candidates c
+        RETURNING reviewer_id
+    ),
+    pr_counters_change AS (
+        INSERT INTO pr_counters (slot, total_prs, open_prs, merged_prs)
+        SELECT :slot, 1, 1, 0
+        FROM new_pr
+        ON CONFLICT (slot) DO UPDATE
+        SET total_prs = pr_counters.total_prs + 1, open_prs = pr_counters.open_prs + 1
+    ),
+    reviewer_stats_change AS (
+        INSERT INTO reviewer_stats (
+            user_id, assignments_count, open_reviews_count, last_assigned_at
+        )
+        SELECT reviewer_id, 1, 1, now()
+        FROM new_reviewers
+        ORDER BY reviewer_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET assignments_count = reviewer_stats.assignments_count + 1,
+            open_reviews_count = reviewer_stats.open_reviews_count + 1,
+            last_assigned_at = excluded.last_assigned_at,
+            reviews_version = reviewer_stats.reviews_version + 1
+    )
+    SELECT
+        EXISTS (SELECT 1 FROM author) AS author_found,
+        EXISTS (
+            SELECT 1 FROM pull_requests WHERE pull_request_id = :pull_request_id
+        ) AS pr_exists,
+        p.pull_request_id,
+        p.pull_request_name,
+        p.author_id,
+        p.status,
+        ARRAY(SELECT reviewer_id FROM new_reviewers ORDER BY reviewer_id) AS assigned_reviewers
+    FROM (SELECT 1) AS one
+    LEFT JOIN new_pr p ON true
+"""
+
+
+def any_of(values: Iterable[str]) -> Any:
+    """
+    Условие column == any_of(values) вместо column.in_(values): список передаётся одним
+    параметром-массивом (= ANY($1::VARCHAR[])), текст запроса не зависит от числа значений,
+    и подготовленный запрос берётся из кэша соединения
+    """
+    return any_(literal(list(values), ARRAY(String)))
+
+
+@lru_cache
+def create_pr_statement(order_by: str) -> TextClause:
+    """Запрос создания PR с сортировкой кандидатов стратегии"""
+    return text(CREATE_PR_SQL.format(order_by=order_by))
+
+
+# Пакетная вставка: массивы через unnest вместо многострочного VALUES,
+# текст запроса и число параметров не зависят от размера пакета;
+# pr_status и pr_created_at назначений берутся из умолчаний: now() в одной транзакции
+# совпадает с created_at вставленных PR
+INSERT_PRS = text(
+    """
+    INSERT INTO pull_requests (pull_request_id, pull_request_name, author_id, status)
+    SELECT new_prs.pull_request_id, new_prs.pull_request_name, new_prs.author_id, 'OPEN'
+    FROM unnest(
+        CAST(:pull_request_ids AS varchar[]),
+        CAST(:pull_request_names AS varchar[]),
+        CAST(:author_ids AS varchar[])
+    ) AS new_prs(pull_request_id, pull_request_name, author_id)
+    ON CONFLICT (pull_request_id) DO NOTHING
+    RETURNING pull_request_id
+    """
+)
+INSERT_PR_REVIEWERS = text(
+    """
+    INSERT INTO pr_reviewers (pull_request_id, reviewer_id)
+    SELECT new_reviewers.pull_request_id, new_reviewers.reviewer_id
+    FROM unnest(CAST(:pull_request_ids AS varchar[]), CAST(:reviewer_ids AS varchar[]))
+        AS new_reviewers(pull_request_id, reviewer_id)
+    """
+)
+
+# Импорт команд пачками: массивы через unnest, текст запросов не зависит от размера пачки
+IMPORT_TEAMS = text(
+    """
+    INSERT INTO teams (team_name)
+    SELECT unnest(CAST(:team_names AS varchar[]))
+    ON CONFLICT (team_name) DO NOTHING
+    RETURNING team_name
+    """
+)
+IMPORT_USERS = text(
+    """
+    INSERT INTO users (user_id, username, team_name, is_active)
+    SELECT members.user_id, members.username, members.team_name, members.is_active
+    FROM unnest(
+        CAST(:user_ids AS varchar[]),
+        CAST(:usernames AS varchar[]),
+        CAST(:team_names AS varchar[]),
+        CAST(:is_active AS boolean[])
+    ) AS members(user_id, username, team_name, is_active)
+    ON CONFLICT (user_id) DO UPDATE
+    SET username = excluded.username,
+        team_name = excluded.team_name,
+        is_active = excluded.is_active
+    """
+)
+
+# Upsert счётчиков - текстом: insert() диалекта postgresql не кэширует компиляцию,
+# а эти запросы выполняются в каждом запросе записи; массивы через unnest
+# дают один текст запроса при любом числе пользователей
+CHANGE_PR_COUNTERS = text(
+    """
+    INSERT INTO pr_counters (slot, total_prs, open_prs, merged_prs)
+    VALUES (:slot, :total, :opened, :merged)
+    ON CONFLICT (slot) DO UPDATE
+    SET total_prs = pr_counters.total_prs + excluded.total_prs,
+        open_prs = pr_counters.open_prs + excluded.open_prs,
+        merged_prs = pr_counters.merged_prs + excluded.merged_prs
+    """
+)
+CHANGE_ASSIGNMENT_COUNTS = text(
+    """
+    INSERT INTO reviewer_stats (user_id, assignments_count, open_reviews_count, last_assigned_at)
+    SELECT changes.user_id,
+           changes.delta,
+           changes.delta,
+           CASE WHEN changes.delta > 0 THEN now() END
+    FROM unnest(CAST(:user_ids AS varchar[]), CAST(:deltas AS integer[]))
+        WITH ORDINALITY AS changes(user_id, delta, position)
+    ORDER BY changes.position
+    ON CONFLICT (user_id) DO UPDATE
+    SET assignments_count = reviewer_stats.assignments_count + excluded.assignments_count,
+        open_reviews_count = reviewer_stats.open_reviews_count + excluded.open_reviews_count,
+        last_assigned_at = coalesce(excluded.last_assigned_at, reviewer_stats.last_assigned_at),
+        reviews_version = reviewer_stats.reviews_version + 1
+    """
+)
+# UPDATE ... FROM unnest блокирует строки в порядке соединения; строки сначала
+# блокируются в порядке user_id, как в upsert выше и при создании PR
+CHANGE_OPEN_REVIEW_COUNTS = text(
+    """
+    UPDATE reviewer_stats
+    SET open_reviews_count = reviewer_stats.open_reviews_count + locked.delta,
+        reviews_version = reviewer_stats.reviews_version + 1
+    FROM (
+        SELECT rs.user_id, changes.delta
+        FROM reviewer_stats rs
+        JOIN unnest(CAST(:user_ids AS varchar[]), CAST(:deltas AS integer[]))
+            AS changes(user_id, delta) ON changes.user_id = rs.user_id
+        ORDER BY rs.user_id
+        FOR NO KEY UPDATE OF rs
+    ) AS locked
+    WHERE reviewer_stats.user_id = locked.user_id
+    """
+)
+
+# Merge пакета PR одним запросом. Строки PR блокируются в порядке pull_request_id, как при
+# деактивации; блокировка возвращает последнюю версию строки, поэтому PR, смерженный
+# конкурентно, не меняется второй раз. Открытые PR помечаются MERGED вместе с назначениями,
+# счётчиками статистики и нагрузкой ревьюверов (строки reviewer_stats - в порядке user_id),
+# уже смерженные возвращаются без изменений
+MERGE_PRS = text(
+    """
+    WITH locked AS (
+        SELECT pull_request_id, pull_request_name, author_id, status, merged_at, version
+        FROM pull_requests
+        WHERE pull_request_id = ANY(CAST(:pull_request_ids AS varchar[]))
+        ORDER BY pull_request_id
+        FOR NO KEY UPDATE
+    ),
+    merged AS (
+        UPDATE pull_requests
+        SET status = 'MERGED',
+            merged_at = coalesce(pull_requests.merged_at, now()),
+            version = pull_requests.version + 1
+        FROM locked
+        WHERE pull_requests.pull_request_id = locked.pull_request_id
+            AND locked.status = 'OPEN'
+        RETURNING pull_requests.pull_request_id, pull_requests.merged_at, pull_requests.version
+    ),
+    merged_reviewers AS (
+        UPDATE pr_reviewers
+        SET pr_status = 'MERGED'
+        FROM merged
+        WHERE pr_reviewers.pull_request_id = merged.pull_request_id
+        RETURNING pr_reviewers.reviewer_id
+    ),
+    pr_counters_change AS (
+        INSERT INTO pr_counters (slot, total_prs, open_prs, merged_prs)
+        SELECT :slot, 0, -count(*), count(*)
+        FROM merged
+        HAVING count(*) > 0
+        ON CONFLICT (slot) DO UPDATE
+        SET open_prs = pr_counters.open_prs + excluded.open_prs,
+            merged_prs = pr_counters.merged_prs + excluded.merged_prs
+    ),
+    locked_stats AS (
+        SELECT rs.user_id, reviews.delta
+        FROM reviewer_stats rs
+        JOIN (
+            SELECT reviewer_id, count(*) AS delta
+            FROM merged_reviewers
+            GROUP BY reviewer_id
+        ) AS reviews ON reviews.reviewer_id = rs.user_id
+        ORDER BY rs.user_id
+        FOR NO KEY UPDATE OF rs
+    ),
+    reviewer_stats_change AS (
+        UPDATE reviewer_stats
+        SET open_reviews_count = reviewer_stats.open_reviews_count - locked_stats.delta,
+            reviews_version = reviewer_stats.reviews_version + 1
+        FROM locked_stats
+        WHERE reviewer_stats.user_id = locked_stats.user_id
+    )
+    SELECT
+        locked.pull_request_id,
+        locked.pull_request_name,
+        locked.author_id,
+        'MERGED' AS status,
+        coalesce(merged.merged_at, locked.merged_at) AS merged_at,
+        coalesce(merged.version, locked.version) AS version,
+        ARRAY(
+            SELECT reviewer_id
+            FROM pr_reviewers
+            WHERE pr_reviewers.pull_request_id = locked.pull_request_id
+            ORDER BY assigned_at, reviewer_id
+        ) AS assigned_reviewers
+    FROM locked
+    LEFT JOIN merged ON merged.pull_request_id = locked.pull_request_id
+    """
+)
+
+# Версии данных для условных GET: версия команды (teams.version) и версия PR ревьювера
+# (reviewer_stats.reviews_version) меняются в транзакции вместе с данными.
+# Команды блокируются в порядке team_name, чтобы параллельные записи не взаимоблокировались;
+# пути записи меняют версии команд после строк пользователей. Блокировки - NO KEY UPDATE:
+# они не конфликтуют с KEY SHARE, которые берут проверки внешних ключей при вставке PR
+# и назначений, иначе create_pr и create_team блокируют одних пользователей в разном порядке.
+# pg_notify сообщает об изменении состава кэшам roster_cache других воркеров
+# (уведомления доставляются при коммите, после отката - нет)
+BUMP_TEAM_VERSIONS = text(
+    """
+    UPDATE teams
+    SET version = teams.version + 1
+    FROM (
+        SELECT team_name
+        FROM teams
+        WHERE team_name = ANY(CAST(:team_names AS varchar[]))
+        ORDER BY team_name
+        FOR NO KEY UPDATE
+    ) AS locked
+    WHERE teams.team_name = locked.team_name
+    RETURNING pg_notify(:channel, teams.team_name)
+    """
+)
+LOCK_USER_TEAMS = text(
+    """
+    SELECT DISTINCT locked.team_name
+    FROM (
+        SELECT team_name
+        FROM users
+        WHERE user_id = ANY(CAST(:user_ids AS varchar[]))
+        ORDER BY user_id
+        FOR NO KEY UPDATE
+    ) AS locked
+    """
+)
+
+# Занять ключ идемпотентности одним запросом: новый ключ вставляется, истёкший (ответ
+# старше TTL или обработка, прерванная падением воркера) занимается заново - тогда
+# возвращается строка с reserved. Не истёкший ключ не меняется, и возвращается его строка
+# из снимка запроса. Если ключ занят конкурентом после начала снимка, строк нет
+# (повторяется не больше RESERVE_IDEMPOTENCY_ATTEMPTS раз)
+RESERVE_IDEMPOTENCY_ATTEMPTS = 3
+RESERVE_IDEMPOTENCY_KEY = text(
+    """
+    WITH reserved AS (
+        INSERT INTO idempotency_keys (scope, key, fingerprint, expires_at)
+        VALUES (
+            :scope, :key, :fingerprint,
+            now() + make_interval(secs => CAST(:lock_seconds AS double precision))
+        )
+        ON CONFLICT (scope, key) DO UPDATE
+        SET fingerprint = EXCLUDED.fingerprint,
+            status_code = NULL,
+            response = NULL,
+            expires_at = EXCLUDED.expires_at
+        WHERE idempotency_keys.expires_at <= now()
+        RETURNING 1
+    )
+    SELECT true AS reserved, NULL AS fingerprint, NULL AS status_code, NULL AS response
+    FROM reserved
+    UNION ALL
+    SELECT false, fingerprint, status_code, response
+    FROM idempotency_keys
+    WHERE scope = :scope AND key = :key AND NOT EXISTS (SELECT 1 FROM reserved)
+    """
+)
+
+
+class PostgresRepository(Repository):
+    """Хранилище в PostgreSQL поверх сессии запроса"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # команды
+
+    async def create_team(self, team: TeamCreate) -> Optional[List[UserRecord]]:
+        existing_team = await self.db.get(Team, team.team_name)
+        if existing_team:
+            return None
+
+        new_team = Team(team_name=team.team_name)
+        self.db.add(new_team)
+
+        try:
+            await self.db.flush()
+            if team.members:
+                # строки отсортированы по user_id, чтобы параллельные запросы
+                # блокировали пользователей в одном порядке и не уходили в deadlock
+                members_by_id = {member.user_id: member for member in team.members}
+                members = [members_by_id[user_id] for user_id in sorted(members_by_id)]
+                previous_teams = await self.lock_user_teams(members_by_id)
+                stmt = insert(User).values(
+                    [
+                        {
+                            "user_id": member.user_id,
+                            "username": member.username,
+                            "team_name": team.team_name,
+                            "is_active": member.is_active,
+                        }
+                        for member in members
+                    ]
+                )
+                upsert = stmt.on_conflict_do_update(
+                    index_elements=[User.user_id],
+                    set_={
+                        "username": stmt.excluded.username,
+                        "team_name": stmt.excluded.team_name,
+                        "is_active": stmt.excluded.is_active,
+                    },
+                ).returning(User)
+                await self.db.scalars(upsert, execution_options={"populate_existing": True})
+                await self.bump_team_versions(previous_teams - {team.team_name})
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            return None
+
+        roster_cache.invalidate_team(team.team_name)
+        roster_cache.invalidate_users(member.user_id for member in team.members)
+        await self.db.refresh(new_team, attribute_names=["members"])
+        return list(new_team.members)
+
+    async def import_teams(self, teams: Sequence[TeamCreate]) -> Set[str]:
+        """Один INSERT команд и один upsert пользователей"""
+        team_names = sorted({team.team_name for team in teams})
+        created_teams = set(await self.db.scalars(IMPORT_TEAMS, {"team_names": team_names}))
+
+        # пользователь из нескольких строк пачки попадает в команду из последней,
+        # как при последовательном импорте; строки отсортированы по user_id
+        members: Dict[str, Tuple[str, str, bool]] = {}
+        for team in teams:
+            for member in team.members:
+                members[member.user_id] = (member.username, team.team_name, member.is_active)
+        user_ids = sorted(members)
+        previous_teams = await self.lock_user_teams(user_ids)
+        if user_ids:
+            await self.db.execute(
+                IMPORT_USERS,
+                {
+                    "user_ids": user_ids,
+                    "usernames": [members[user_id][0] for user_id in user_ids],
+                    "team_names": [members[user_id][1] for user_id in user_ids],
+                    "is_active": [members[user_id][2] for user_id in user_ids],
+                },
+            )
+        await self.bump_team_versions(previous_teams.union(team_names))
+        await self.db.commit()
+
+        for team_name in team_names:
+            roster_cache.invalidate_team(team_name)
+        roster_cache.invalidate_users(user_ids)
+        return created_teams
+
+    async def team_version(self, team_name: str) -> Optional[int]:
+        version: Optional[int] = await self.db.scalar(
+            select(Team.version).filter(Team.team_name == team_name)
+        )
+        return version
+
+    async def team_members(self, team_name: str) -> List[UserRecord]:
+        return list(await self.db.scalars(select(User).filter(User.team_name == team_name)))
+
+    async def user_roster(self, user_id: str) -> Optional[TeamRoster]:
+        return await roster_cache.get_user_roster(self.db, user_id)
+
+    # пользователи
+
+    async def user_exists(self, user_id: str) -> bool:
+        return await self.db.get(User, user_id) is not None
+
+    async def set_is_active(self, user_id: str, is_active: bool) -> Optional[Tuple[User, int]]:
+        user = await self.db.get(User, user_id)
+        if not user:
+            return None
+        # состав команды не меняется: версия команды и кэш составов остаются прежними
+        if user.is_active == is_active:
+            return user, 0
+
+        reassigned_count = 0
+        if not is_active:
+            reassigned_count = await self._reassign_reviewers([user_id])
+
+        user.is_active = is_active
+        # строка пользователя блокируется раньше строки команды, как в остальных путях записи
+        await self.db.flush()
+        await self.bump_team_versions([user.team_name])
+        await self.db.commit()
+        roster_cache.invalidate_users([user.user_id])
+        await self.db.refresh(user)
+        return user, reassigned_count
+
+    async def deactivate_users(
+        self, team_name: str, user_ids: Sequence[str]
+    ) -> Tuple[List[UserRecord], int]:
+        users = (
+            await self.db.scalars(
+                select(User).filter(User.team_name == team_name, User.user_id == any_of(user_ids))
+            )
+        ).all()
+        if len(users) != len(user_ids):
+            return list(users), 0
+
+        active_user_ids = [user.user_id for user in users if user.is_active]
+        # все уже неактивны: состав команды не меняется
+        if not active_user_ids:
+            return list(users), 0
+        reassigned_count = await self._reassign_reviewers(active_user_ids)
+
+        # одним UPDATE; загруженные объекты пользователей обновляются без refresh
+        await self.db.execute(
+            update(User).where(User.user_id == any_of(active_user_ids)).values(is_active=False),
+            execution_options={"synchronize_session": False},
+        )
+        for user in users:
+            set_committed_value(user, "is_active", False)
+        await self.bump_team_versions([team_name])
+
+        await self.db.commit()
+        roster_cache.invalidate_team(team_name)
+        return list(users), reassigned_count
+
+    async def _reassign_reviewers(self, user_ids: List[str]) -> int:
+        """
+        Метод переназначения ревьюверов в открытых PR
+        для одного или нескольких пользователей.
+        Возвращает количество PR, где были переназначены ревьюверы
+        """
+        if not user_ids:
+            return 0
+
+        pr_authors, pr_reviewers = await self._lock_reviewed_prs(user_ids)
+        if not pr_authors:
+            return 0
+
+        # участники команд деактивируемых пользователей - один запрос на все команды
+        teams = select(User.team_name).filter(User.user_id == any_of(user_ids))
+        members = await self.db.execute(
+            select(User.user_id, User.team_name, User.is_active)
+            .filter(User.team_name.in_(teams))
+            .order_by(User.user_id)
+        )
+        user_teams: Dict[str, str] = {}
+        team_candidates: Dict[str, List[str]] = defaultdict(list)
+        excluded = set(user_ids)
+        for user_id, team_name, is_active in members:
+            user_teams[user_id] = team_name
+            if is_active and user_id not in excluded:
+                team_candidates[team_name].append(user_id)
+
+        strategy = get_strategy()
+        strategy_state = await strategy.load_state(
+            self, [user_id for candidates in team_candidates.values() for user_id in candidates]
+        )
+        replacements, removals, assignment_deltas = plan_reassignments(
+            user_ids,
+            pr_authors,
+            pr_reviewers,
+            user_teams,
+            team_candidates,
+            strategy,
+            strategy_state,
+        )
+        if replacements:
+            changes = (
+                func.unnest(
+                    literal([pr_id for pr_id, _, _ in replacements], ARRAY(String)),
+                    literal([old_id for _, old_id, _ in replacements], ARRAY(String)),
+                    literal([new_id for _, _, new_id in replacements], ARRAY(String)),
+                )
+                .table_valued("pull_request_id", "old_reviewer_id", "new_reviewer_id")
+                .render_derived(name="changes")
+            )
+            await self.db.execute(
+                update(PRReviewer)
+                .where(
+                    PRReviewer.pull_request_id == changes.c.pull_request_id,
+                    PRReviewer.reviewer_id == changes.c.old_reviewer_id,
+                )
+                .values(reviewer_id=changes.c.new_reviewer_id, assigned_at=func.now()),
+                execution_options={"synchronize_session": False},
+            )
+        if removals:
+            removed = (
+                func.unnest(
+                    literal([pr_id for pr_id, _ in removals], ARRAY(String)),
+                    literal([reviewer_id for _, reviewer_id in removals], ARRAY(String)),
+                )
+                .table_valued("pull_request_id", "reviewer_id")
+                .render_derived(name="removed")
+            )
+            await self.db.execute(
+                delete(PRReviewer).where(
+                    PRReviewer.pull_request_id == removed.c.pull_request_id,
+                    PRReviewer.reviewer_id == removed.c.reviewer_id,
+                ),
+                execution_options={"synchronize_session": False},
+            )
+        await self.change_assignment_counts(assignment_deltas)
+
+        # PR, загруженные ранее в этой сессии, перечитают ревьюверов и версию при обращении
+        for instance in list(self.db.identity_map.values()):
+            if isinstance(instance, PullRequest) and instance.pull_request_id in pr_authors:
+                self.db.expire(instance, ["reviewers", "version"])
+
+        return len(replacements) + len(removals)
+
+    async def _lock_reviewed_prs(
+        self, user_ids: List[str]
+    ) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+        """
+        Заблокировать открытые PR, где ревьюверы - пользователи user_ids, и увеличить
+        их версии; возвращает авторов и ревьюверов (в порядке назначения) этих PR
+        """
+        # строки PR блокируются в порядке pull_request_id до чтения ревьюверов: конкурентные
+        # замены и merge этих PR ждут или получают конфликт версии, пересекающиеся деактивации
+        # не блокируют друг друга крест-накрест; все записи в pr_reviewers идут после
+        # блокировки их PR. Версия растёт у всех заблокированных PR, даже если конкурент
+        # успел заменить ревьювера: лишний конфликт версии безопасен
+        reviewed_pr_ids = select(PRReviewer.pull_request_id).filter(
+            PRReviewer.reviewer_id == any_of(user_ids)
+        )
+        open_pr_ids = (
+            select(PullRequest.pull_request_id)
+            .filter(
+                PullRequest.pull_request_id.in_(reviewed_pr_ids),
+                PullRequest.status == PRStatus.OPEN,
+            )
+            .order_by(PullRequest.pull_request_id)
+            .with_for_update(key_share=True)
+        )
+        locked_pr_ids = (
+            await self.db.scalars(
+                update(PullRequest)
+                .where(PullRequest.pull_request_id.in_(open_pr_ids))
+                .values(version=PullRequest.version + 1)
+                .returning(PullRequest.pull_request_id),
+                execution_options={"synchronize_session": False},
+            )
+        ).all()
+        if not locked_pr_ids:
+            return {}, {}
+
+        # все ревьюверы заблокированных PR - новым запросом, после ожидания блокировок
+        rows = await self.db.execute(
+            select(PullRequest.pull_request_id, PullRequest.author_id, PRReviewer.reviewer_id)
+            .join(PRReviewer, PRReviewer.pull_request_id == PullRequest.pull_request_id)
+            .filter(PullRequest.pull_request_id == any_of(locked_pr_ids))
+            .order_by(PullRequest.pull_request_id, PRReviewer.assigned_at, PRReviewer.reviewer_id)
+        )
+        pr_authors: Dict[str, str] = {}
+        pr_reviewers: Dict[str, List[str]] = defaultdict(list)
+        for pull_request_id, author_id, reviewer_id in rows:
+            pr_authors[pull_request_id] = author_id
+            pr_reviewers[pull_request_id].append(reviewer_id)
+        return pr_authors, pr_reviewers
+
+    async def reviews_version(self, user_id: str) -> Optional[int]:
+        version: Optional[int] = await self.db.scalar(
+            select(ReviewerStats.reviews_version).filter(ReviewerStats.user_id == user_id)
+        )
+        return version
+
+    async def user_reviews(
+        self,
+        user_id: str,
+        status: Optional[PRStatus],
+        limit: int,
+        after: Optional[ReviewKey],
+    ) -> Sequence[Any]:
+        """Keyset-пагинация по (pr_created_at, pull_request_id) по индексу pr_reviewers"""
+        query = (
+            select(
+                PullRequest.pull_request_id,
+                PullRequest.pull_request_name,
+                PullRequest.author_id,
+                PullRequest.status,
+                PRReviewer.pr_created_at,
+            )
+            .join(PullRequest, PullRequest.pull_request_id == PRReviewer.pull_request_id)
+            .filter(PRReviewer.reviewer_id == user_id)
+        )
+        if status is not None:
+            query = query.filter(PRReviewer.pr_status == status)
+        if after is not None:
+            query = query.filter(
+                tuple_(PRReviewer.pr_created_at, PRReviewer.pull_request_id)
+                < tuple_(literal(after[0]), literal(after[1]))
+            )
+        return (
+            await self.db.execute(
+                query.order_by(
+                    PRReviewer.pr_created_at.desc(), PRReviewer.pull_request_id.desc()
+                ).limit(limit)
+            )
+        ).all()
+
+    # PR
+
+    async def create_pr(self, pr_data: PullRequestCreate) -> PullRequestCreateBatchResult:
+        """
+        Выбор ревьюверов, вставка и счётчики статистики - один запрос;
+        состав команды автора читается в нём же, кэш составов не используется
+        """
+        row = (
+            await self.db.execute(
+                create_pr_statement(get_strategy().order_by),
+                {
+                    "pull_request_id": pr_data.pull_request_id,
+                    "pull_request_name": pr_data.pull_request_name,
+                    "author_id": pr_data.author_id,
+                    "slot": random.randrange(PR_COUNTER_SLOTS),
+                },
+            )
+        ).one()
+        await self.db.commit()
+
+        if row.pull_request_id is None:
+            # PR не вставлен: он уже есть (в том числе вставлен конкурентно) или нет автора
+            return PullRequestCreateBatchResult(
+                pull_request_id=pr_data.pull_request_id,
+                result="PR_EXISTS" if row.pr_exists or row.author_found else "NOT_FOUND",
+            )
+
+        return PullRequestCreateBatchResult(
+            pull_request_id=row.pull_request_id,
+            result="CREATED",
+            pr=PullRequestCreateResponseItem(
+                pull_request_id=row.pull_request_id,
+                pull_request_name=row.pull_request_name,
+                author_id=row.author_id,
+                status=row.status,
+                assigned_reviewers=row.assigned_reviewers,
+            ),
+        )
+
+    async def create_batch(
+        self, items: Sequence[PullRequestCreate]
+    ) -> List[PullRequestCreateBatchResult]:
+        """
+        Авторы с составами их команд и существующие PR читаются одним запросом каждый,
+        ревьюверы выбираются в памяти, PR и назначения вставляются многострочными INSERT
+        """
+        pr_ids = [item.pull_request_id for item in items]
+        taken_pr_ids = set(
+            await self.db.scalars(
+                select(PullRequest.pull_request_id).filter(
+                    PullRequest.pull_request_id == any_of(pr_ids)
+                )
+            )
+        )
+
+        author_teams = select(User.team_name).filter(
+            User.user_id == any_of({item.author_id for item in items})
+        )
+        members = await self.db.execute(
+            select(User.user_id, User.team_name, User.is_active)
+            .filter(User.team_name.in_(author_teams))
+            .order_by(User.user_id)
+        )
+        user_teams: Dict[str, str] = {}
+        team_candidates: Dict[str, List[str]] = defaultdict(list)
+        for user_id, team_name, is_active in members:
+            user_teams[user_id] = team_name
+            if is_active:
+                team_candidates[team_name].append(user_id)
+
+        strategy = get_strategy()
+        strategy_state = await strategy.load_state(self, list(user_teams))
+        results = plan_batch(
+            items, taken_pr_ids, user_teams, team_candidates, strategy, strategy_state
+        )
+
+        inserted_pr_ids = await self._insert_batch(
+            [result.pr for result in results if result.pr is not None]
+        )
+        await self.db.commit()
+
+        # PR, вставленные конкурентно между чтением и вставкой
+        return [
+            result
+            if result.pr is None or result.pull_request_id in inserted_pr_ids
+            else PullRequestCreateBatchResult(
+                pull_request_id=result.pull_request_id, result="PR_EXISTS"
+            )
+            for result in results
+        ]
+
+    async def _insert_batch(self, prs: Sequence[PullRequestCreateResponseItem]) -> Set[str]:
+        """
+        Вставить PR с назначениями и изменить счётчики статистики;
+        возвращает id вставленных PR
+        """
+        if not prs:
+            return set()
+
+        inserted_pr_ids = set(
+            await self.db.scalars(
+                INSERT_PRS,
+                {
+                    "pull_request_ids": [pr.pull_request_id for pr in prs],
+                    "pull_request_names": [pr.pull_request_name for pr in prs],
+                    "author_ids": [pr.author_id for pr in prs],
+                },
+            )
+        )
+        if not inserted_pr_ids:
+            return inserted_pr_ids
+
+        reviewer_rows = [
+            (pr.pull_request_id, reviewer_id)
+            for pr in prs
+            if pr.pull_request_id in inserted_pr_ids
+            for reviewer_id in pr.assigned_reviewers
+        ]
+        if reviewer_rows:
+            await self.db.execute(
+                INSERT_PR_REVIEWERS,
+                {
+                    "pull_request_ids": [pr_id for pr_id, _ in reviewer_rows],
+                    "reviewer_ids": [reviewer_id for _, reviewer_id in reviewer_rows],
+                },
+            )
+
+        await self.change_pr_counters(total=len(inserted_pr_ids), opened=len(inserted_pr_ids))
+        await self.change_assignment_counts(
+            Counter(reviewer_id for _, reviewer_id in reviewer_rows)
+        )
+        return inserted_pr_ids
+
+    async def get_pull_request(self, pull_request_id: str) -> Optional[PullRequest]:
+        # populate_existing: повторное чтение после конфликта версий видит новое состояние
+        return await self.db.get(PullRequest, pull_request_id, populate_existing=True)
+
+    async def merge_pr(self, pull_request_id: str) -> Optional[PullRequest]:
+        # строка PR блокируется до чтения статуса и ревьюверов:
+        # конкурентный merge ждёт и видит MERGED, счётчики не уменьшаются дважды
+        pr = await self.db.get(
+            PullRequest,
+            pull_request_id,
+            with_for_update={"key_share": True},
+            populate_existing=True,
+        )
+        if not pr:
+            return None
+
+        if pr.status == PRStatus.MERGED:
+            await self.db.commit()
+            return pr
+        pr.status = PRStatus.MERGED
+        pr.merged_at = datetime.now(timezone.utc)
+        pr.version += 1
+        for reviewer in pr.reviewers:
+            reviewer.pr_status = PRStatus.MERGED
+        await self.change_pr_counters(opened=-1, merged=1)
+        await self.change_open_review_counts(
+            {reviewer_id: -1 for reviewer_id in pr.assigned_reviewers}
+        )
+
+        await self.db.commit()
+        await self.db.refresh(pr)
+        return pr
+
+    async def merge_batch(self, pull_request_ids: Sequence[str]) -> List[Any]:
+        """Блокировка, merge, назначения и счётчики - один запрос"""
+        rows = (
+            await self.db.execute(
+                MERGE_PRS,
+                {
+                    "pull_request_ids": sorted(set(pull_request_ids)),
+                    "slot": random.randrange(PR_COUNTER_SLOTS),
+                },
+            )
+        ).all()
+        await self.db.commit()
+        return list(rows)
+
+    async def replace_reviewer(
+        self, pull_request_id: str, old_reviewer_id: str, new_reviewer_id: str, version: int
+    ) -> Optional[PullRequest]:
+        # сравнение версии и блокировка строки PR одним UPDATE: после конкурентной замены,
+        # merge или деактивации версия другая, и строка не обновляется
+        bumped = await self.db.scalar(
+            update(PullRequest)
+            .where(PullRequest.pull_request_id == pull_request_id, PullRequest.version == version)
+            .values(version=PullRequest.version + 1)
+            .returning(PullRequest.version),
+            execution_options={"synchronize_session": False},
+        )
+        if bumped is None:
+            await self.db.rollback()
+            return None
+
+        # PR уже в сессии после get_pull_request: get берёт его из identity map без запроса;
+        # версия не менялась с чтения, значит, загруженные ревьюверы актуальны
+        pr = await self.db.get(PullRequest, pull_request_id)
+        assert pr is not None, f"PR {pull_request_id} not found"
+        set_committed_value(pr, "version", bumped)
+        pr.assigned_reviewers.remove(old_reviewer_id)
+        pr.assigned_reviewers.append(new_reviewer_id)
+        await self.change_assignment_counts({old_reviewer_id: -1, new_reviewer_id: 1})
+
+        await self.db.commit()
+        return pr
+
+    # состояние стратегий выбора ревьюверов
+
+    async def open_review_counts(self, user_ids: Sequence[str]) -> Dict[str, int]:
+        rows = await self.db.execute(
+            select(ReviewerStats.user_id, ReviewerStats.open_reviews_count).filter(
+                ReviewerStats.user_id == any_of(user_ids)
+            )
+        )
+        return {user_id: open_reviews_count for user_id, open_reviews_count in rows}
+
+    async def last_assigned_at(self, user_ids: Sequence[str]) -> Dict[str, float]:
+        rows = await self.db.execute(
+            select(
+                ReviewerStats.user_id, func.extract("epoch", ReviewerStats.last_assigned_at)
+            ).filter(
+                ReviewerStats.user_id == any_of(user_ids),
+                ReviewerStats.last_assigned_at.is_not(None),
+            )
+        )
+        return {user_id: float(assigned_at) for user_id, assigned_at in rows}
+
+    # статистика
+
+    async def statistics(self, filters: StatisticsFilters) -> Tuple[PRStats, List[UserReviewStats]]:
+        if filters.filters_prs:
+            return await self._aggregate_statistics(filters)
+        return await self._read_counters(filters)
+
+    async def _read_counters(
+        self, filters: StatisticsFilters
+    ) -> Tuple[PRStats, List[UserReviewStats]]:
+        """Статистика из счётчиков pr_counters и reviewer_stats"""
+        totals = (
+            await self.db.execute(
+                select(
+                    func.coalesce(func.sum(PRCounters.total_prs), 0),
+                    func.coalesce(func.sum(PRCounters.open_prs), 0),
+                    func.coalesce(func.sum(PRCounters.merged_prs), 0),
+                )
+            )
+        ).one()
+        pr_stats = PRStats(total_prs=totals[0], open_prs=totals[1], merged_prs=totals[2])
+
+        rows = await self.db.execute(
+            select(ReviewerStats.user_id, User.username, ReviewerStats.assignments_count)
+            .join(User, User.user_id == ReviewerStats.user_id)
+            .filter(ReviewerStats.assignments_count > 0)
+            .order_by(ReviewerStats.assignments_count.desc(), ReviewerStats.user_id)
+            .limit(filters.limit)
+        )
+        user_review_stats = [
+            UserReviewStats(user_id=user_id, username=username, assignments_count=count)
+            for user_id, username, count in rows
+        ]
+        return pr_stats, user_review_stats
+
+    @staticmethod
+    def _pr_conditions(filters: StatisticsFilters) -> List[Any]:
+        """Условия отбора PR по фильтрам статистики"""
+        conditions: List[Any] = []
+        if filters.team_name is not None:
+            conditions.append(
+                PullRequest.author_id.in_(
+                    select(User.user_id).filter(User.team_name == filters.team_name)
+                )
+            )
+        if filters.status is not None:
+            conditions.append(PullRequest.status == filters.status)
+        if filters.created_from is not None:
+            conditions.append(PullRequest.created_at >= filters.created_from)
+        if filters.created_to is not None:
+            conditions.append(PullRequest.created_at < filters.created_to)
+        if filters.merged_from is not None:
+            conditions.append(PullRequest.merged_at >= filters.merged_from)
+        if filters.merged_to is not None:
+            conditions.append(PullRequest.merged_at < filters.merged_to)
+        return conditions
+
+    async def _aggregate_statistics(
+        self, filters: StatisticsFilters
+    ) -> Tuple[PRStats, List[UserReviewStats]]:
+        """Статистика по отфильтрованным PR, посчитанная GROUP BY в бд"""
+        conditions = self._pr_conditions(filters)
+
+        totals = (
+            await self.db.execute(
+                select(
+                    func.count(),
+                    func.count().filter(PullRequest.status == PRStatus.OPEN),
+                    func.count().filter(PullRequest.status == PRStatus.MERGED),
+                )
+                .select_from(PullRequest)
+                .filter(*conditions)
+            )
+        ).one()
+        pr_stats = PRStats(total_prs=totals[0], open_prs=totals[1], merged_prs=totals[2])
+
+        # имена читаются только для ревьюверов, попавших в рейтинг
+        assignments_count = func.count().label("assignments_count")
+        rating = (
+            select(PRReviewer.reviewer_id, assignments_count)
+            .join(PullRequest, PullRequest.pull_request_id == PRReviewer.pull_request_id)
+            .filter(*conditions)
+            .group_by(PRReviewer.reviewer_id)
+            .order_by(assignments_count.desc(), PRReviewer.reviewer_id)
+            .limit(filters.limit)
+            .subquery()
+        )
+        rows = await self.db.execute(
+            select(rating.c.reviewer_id, User.username, rating.c.assignments_count)
+            .join(User, User.user_id == rating.c.reviewer_id)
+            .order_by(rating.c.assignments_count.desc(), rating.c.reviewer_id)
+        )
+        user_review_stats = [
+            UserReviewStats(user_id=user_id, username=username, assignments_count=count)
+            for user_id, username, count in rows
+        ]
+        return pr_stats, user_review_stats
+
+    async def rebuild_counters(self) -> None:
+        # SHARE блокирует запись в PR и назначения до конца пересчёта
+        await self.db.execute(text("LOCK TABLE pull_requests, pr_reviewers IN SHARE MODE"))
+        await self.db.execute(delete(PRCounters))
+        # строки reviewer_stats не удаляются: reviews_version не должен повторять
+        # выданные ранее версии, поэтому счётчики обнуляются, а версии растут
+        await self.db.execute(
+            update(ReviewerStats).values(
+                assignments_count=0,
+                open_reviews_count=0,
+                last_assigned_at=None,
+                reviews_version=ReviewerStats.reviews_version + 1,
+            ),
+            execution_options={"synchronize_session": False},
+        )
+
+        await self.db.execute(
+            insert(PRCounters).from_select(
+                ["slot", "total_prs", "open_prs", "merged_prs"],
+                select(
+                    literal(0),
+                    func.count(),
+                    func.count().filter(PullRequest.status == PRStatus.OPEN),
+                    func.count().filter(PullRequest.status == PRStatus.MERGED),
+                ),
+            )
+        )
+        rebuilt = insert(ReviewerStats).from_select(
+            ["user_id", "assignments_count", "open_reviews_count", "last_assigned_at"],
+            select(
+                PRReviewer.reviewer_id,
+                func.count(),
+                func.count().filter(PullRequest.status == PRStatus.OPEN),
+                func.max(PRReviewer.assigned_at),
+            )
+            .join(PullRequest, PullRequest.pull_request_id == PRReviewer.pull_request_id)
+            .group_by(PRReviewer.reviewer_id),
+        )
+        await self.db.execute(
+            rebuilt.on_conflict_do_update(
+                index_elements=[ReviewerStats.user_id],
+                set_={
+                    "assignments_count": rebuilt.excluded.assignments_count,
+                    "open_reviews_count": rebuilt.excluded.open_reviews_count,
+                    "last_assigned_at": rebuilt.excluded.last_assigned_at,
+                },
+            )
+        )
+        await self.db.commit()
+
+    # ключи идемпотентности
+
+    async def reserve_idempotency_key(
+        self, scope: str, key: str, fingerprint: str, lock_seconds: float
+    ) -> Optional[IdempotencyRecord]:
+        params = {
+            "scope": scope,
+            "key": key,
+            "fingerprint": fingerprint,
+            "lock_seconds": lock_seconds,
+        }
+        for _ in range(RESERVE_IDEMPOTENCY_ATTEMPTS):
+            # коммит сразу: конкурентный повтор должен увидеть занятый ключ до конца обработки
+            row = (await self.db.execute(RESERVE_IDEMPOTENCY_KEY, params)).one_or_none()
+            await self.db.commit()
+            if row is not None:
+                return None if row.reserved else row
+            # ключ занят конкурентом после начала снимка: его строка видна новому запросу,
+            # если конкурент не освободил ключ снова
+        raise IdempotencyKeyContended(f"{scope} {key}")
+
+    async def save_idempotent_response(
+        self, scope: str, key: str, status_code: int, response: bytes, ttl: float
+    ) -> None:
+        await self.db.execute(
+            update(IdempotencyKey)
+            .filter(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+            .values(
+                status_code=status_code,
+                response=response,
+                expires_at=func.now() + timedelta(seconds=ttl),
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        await self.db.commit()
+
+    async def release_idempotency_key(self, scope: str, key: str) -> None:
+        await self.db.rollback()
+        await self.db.execute(
+            delete(IdempotencyKey).filter(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None),
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        await self.db.commit()
+
+    async def purge_idempotency_keys(self, limit: int) -> int:
+        expired = (
+            select(IdempotencyKey.scope, IdempotencyKey.key)
+            .filter(IdempotencyKey.expires_at <= func.now())
+            .limit(limit)
+        )
+        result = await self.db.execute(
+            delete(IdempotencyKey).filter(
+                tuple_(IdempotencyKey.scope, IdempotencyKey.key).in_(expired)
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    # счётчики и версии в транзакции вызывающего
+
+    async def change_pr_counters(self, total: int = 0, opened: int = 0, merged: int = 0) -> None:
+        """Изменить счётчики PR; изменение пишется в случайный слот pr_counters"""
+        await self.db.execute(
+            CHANGE_PR_COUNTERS,
+            {
+                "slot": random.randrange(PR_COUNTER_SLOTS),
+                "total": total,
+                "opened": opened,
+                "merged": merged,
+            },
+        )
+
+    async def change_assignment_counts(self, deltas: Mapping[str, int]) -> None:
+        """
+        Изменить счётчики назначений ревьюверов; deltas - изменение количества назначений
+        по user_id; назначения меняются только в открытых PR, поэтому так же меняется
+        нагрузка open_reviews_count
+        """
+        # строки блокируются в порядке user_id, чтобы параллельные транзакции не взаимоблокировались
+        changes = sorted((user_id, delta) for user_id, delta in deltas.items() if delta)
+        if not changes:
+            return
+
+        await self.db.execute(
+            CHANGE_ASSIGNMENT_COUNTS,
+            {
+                "user_ids": [user_id for user_id, _ in changes],
+                "deltas": [delta for _, delta in changes],
+            },
+        )
+
+    async def change_open_review_counts(self, deltas: Mapping[str, int]) -> None:
+        """
+        Изменить нагрузку ревьюверов (назначения в открытых PR),
+        например при merge PR; deltas - изменение по user_id
+        """
+        changes = sorted((user_id, delta) for user_id, delta in deltas.items() if delta)
+        if not changes:
+            return
+
+        await self.db.execute(
+            CHANGE_OPEN_REVIEW_COUNTS,
+            {
+                "user_ids": [user_id for user_id, _ in changes],
+                "deltas": [delta for _, delta in changes],
+            },
+        )
+
+    async def lock_user_teams(self, user_ids: Iterable[str]) -> Set[str]:
+        """
+        Заблокировать существующих пользователей до их upsert и вернуть их текущие команды:
+        при переходе пользователя в другую команду меняется и версия прежней
+        """
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return set()
+        return set(await self.db.scalars(LOCK_USER_TEAMS, {"user_ids": user_ids}))
+
+    async def bump_team_versions(self, team_names: Iterable[str]) -> None:
+        """Увеличить версии команд после изменения их состава"""
+        team_names = sorted(set(team_names))
+        if team_names:
+            await self.db.execute(
+                BUMP_TEAM_VERSIONS, {"team_names": team_names, "channel": ROSTER_CHANNEL}
+            )
@@ -13,6 +13,10 @@ class ErrorDetail(BaseModel):
         "NOT_ASSIGNED",
         "NO_CANDIDATE",
         "NOT_FOUND",
+        "INVALID_CURSOR",
+        "CONCURRENT_UPDATE",
+        "IDEMPOTENCY_KEY_IN_USE",
+        "IDEMPOTENCY_KEY_REUSED",
     ]
     message: str
 
@@ -1,10 +1,12 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
 from app.models.pull_request import PRStatus
 
+PR_BATCH_MAX_ITEMS = 1000
+
 
 class PullRequestCreate(BaseModel):
     """Схема создания PR"""
@@ -92,3 +94,37 @@ class PullRequestMergeResponse(BaseModel):
     """Схема ответа merge PR"""
 
     pr: PullRequestMergeResponseItem
+
+
+class PullRequestMergeBatchRequest(BaseModel):
+    """Схема запроса пакетного merge PR"""
+
+    pull_request_ids: List[str] = Field(min_length=1, max_length=PR_BATCH_MAX_ITEMS)
+
+
+class PullRequestMergeBatchResponse(BaseModel):
+    """Схема ответа пакетного merge PR"""
+
+    prs: List[PullRequestMergeResponseItem]
+    not_found: List[str]
+
+
+class PullRequestCreateBatchRequest(BaseModel):
+    """Схема запроса пакетного создания PR"""
+
+    items: List[PullRequestCreate] = Field(min_length=1, max_length=PR_BATCH_MAX_ITEMS)
+
+
+class PullRequestCreateBatchResult(BaseModel):
+    """Схема результата создания одного PR из пакета"""
+
+    pull_request_id: str
+    result: Literal["CREATED", "PR_EXISTS", "NOT_FOUND"]
+    pr: Optional[PullRequestCreateResponseItem] = None
+
+
+class PullRequestCreateBatchResponse(BaseModel):
+    """Схема ответа пакетного создания PR"""
+
+    created: int
+    results: List[PullRequestCreateBatchResult]
@@ -0,0 +1,48 @@
+"""
+Сериализаторы ответов из записей хранилища и строк запросов в dict без моделей pydantic;
+форма совпадает со схемами ответов (включая алиасы), модели остаются для документации
+"""
+
+from typing import Any, Dict, Iterable
+
+from app.repositories.base import PullRequestRecord, UserRecord
+
+
+def team_member(user: UserRecord) -> Dict[str, Any]:
+    """Участник команды (TeamMember)"""
+    return {"user_id": user.user_id, "username": user.username, "is_active": user.is_active}
+
+
+def team(team_name: str, members: Iterable[UserRecord]) -> Dict[str, Any]:
+    """Команда с участниками (TeamResponse)"""
+    return {"team_name": team_name, "members": [team_member(user) for user in members]}
+
+
+def user(user: UserRecord) -> Dict[str, Any]:
+    """Пользователь (UserResponse)"""
+    return {
+        "user_id": user.user_id,
+        "username": user.username,
+        "team_name": user.team_name,
+        "is_active": user.is_active,
+    }
+
+
+def pull_request_short(pr: Any) -> Dict[str, Any]:
+    """Краткий PR (PullRequestShort) из PullRequest или строки запроса с теми же полями"""
+    return {
+        "pull_request_id": pr.pull_request_id,
+        "pull_request_name": pr.pull_request_name,
+        "author_id": pr.author_id,
+        "status": pr.status,
+    }
+
+
+def pull_request(pr: PullRequestRecord) -> Dict[str, Any]:
+    """PR с ревьюверами (PullRequestReassignResponseItem)"""
+    return {**pull_request_short(pr), "assigned_reviewers": list(pr.assigned_reviewers)}
+
+
+def merged_pull_request(pr: PullRequestRecord) -> Dict[str, Any]:
+    """PR с ревьюверами и временем merge (PullRequestMergeResponseItem)"""
+    return {**pull_request(pr), "mergedAt": pr.merged_at}
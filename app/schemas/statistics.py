@@ -1,6 +1,9 @@
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+
+from app.models.pull_request import PRStatus
 
 
 class UserReviewStats(BaseModel):
@@ -19,8 +22,47 @@ class PRStats(BaseModel):
     merged_prs: int
 
 
+class StatisticsFilters(BaseModel):
+    """
+    Схема фильтров статистики;
+    границы *_from включаются в окно, *_to - нет
+    """
+
+    team_name: Optional[str] = None
+    status: Optional[PRStatus] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    merged_from: Optional[datetime] = None
+    merged_to: Optional[datetime] = None
+    limit: Optional[int] = None
+
+    @field_validator("created_from", "created_to", "merged_from", "merged_to")
+    @classmethod
+    def assume_utc(cls, moment: Optional[datetime]) -> Optional[datetime]:
+        """Время без часового пояса считается UTC одинаково во всех хранилищах"""
+        if moment is None or moment.tzinfo is not None:
+            return moment
+        return moment.replace(tzinfo=timezone.utc)
+
+    @property
+    def filters_prs(self) -> bool:
+        """Ограничивают ли фильтры множество PR"""
+        return any(
+            value is not None
+            for value in (
+                self.team_name,
+                self.status,
+                self.created_from,
+                self.created_to,
+                self.merged_from,
+                self.merged_to,
+            )
+        )
+
+
 class StatisticsResponse(BaseModel):
     """Схема ответа со статистикой"""
 
     pr_stats: PRStats
     user_review_stats: List[UserReviewStats]
+    filters: StatisticsFilters = StatisticsFilters()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -36,3 +36,21 @@ class TeamCreateResponse(BaseModel):
     """Схема ответа создания команды"""
 
     team: TeamResponse
+
+
+class TeamImportResult(BaseModel):
+    """Схема результата импорта одной команды (строки NDJSON)"""
+
+    line: int
+    team_name: Optional[str] = None
+    result: Literal["CREATED", "UPDATED", "INVALID"]
+    members: int = 0
+    error: Optional[str] = None
+
+
+class TeamImportResponse(BaseModel):
+    """Схема ответа импорта команд"""
+
+    teams: int
+    users: int
+    results: List[TeamImportResult]
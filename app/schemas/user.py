@@ -1,9 +1,12 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
 from app.schemas.pull_request import PullRequestShort
 
+USER_REVIEWS_DEFAULT_LIMIT = 100
+USER_REVIEWS_MAX_LIMIT = 1000
+
 
 class UserBase(BaseModel):
     """Базовая схема пользователя"""
@@ -34,6 +37,7 @@ class UserReviewResponse(BaseModel):
 
     user_id: str
     pull_requests: List[PullRequestShort]
+    next_cursor: Optional[str] = None
 
 
 class UserSetIsActiveResponse(BaseModel):
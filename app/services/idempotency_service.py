@@ -0,0 +1,121 @@
+import hashlib
+from itertools import count
+from typing import Any, Awaitable, Callable, NoReturn, Optional
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.exceptions import error_response
+from app.core.metrics import IDEMPOTENT_REPLAYS
+from app.repositories import IdempotencyKeyContended, IdempotencyRecord, Repository
+from app.schemas.error import ErrorDetail, ErrorResponse
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# заголовок ответа, повторённого из хранилища
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# временные ошибки: повтор с тем же ключом должен выполнить запрос заново, поэтому
+# они, как и 5xx, не сохраняются
+RETRYABLE_ERROR_CODES = frozenset({"CONCURRENT_UPDATE"})
+
+# запросы воркера с ключом: каждый IDEMPOTENCY_PURGE_EVERY-й удаляет истёкшие ключи
+_keyed_requests = count(1)
+
+
+class IdempotencyService:
+    @staticmethod
+    async def execute(
+        repo: Repository,
+        scope: str,
+        key: Optional[str],
+        request: BaseModel,
+        handler: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        """
+        Выполнить запрос один раз на ключ: первый ответ (кроме 5xx и временных ошибок)
+        сохраняется, повтор с тем же ключом и телом получает его без вызова handler;
+        без ключа handler вызывается как обычно
+        """
+        if key is None:
+            return await handler()
+
+        fingerprint = hashlib.sha256(request.model_dump_json().encode()).hexdigest()
+        try:
+            stored = await repo.reserve_idempotency_key(
+                scope, key, fingerprint, settings.IDEMPOTENCY_LOCK_SECONDS
+            )
+        except IdempotencyKeyContended:
+            IdempotencyService._raise_in_use()
+        if stored is not None:
+            return IdempotencyService._replay(scope, stored, fingerprint)
+
+        try:
+            response = await handler()
+        except HTTPException as error:
+            if IdempotencyService._retryable(error):
+                await repo.release_idempotency_key(scope, key)
+            else:
+                response = error_response(error)
+                await IdempotencyService._save(repo, scope, key, response)
+            raise
+        except Exception:
+            await repo.release_idempotency_key(scope, key)
+            raise
+
+        if response.status_code >= 500:
+            await repo.release_idempotency_key(scope, key)
+        else:
+            await IdempotencyService._save(repo, scope, key, response)
+        return response
+
+    @staticmethod
+    def _retryable(error: HTTPException) -> bool:
+        """Ошибка сервера или временная ошибка из RETRYABLE_ERROR_CODES"""
+        if error.status_code >= 500:
+            return True
+        detail: Any = error.detail
+        if not isinstance(detail, dict) or "error" not in detail:
+            return False
+        return detail["error"].get("code") in RETRYABLE_ERROR_CODES
+
+    @staticmethod
+    async def _save(repo: Repository, scope: str, key: str, response: Response) -> None:
+        await repo.save_idempotent_response(
+            scope, key, response.status_code, bytes(response.body), settings.IDEMPOTENCY_TTL
+        )
+        if next(_keyed_requests) % settings.IDEMPOTENCY_PURGE_EVERY == 0:
+            await repo.purge_idempotency_keys(settings.IDEMPOTENCY_PURGE_BATCH)
+
+    @staticmethod
+    def _replay(scope: str, stored: IdempotencyRecord, fingerprint: str) -> Response:
+        """Ответ на повтор: сохранённый ответ или ошибка, если повтор не совпадает с запросом"""
+        if stored.fingerprint != fingerprint:
+            error_response = ErrorResponse(
+                error=ErrorDetail(
+                    code="IDEMPOTENCY_KEY_REUSED",
+                    message="idempotency key was used with a different request body",
+                )
+            )
+            raise HTTPException(status_code=422, detail=error_response.model_dump())
+        if stored.status_code is None or stored.response is None:
+            IdempotencyService._raise_in_use()
+
+        IDEMPOTENT_REPLAYS.labels(scope).inc()
+        return Response(
+            stored.response,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"},
+        )
+
+    @staticmethod
+    def _raise_in_use() -> NoReturn:
+        """Ключ занят запросом, который ещё обрабатывается"""
+        error_response = ErrorResponse(
+            error=ErrorDetail(
+                code="IDEMPOTENCY_KEY_IN_USE",
+                message="request with this idempotency key is still in progress",
+            )
+        )
+        raise HTTPException(status_code=409, detail=error_response.model_dump())
@@ -1,101 +1,109 @@
-import random
-from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
 
 from fastapi import HTTPException
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
 
-from app.models import PullRequest, User
+from app.core.config import settings
+from app.core.metrics import track_db_time
 from app.models.pull_request import PRStatus
+from app.repositories import PullRequestRecord, Repository
 from app.schemas.error import ErrorDetail, ErrorResponse
-from app.schemas.pull_request import PullRequestCreate, ReassignPRRequest
+from app.schemas.pull_request import (
+    PullRequestCreate,
+    PullRequestCreateBatchResult,
+    PullRequestCreateResponseItem,
+    ReassignPRRequest,
+)
+from app.services.reviewer_selection import get_strategy
 
 
 class PullRequestService:
     @staticmethod
-    def create_pr(db: Session, pr_data: PullRequestCreate) -> PullRequest:
+    @track_db_time
+    async def create_pr(
+        repo: Repository, pr_data: PullRequestCreate
+    ) -> PullRequestCreateResponseItem:
         """Создать PR и автоматически назначить до 2 ревьюверов из команды автора"""
-        existing_pr = (
-            db.query(PullRequest)
-            .filter(PullRequest.pull_request_id == pr_data.pull_request_id)
-            .first()
-        )
-
-        if existing_pr:
-            error_response = ErrorResponse(
-                error=ErrorDetail(code="PR_EXISTS", message="PR id already exists")
-            )
-            raise HTTPException(status_code=409, detail=error_response.model_dump())
-
-        author = db.query(User).filter(User.user_id == pr_data.author_id).first()
-        if not author:
+        result = await repo.create_pr(pr_data)
+        if result.pr is None:
+            # PR не создан: он уже есть (в том числе создан конкурентно) или нет автора
+            if result.result == "PR_EXISTS":
+                error_response = ErrorResponse(
+                    error=ErrorDetail(code="PR_EXISTS", message="PR id already exists")
+                )
+                raise HTTPException(status_code=409, detail=error_response.model_dump())
             error_response = ErrorResponse(
                 error=ErrorDetail(code="NOT_FOUND", message="resource not found")
             )
             raise HTTPException(status_code=404, detail=error_response.model_dump())
+        return result.pr
 
-        team_members = (
-            db.query(User)
-            .filter(
-                User.team_name == author.team_name,
-                User.user_id != pr_data.author_id,
-                User.is_active == True,
-            )
-            .all()
-        )
-
-        if team_members:
-            reviewers = random.sample(team_members, min(2, len(team_members)))
-            reviewer_ids = [reviewer.user_id for reviewer in reviewers]
-        else:
-            reviewer_ids = []
-        pr = PullRequest(
-            pull_request_id=pr_data.pull_request_id,
-            pull_request_name=pr_data.pull_request_name,
-            author_id=pr_data.author_id,
-            status=PRStatus.OPEN,
-            assigned_reviewers=reviewer_ids,
-        )
-
-        try:
-            db.add(pr)
-            db.commit()
-            db.refresh(pr)
-            return pr
-        except IntegrityError:
-            db.rollback()
-            error_response = ErrorResponse(
-                error=ErrorDetail(code="PR_EXISTS", message="PR id already exists")
-            )
-            raise HTTPException(status_code=409, detail=error_response.model_dump())
+    @staticmethod
+    @track_db_time
+    async def create_batch(
+        repo: Repository, items: Sequence[PullRequestCreate]
+    ) -> List[PullRequestCreateBatchResult]:
+        """
+        Создать пакет PR одной транзакцией; ревьюверы выбираются в памяти
+        по составам команд авторов; результат - по каждому элементу
+        """
+        return await repo.create_batch(items)
 
     @staticmethod
-    def merge_pr(db: Session, pr_id: str) -> PullRequest:
+    @track_db_time
+    async def merge_pr(repo: Repository, pr_id: str) -> PullRequestRecord:
         """Пометить PR как MERGED"""
-        pr = db.query(PullRequest).filter(PullRequest.pull_request_id == pr_id).first()
+        pr = await repo.merge_pr(pr_id)
         if not pr:
             error_response = ErrorResponse(
                 error=ErrorDetail(code="NOT_FOUND", message="resource not found")
             )
             raise HTTPException(status_code=404, detail=error_response.model_dump())
-
-        if pr.status == PRStatus.MERGED:
-            return pr
-        pr.status = PRStatus.MERGED
-        pr.merged_at = datetime.now(timezone.utc)
-
-        db.commit()
-        db.refresh(pr)
         return pr
 
     @staticmethod
-    def reassign_reviewer(db: Session, request: ReassignPRRequest) -> tuple[PullRequest, str]:
-        """Переназначить конкретного ревьювера на другого из команды"""
-        pr = (
-            db.query(PullRequest)
-            .filter(PullRequest.pull_request_id == request.pull_request_id)
-            .first()
+    @track_db_time
+    async def merge_batch(
+        repo: Repository, pr_ids: Sequence[str]
+    ) -> Tuple[List[PullRequestRecord], List[str]]:
+        """
+        Пометить пакет PR как MERGED одной транзакцией; повторный merge ничего не меняет;
+        возвращает кортеж (PR в порядке запроса без повторов, id ненайденных PR)
+        """
+        merged = {pr.pull_request_id: pr for pr in await repo.merge_batch(pr_ids)}
+        requested = list(dict.fromkeys(pr_ids))
+        return (
+            [merged[pr_id] for pr_id in requested if pr_id in merged],
+            [pr_id for pr_id in requested if pr_id not in merged],
+        )
+
+    @staticmethod
+    @track_db_time
+    async def reassign_reviewer(
+        repo: Repository, request: ReassignPRRequest
+    ) -> tuple[PullRequestRecord, str]:
+        """
+        Переназначить конкретного ревьювера на другого из команды;
+        если PR изменился между чтением и записью, проверки и выбор повторяются
+        (не больше PR_UPDATE_ATTEMPTS раз)
+        """
+        for _ in range(settings.PR_UPDATE_ATTEMPTS):
+            result = await PullRequestService._try_reassign(repo, request)
+            if result is not None:
+                return result
+
+        error_response = ErrorResponse(
+            error=ErrorDetail(
+                code="CONCURRENT_UPDATE", message="pull request was modified concurrently"
+            )
         )
+        raise HTTPException(status_code=409, detail=error_response.model_dump())
+
+    @staticmethod
+    async def _try_reassign(
+        repo: Repository, request: ReassignPRRequest
+    ) -> Optional[tuple[PullRequestRecord, str]]:
+        """Одна попытка переназначения; None, если версия PR изменилась после чтения"""
+        pr = await repo.get_pull_request(request.pull_request_id)
 
         if not pr:
             error_response = ErrorResponse(
@@ -116,23 +124,15 @@ class PullRequestService:
             )
             raise HTTPException(status_code=409, detail=error_response.model_dump())
 
-        old_reviewer = db.query(User).filter(User.user_id == request.old_user_id).first()
-        if not old_reviewer:
+        roster = await repo.user_roster(request.old_user_id)
+        if roster is None:
             error_response = ErrorResponse(
                 error=ErrorDetail(code="NOT_FOUND", message="resource not found")
             )
             raise HTTPException(status_code=404, detail=error_response.model_dump())
 
-        available_reviewers = (
-            db.query(User)
-            .filter(
-                User.team_name == old_reviewer.team_name,
-                User.user_id != request.old_user_id,
-                User.user_id.notin_(pr.assigned_reviewers),
-                User.user_id != pr.author_id,
-                User.is_active == True,
-            )
-            .all()
+        available_reviewers = roster.candidates(
+            exclude=[request.old_user_id, pr.author_id, *pr.assigned_reviewers]
         )
 
         if not available_reviewers:
@@ -144,14 +144,11 @@ class PullRequestService:
             )
             raise HTTPException(status_code=409, detail=error_response.model_dump())
 
-        new_reviewer = random.choice(available_reviewers)
+        (new_reviewer_id,) = await get_strategy().choose(repo, available_reviewers, 1)
 
-        reviewers = pr.assigned_reviewers.copy()
-        reviewers.remove(request.old_user_id)
-        reviewers.append(new_reviewer.user_id)
-        pr.assigned_reviewers = reviewers
-
-        db.commit()
-        db.refresh(pr)
-
-        return pr, new_reviewer.user_id
+        updated_pr = await repo.replace_reviewer(
+            request.pull_request_id, request.old_user_id, new_reviewer_id, pr.version
+        )
+        if updated_pr is None:
+            return None
+        return updated_pr, new_reviewer_id
@@ -0,0 +1,188 @@
+import random
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import TYPE_CHECKING, ClassVar, Collection
+from typing import Counter as CounterType
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+from app.core.config import settings
+from app.models.pull_request import PRStatus
+from app.schemas.pull_request import (
+    PullRequestCreate,
+    PullRequestCreateBatchResult,
+    PullRequestCreateResponseItem,
+)
+
+if TYPE_CHECKING:
+    from app.repositories.base import Repository
+
+
+class ReviewerSelectionStrategy(ABC):
+    """
+    Стратегия выбора ревьюверов из кандидатов;
+    order_by - сортировка кандидатов в SQL (users u LEFT JOIN reviewer_stats rs),
+    pick - выбор в памяти по состоянию, загруженному load_state из хранилища
+    """
+
+    name: ClassVar[str]
+    order_by: ClassVar[str]
+
+    async def load_state(self, repo: "Repository", user_ids: Sequence[str]) -> Dict[str, float]:
+        """Ключи сортировки кандидатов по user_id"""
+        return {}
+
+    @abstractmethod
+    def pick(self, candidates: Sequence[str], count: int, state: Dict[str, float]) -> List[str]:
+        """Выбрать до count ревьюверов; state обновляется с учётом выбора"""
+
+    async def choose(self, repo: "Repository", candidates: Sequence[str], count: int) -> List[str]:
+        """Выбрать до count ревьюверов из кандидатов"""
+        state = await self.load_state(repo, candidates)
+        return self.pick(candidates, count, state)
+
+
+class RandomStrategy(ReviewerSelectionStrategy):
+    """Случайные кандидаты"""
+
+    name = "random"
+    order_by = "random()"
+
+    def pick(self, candidates: Sequence[str], count: int, state: Dict[str, float]) -> List[str]:
+        return random.sample(list(candidates), min(count, len(candidates)))
+
+
+class LeastLoadedStrategy(ReviewerSelectionStrategy):
+    """Кандидаты с наименьшим числом назначений в открытых PR, при равенстве - случайные"""
+
+    name = "least_loaded"
+    order_by = "coalesce(rs.open_reviews_count, 0), random()"
+
+    async def load_state(self, repo: "Repository", user_ids: Sequence[str]) -> Dict[str, float]:
+        if not user_ids:
+            return {}
+        counts = await repo.open_review_counts(user_ids)
+        return {user_id: float(count) for user_id, count in counts.items()}
+
+    def pick(self, candidates: Sequence[str], count: int, state: Dict[str, float]) -> List[str]:
+        ordered = sorted(candidates, key=lambda user_id: (state.get(user_id, 0.0), random.random()))
+        chosen = ordered[:count]
+        for user_id in chosen:
+            state[user_id] = state.get(user_id, 0.0) + 1
+        return chosen
+
+
+class RoundRobinStrategy(ReviewerSelectionStrategy):
+    """Кандидаты, которым дольше всех ничего не назначали; ни разу не назначенные - первыми"""
+
+    name = "round_robin"
+    order_by = "rs.last_assigned_at NULLS FIRST, u.user_id"
+
+    async def load_state(self, repo: "Repository", user_ids: Sequence[str]) -> Dict[str, float]:
+        if not user_ids:
+            return {}
+        return await repo.last_assigned_at(user_ids)
+
+    def pick(self, candidates: Sequence[str], count: int, state: Dict[str, float]) -> List[str]:
+        ordered = sorted(candidates, key=lambda user_id: (state.get(user_id, 0.0), user_id))
+        chosen = ordered[:count]
+        # выбранные уходят в конец очереди, в том числе для следующих выборов в этом же вызове
+        latest = max(state.values(), default=0.0) + 1
+        for user_id in chosen:
+            state[user_id] = latest
+        return chosen
+
+
+STRATEGIES: Dict[str, ReviewerSelectionStrategy] = {
+    strategy.name: strategy
+    for strategy in (RandomStrategy(), LeastLoadedStrategy(), RoundRobinStrategy())
+}
+
+
+def get_strategy() -> ReviewerSelectionStrategy:
+    """Стратегия выбора ревьюверов из настроек"""
+    return STRATEGIES[settings.REVIEWER_SELECTION_STRATEGY]
+
+
+def plan_batch(
+    items: Sequence[PullRequestCreate],
+    taken_pr_ids: Collection[str],
+    user_teams: Mapping[str, str],
+    team_candidates: Mapping[str, List[str]],
+    strategy: ReviewerSelectionStrategy,
+    strategy_state: Dict[str, float],
+) -> List[PullRequestCreateBatchResult]:
+    """
+    Результаты пакета PR до вставки: PR_EXISTS для занятых id (повтор id внутри
+    пакета: создаётся первый PR), NOT_FOUND для неизвестных авторов,
+    для остальных - ревьюверы, выбранные стратегией из активных участников команды автора
+    """
+    taken = set(taken_pr_ids)
+    results: List[PullRequestCreateBatchResult] = []
+    for item in items:
+        if item.pull_request_id in taken:
+            result = PullRequestCreateBatchResult(
+                pull_request_id=item.pull_request_id, result="PR_EXISTS"
+            )
+        elif item.author_id not in user_teams:
+            result = PullRequestCreateBatchResult(
+                pull_request_id=item.pull_request_id, result="NOT_FOUND"
+            )
+        else:
+            candidates = [
+                user_id
+                for user_id in team_candidates.get(user_teams[item.author_id], [])
+                if user_id != item.author_id
+            ]
+            pr = PullRequestCreateResponseItem(
+                pull_request_id=item.pull_request_id,
+                pull_request_name=item.pull_request_name,
+                author_id=item.author_id,
+                status=PRStatus.OPEN,
+                assigned_reviewers=sorted(strategy.pick(candidates, 2, strategy_state)),
+            )
+            result = PullRequestCreateBatchResult(
+                pull_request_id=item.pull_request_id, result="CREATED", pr=pr
+            )
+        taken.add(item.pull_request_id)
+        results.append(result)
+    return results
+
+
+def plan_reassignments(
+    user_ids: Sequence[str],
+    pr_authors: Mapping[str, str],
+    pr_reviewers: Mapping[str, List[str]],
+    user_teams: Mapping[str, str],
+    team_candidates: Mapping[str, List[str]],
+    strategy: ReviewerSelectionStrategy,
+    strategy_state: Dict[str, float],
+) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str]], CounterType[str]]:
+    """
+    Выбрать замены деактивируемых ревьюверов в памяти: (pr, старый, новый) ревьювер,
+    снятия без замены и изменения счётчиков назначений
+    """
+    replacements: List[Tuple[str, str, str]] = []
+    removals: List[Tuple[str, str]] = []
+    assignment_deltas: CounterType[str] = Counter()
+    for pull_request_id, assigned in pr_reviewers.items():
+        assigned_set = set(assigned)
+        for user_id in user_ids:
+            if user_id not in assigned_set or user_id not in user_teams:
+                continue
+
+            available_reviewers = [
+                candidate_id
+                for candidate_id in team_candidates.get(user_teams[user_id], [])
+                if candidate_id not in assigned_set and candidate_id != pr_authors[pull_request_id]
+            ]
+            assigned_set.discard(user_id)
+            assignment_deltas[user_id] -= 1
+            if available_reviewers:
+                (new_reviewer_id,) = strategy.pick(available_reviewers, 1, strategy_state)
+                assigned_set.add(new_reviewer_id)
+                assignment_deltas[new_reviewer_id] += 1
+                replacements.append((pull_request_id, user_id, new_reviewer_id))
+            else:
+                removals.append((pull_request_id, user_id))
+
+    return replacements, removals, assignment_deltas
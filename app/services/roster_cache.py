@@ -0,0 +1,177 @@
+import time
+from contextlib import asynccontextmanager
+from itertools import groupby
+from typing import AsyncIterator, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.models import User
+from app.repositories.base import TeamRoster
+
+# канал LISTEN/NOTIFY: пути записи уведомляют об изменении состава команды (payload - team_name)
+ROSTER_CHANNEL = "roster_changed"
+
+
+class RosterCache:
+    """
+    Кэш составов команд в памяти процесса (team_name -> состав, user_id -> team_name);
+    инвалидируется путями записи после коммита, изменения из других процессов
+    приходят уведомлениями (listen), TTL ограничивает устаревание, если уведомление потеряно.
+    Составы из кэша читает только переназначение ревьювера: создание PR выбирает
+    ревьюверов в том же запросе, что и вставка, а createBatch читает составы авторов
+    одним запросом
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._teams: Dict[str, TeamRoster] = {}
+        self._user_teams: Dict[str, str] = {}
+        # номер поколения растёт при каждой инвалидации: загрузка, начатая до инвалидации,
+        # не попадает в кэш, даже если завершилась после неё
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _fresh(self, team_name: str) -> Optional[TeamRoster]:
+        roster = self._teams.get(team_name)
+        if roster is None or time.monotonic() - roster.loaded_at >= self.ttl:
+            return None
+        return roster
+
+    def _store(
+        self, team_name: str, members: Sequence[Tuple[str, bool]], generation: int
+    ) -> TeamRoster:
+        roster = TeamRoster.build(team_name, members)
+        if generation == self._generation and self.ttl > 0:
+            self._drop_team(team_name)
+            self._teams[team_name] = roster
+            for user_id in roster.member_ids:
+                self._user_teams[user_id] = team_name
+        return roster
+
+    async def get_team(self, db: AsyncSession, team_name: str) -> TeamRoster:
+        """Состав команды"""
+        roster = self._fresh(team_name)
+        if roster is not None:
+            self.hits += 1
+            return roster
+
+        self.misses += 1
+        generation = self._generation
+        rows = await db.execute(
+            select(User.user_id, User.is_active)
+            .filter(User.team_name == team_name)
+            .order_by(User.user_id)
+        )
+        return self._store(
+            team_name, [(user_id, is_active) for user_id, is_active in rows], generation
+        )
+
+    async def get_user_roster(self, db: AsyncSession, user_id: str) -> Optional[TeamRoster]:
+        """Состав команды пользователя или None, если пользователь не найден"""
+        team_name = self._user_teams.get(user_id)
+        if team_name is not None:
+            roster = self._fresh(team_name)
+            if roster is not None and user_id in roster.member_ids:
+                self.hits += 1
+                return roster
+
+        self.misses += 1
+        generation = self._generation
+        user_team = select(User.team_name).filter(User.user_id == user_id).scalar_subquery()
+        rows = (
+            await db.execute(
+                select(User.user_id, User.is_active, User.team_name)
+                .filter(User.team_name == user_team)
+                .order_by(User.user_id)
+            )
+        ).all()
+        if not rows:
+            return None
+        return self._store(
+            rows[0].team_name, [(row.user_id, row.is_active) for row in rows], generation
+        )
+
+    async def prime(self, db: AsyncSession) -> int:
+        """Загрузить составы всех команд одним запросом; возвращает число команд"""
+        if self.ttl <= 0:
+            return 0
+
+        generation = self._generation
+        rows = await db.execute(
+            select(User.team_name, User.user_id, User.is_active).order_by(
+                User.team_name, User.user_id
+            )
+        )
+        teams = 0
+        for team_name, members in groupby(rows, key=lambda row: row.team_name):
+            self._store(team_name, [(row.user_id, row.is_active) for row in members], generation)
+            teams += 1
+        return teams
+
+    def _drop_team(self, team_name: str) -> None:
+        roster = self._teams.pop(team_name, None)
+        if roster is None:
+            return
+        for user_id in roster.member_ids:
+            if self._user_teams.get(user_id) == team_name:
+                del self._user_teams[user_id]
+
+    def invalidate_team(self, team_name: str) -> None:
+        """Сбросить состав команды после изменения её участников"""
+        self._generation += 1
+        self.invalidations += 1
+        self._drop_team(team_name)
+
+    def invalidate_users(self, user_ids: Iterable[str]) -> None:
+        """Сбросить составы команд, в которых состоят пользователи"""
+        self._generation += 1
+        for user_id in user_ids:
+            team_name = self._user_teams.get(user_id)
+            if team_name is not None:
+                self.invalidate_team(team_name)
+
+    @asynccontextmanager
+    async def listen(self, engine: AsyncEngine) -> AsyncIterator[None]:
+        """
+        На время контекста сбрасывать составы команд по уведомлениям ROSTER_CHANNEL;
+        занимает одно соединение пула
+        """
+        if self.ttl <= 0:
+            yield
+            return
+
+        def on_notification(connection: object, pid: int, channel: str, team_name: str) -> None:
+            self.invalidate_team(team_name)
+
+        async with engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            driver = raw_connection.driver_connection
+            assert driver is not None
+            await driver.add_listener(ROSTER_CHANNEL, on_notification)
+            try:
+                yield
+            finally:
+                await driver.remove_listener(ROSTER_CHANNEL, on_notification)
+
+    def clear(self) -> None:
+        """Очистить кэш и счётчики"""
+        self._teams.clear()
+        self._user_teams.clear()
+        self._generation += 1
+        self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики попаданий, промахов и инвалидаций"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "teams": len(self._teams),
+        }
+
+
+roster_cache = RosterCache(ttl=settings.ROSTER_CACHE_TTL)
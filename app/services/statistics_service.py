@@ -1,40 +1,28 @@
-from collections import Counter
-from typing import Counter as CounterType
+from typing import Optional
 
-from sqlalchemy.orm import Session
-
-from app.models import PullRequest, User
-from app.models.pull_request import PRStatus
-from app.schemas.statistics import PRStats, StatisticsResponse, UserReviewStats
+from app.core.metrics import track_db_time
+from app.repositories import Repository
+from app.schemas.statistics import StatisticsFilters, StatisticsResponse
 
 
 class StatisticsService:
     @staticmethod
-    def get_statistics(db: Session) -> StatisticsResponse:
-        """Получить статистику по PR и назначениям ревьюверов"""
-        all_prs = db.query(PullRequest).all()
-
-        total_prs = len(all_prs)
-        open_prs = sum(1 for pr in all_prs if pr.status == PRStatus.OPEN)
-        merged_prs = sum(1 for pr in all_prs if pr.status == PRStatus.MERGED)
-
-        pr_stats = PRStats(total_prs=total_prs, open_prs=open_prs, merged_prs=merged_prs)
-
-        reviewer_counts: CounterType[str] = Counter()
-        for pr in all_prs:
-            for reviewer_id in pr.assigned_reviewers:
-                reviewer_counts[reviewer_id] += 1
+    @track_db_time
+    async def get_statistics(
+        repo: Repository, filters: Optional[StatisticsFilters] = None
+    ) -> StatisticsResponse:
+        """
+        Получить статистику по PR и назначениям ревьюверов;
+        без фильтров по PR читаются счётчики, с фильтрами - агрегация по отобранным PR
+        """
+        filters = filters or StatisticsFilters()
+        pr_stats, user_review_stats = await repo.statistics(filters)
+        return StatisticsResponse(
+            pr_stats=pr_stats, user_review_stats=user_review_stats, filters=filters
+        )
 
-        user_review_stats = []
-        for user_id, count in reviewer_counts.items():
-            user = db.query(User).filter(User.user_id == user_id).first()
-            if user:
-                user_review_stats.append(
-                    UserReviewStats(
-                        user_id=user_id, username=user.username, assignments_count=count
-                    )
-                )
-
-        user_review_stats.sort(key=lambda x: x.assignments_count, reverse=True)
-
-        return StatisticsResponse(pr_stats=pr_stats, user_review_stats=user_review_stats)
+    @staticmethod
+    @track_db_time
+    async def rebuild_counters(repo: Repository) -> None:
+        """Пересчитать счётчики статистики по PR и назначениям с нуля"""
+        await repo.rebuild_counters()
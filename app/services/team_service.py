@@ -1,58 +1,148 @@
+from typing import AsyncIterable, AsyncIterator, List, Optional, Tuple
+
 from fastapi import HTTPException
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
 
-from app.models import Team, User
+from app.core.config import settings
+from app.core.metrics import track_db_time
+from app.repositories import Repository, UserRecord
 from app.schemas.error import ErrorDetail, ErrorResponse
-from app.schemas.team import TeamCreate
+from app.schemas.team import TeamCreate, TeamImportResult
+
+
+async def _ndjson_lines(
+    chunks: AsyncIterable[bytes], max_line_bytes: int
+) -> AsyncIterator[Optional[bytes]]:
+    """
+    Строки NDJSON по мере поступления частей тела запроса; разбирается только новая часть,
+    начало незавершённой строки хранится частями. Строка длиннее max_line_bytes
+    не накапливается: её остаток пропускается, вместо строки - None
+    """
+    parts: List[bytes] = []
+    size = 0
+    oversized = False
+    async for chunk in chunks:
+        *lines, tail = chunk.split(b"\n")
+        for line in lines:
+            if oversized or size + len(line) > max_line_bytes:
+                yield None
+            else:
+                yield b"".join(parts) + line
+            parts, size, oversized = [], 0, False
+        if oversized or not tail:
+            continue
+        size += len(tail)
+        if size > max_line_bytes:
+            parts, oversized = [], True
+        else:
+            parts.append(tail)
+    if oversized:
+        yield None
+    elif parts:
+        yield b"".join(parts)
+
+
+def _validation_message(error: ValidationError) -> str:
+    """Первая ошибка валидации строки импорта"""
+    detail = error.errors(include_url=False)[0]
+    location = ".".join(str(part) for part in detail["loc"])
+    return f"{location}: {detail['msg']}" if location else detail["msg"]
 
 
 class TeamService:
     @staticmethod
-    def create_team(db: Session, team_data: TeamCreate) -> Team:
-        """Создать команду с участниками"""
-        existing_team = db.query(Team).filter(Team.team_name == team_data.team_name).first()
-        if existing_team:
-            error_response = ErrorResponse(
-                error=ErrorDetail(code="TEAM_EXISTS", message="team_name already exists")
-            )
-            raise HTTPException(status_code=400, detail=error_response.model_dump())
-
-        team = Team(team_name=team_data.team_name)
-        db.add(team)
-        for member_data in team_data.members:
-            user = db.query(User).filter(User.user_id == member_data.user_id).first()
-            if user:
-                user.username = member_data.username
-                user.team_name = team_data.team_name
-                user.is_active = member_data.is_active
-            else:
-                user = User(
-                    user_id=member_data.user_id,
-                    username=member_data.username,
-                    team_name=team_data.team_name,
-                    is_active=member_data.is_active,
-                )
-                db.add(user)
-
-        try:
-            db.commit()
-            db.refresh(team)
-            return team
-        except IntegrityError:
-            db.rollback()
+    @track_db_time
+    async def create_team(repo: Repository, team_data: TeamCreate) -> List[UserRecord]:
+        """Создать команду с участниками; возвращает участников"""
+        members = await repo.create_team(team_data)
+        if members is None:
             error_response = ErrorResponse(
                 error=ErrorDetail(code="TEAM_EXISTS", message="team_name already exists")
             )
             raise HTTPException(status_code=400, detail=error_response.model_dump())
+        return members
 
     @staticmethod
-    def get_team(db: Session, team_name: str) -> Team:
-        """Получить команду с участниками"""
-        team = db.query(Team).filter(Team.team_name == team_name).first()
-        if not team:
+    @track_db_time
+    async def get_team_version(repo: Repository, team_name: str) -> int:
+        """Версия состава команды (для ETag); 404, если команды нет"""
+        version = await repo.team_version(team_name)
+        if version is None:
             error_response = ErrorResponse(
                 error=ErrorDetail(code="NOT_FOUND", message="resource not found")
             )
             raise HTTPException(status_code=404, detail=error_response.model_dump())
-        return team
+        return version
+
+    @staticmethod
+    @track_db_time
+    async def get_members(repo: Repository, team_name: str) -> List[UserRecord]:
+        """Участники команды"""
+        return await repo.team_members(team_name)
+
+    @staticmethod
+    async def import_teams(
+        repo: Repository, chunks: AsyncIterable[bytes]
+    ) -> List[TeamImportResult]:
+        """
+        Импорт команд из NDJSON (одна команда TeamCreate на строку);
+        команды создаются при отсутствии, участники создаются/обновляются;
+        строки разбираются по мере чтения, запись - транзакциями по
+        TEAM_IMPORT_BATCH_SIZE пользователей; результат - по каждой непустой строке.
+        Время бд учитывается по пачкам (_import_batch), без ожидания тела запроса
+        """
+        results: List[TeamImportResult] = []
+        batch: List[Tuple[TeamImportResult, TeamCreate]] = []
+        batch_users = 0
+        line_number = 0
+        async for line in _ndjson_lines(chunks, settings.TEAM_IMPORT_MAX_LINE_BYTES):
+            line_number += 1
+            if line is None:
+                results.append(
+                    TeamImportResult(
+                        line=line_number,
+                        result="INVALID",
+                        error=f"line exceeds {settings.TEAM_IMPORT_MAX_LINE_BYTES} bytes",
+                    )
+                )
+                continue
+            if not line.strip():
+                continue
+            try:
+                team_data = TeamCreate.model_validate_json(line)
+            except ValidationError as error:
+                results.append(
+                    TeamImportResult(
+                        line=line_number, result="INVALID", error=_validation_message(error)
+                    )
+                )
+                continue
+
+            result = TeamImportResult(
+                line=line_number,
+                team_name=team_data.team_name,
+                result="UPDATED",
+                members=len(team_data.members),
+            )
+            results.append(result)
+            batch.append((result, team_data))
+            batch_users += len(team_data.members)
+            if batch_users >= settings.TEAM_IMPORT_BATCH_SIZE:
+                await TeamService._import_batch(repo, batch)
+                batch, batch_users = [], 0
+
+        if batch:
+            await TeamService._import_batch(repo, batch)
+        return results
+
+    @staticmethod
+    @track_db_time
+    async def _import_batch(
+        repo: Repository, batch: List[Tuple[TeamImportResult, TeamCreate]]
+    ) -> None:
+        """Записать пачку команд и отметить созданные команды в результатах"""
+        created_teams = await repo.import_teams([team_data for _, team_data in batch])
+        for result, team_data in batch:
+            if team_data.team_name in created_teams:
+                result.result = "CREATED"
+                created_teams.discard(team_data.team_name)
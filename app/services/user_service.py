@@ -1,144 +1,111 @@
+import base64
+import binascii
 import json
-import random
-from typing import List, Tuple
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
 
 from fastapi import HTTPException
-from sqlalchemy import or_, text
-from sqlalchemy.orm import Session
 
-from app.models import PullRequest, User
+from app.core.metrics import track_db_time
 from app.models.pull_request import PRStatus
+from app.repositories import Repository, ReviewKey, ReviewRecord, UserRecord
 from app.schemas.error import ErrorDetail, ErrorResponse
-from app.schemas.user import BulkDeactivateRequest, SetIsActiveRequest
-
-
-class UserService:
-    @staticmethod
-    def _reassign_reviewers(db: Session, user_ids: List[str]) -> int:
-        """
-        Метод переназначения ревьюверов в открытых PR
-        для одного или нескольких пользователей.
-        Возвращает количество PR, где были переназначены ревьюверы
-        """
-        if not user_ids:
-            return 0
-
-        conditions = []
-        for user_id in user_ids:
-            user_id_json = json.dumps([user_id])
-            conditions.append(text(f"assigned_reviewers::jsonb @> '{user_id_json}'::jsonb"))
-
-        open_prs = (
-            db.query(PullRequest)
-            .filter(
-                PullRequest.status == PRStatus.OPEN,
-                or_(*conditions) if conditions else text("1=0"),
-            )
-            .all()
+from app.schemas.user import USER_REVIEWS_DEFAULT_LIMIT, BulkDeactivateRequest, SetIsActiveRequest
+
+
+def encode_review_cursor(pr_created_at: datetime, pull_request_id: str) -> str:
+    """Курсор страницы PR ревьювера: ключ последнего PR страницы"""
+    payload = json.dumps([pr_created_at.isoformat(), pull_request_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_review_cursor(cursor: str) -> ReviewKey:
+    """
+    Ключ (pr_created_at, pull_request_id) из курсора; 400 для некорректного курсора
+    и для времени без часового пояса (сервис выдаёт курсоры только с ним)
+    """
+    try:
+        pr_created_at, pull_request_id = json.loads(base64.urlsafe_b64decode(cursor))
+        created_at = datetime.fromisoformat(pr_created_at)
+        if created_at.tzinfo is None:
+            raise ValueError("cursor time without time zone")
+        return created_at, str(pull_request_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        error_response = ErrorResponse(
+            error=ErrorDetail(code="INVALID_CURSOR", message="invalid pagination cursor")
         )
-        if not open_prs:
-            return 0
-
-        users_dict = {
-            user.user_id: user for user in db.query(User).filter(User.user_id.in_(user_ids)).all()
-        }
-
-        reassigned_count = 0
-        for pr in open_prs:
-            deactivating_reviewers = [
-                user_id
-                for user_id in user_ids
-                if user_id in pr.assigned_reviewers and user_id in users_dict
-            ]
-            if not deactivating_reviewers:
-                continue
-
-            for user_id in deactivating_reviewers:
-                user = users_dict[user_id]
-                available_reviewers = (
-                    db.query(User)
-                    .filter(
-                        User.team_name == user.team_name,
-                        User.user_id != user_id,
-                        User.user_id.notin_(pr.assigned_reviewers),
-                        User.user_id != pr.author_id,
-                        User.user_id.notin_(user_ids),
-                        User.is_active == True,
-                    )
-                    .all()
-                )
+        raise HTTPException(status_code=400, detail=error_response.model_dump())
 
-                if available_reviewers:
-                    new_reviewer = random.choice(available_reviewers)
-                    reviewers = pr.assigned_reviewers.copy()
-                    reviewers.remove(user_id)
-                    reviewers.append(new_reviewer.user_id)
-                    pr.assigned_reviewers = reviewers
-                    reassigned_count += 1
-                else:
-                    reviewers = pr.assigned_reviewers.copy()
-                    if user_id in reviewers:
-                        reviewers.remove(user_id)
-                        pr.assigned_reviewers = reviewers
-                        reassigned_count += 1
-
-        return reassigned_count
 
+class UserService:
     @staticmethod
-    def set_is_active(db: Session, request: SetIsActiveRequest) -> Tuple[User, int]:
+    @track_db_time
+    async def set_is_active(
+        repo: Repository, request: SetIsActiveRequest
+    ) -> Tuple[UserRecord, int]:
         """
         Установить флаг активности пользователя;
         при деактивации переназначаются ревьюверы в открытых PR;
         возвращает кортеж (пользователь, количество переназначенных PR)
         """
-        user = db.query(User).filter(User.user_id == request.user_id).first()
-        if not user:
+        result = await repo.set_is_active(request.user_id, request.is_active)
+        if result is None:
             error_response = ErrorResponse(
                 error=ErrorDetail(code="NOT_FOUND", message="resource not found")
             )
             raise HTTPException(status_code=404, detail=error_response.model_dump())
+        return result
 
-        reassigned_count = 0
-        if not request.is_active and user.is_active:
-            reassigned_count = UserService._reassign_reviewers(db, [request.user_id])
-
-        user.is_active = request.is_active
-        db.commit()
-        db.refresh(user)
-        return user, reassigned_count
+    @staticmethod
+    @track_db_time
+    async def get_reviews_version(repo: Repository, user_id: str) -> Optional[int]:
+        """Версия PR пользователя как ревьювера (для ETag) или None, если назначений не было"""
+        return await repo.reviews_version(user_id)
 
     @staticmethod
-    def get_user_reviews(db: Session, user_id: str) -> list[PullRequest]:
-        """Получить PR'ы, где пользователь назначен ревьювером"""
+    @track_db_time
+    async def get_user_reviews(
+        repo: Repository,
+        user_id: str,
+        status: Optional[PRStatus] = None,
+        limit: int = USER_REVIEWS_DEFAULT_LIMIT,
+        cursor: Optional[str] = None,
+        user_exists: bool = False,
+    ) -> Tuple[Sequence[ReviewRecord], Optional[str]]:
+        """
+        Получить страницу PR, где пользователь назначен ревьювером, от новых к старым;
+        keyset-пагинация по (pr_created_at, pull_request_id) идёт по индексу,
+        поэтому стоимость страницы не зависит от истории пользователя;
+        user_exists - вызывающий уже знает, что пользователь есть, проверка пропускается;
+        возвращает кортеж (PR страницы, курсор следующей страницы или None)
+        """
+        after = decode_review_cursor(cursor) if cursor is not None else None
 
-        user = db.query(User).filter(User.user_id == user_id).first()
-        if not user:
+        if not user_exists and not await repo.user_exists(user_id):
             error_response = ErrorResponse(
                 error=ErrorDetail(code="NOT_FOUND", message="resource not found")
             )
             raise HTTPException(status_code=404, detail=error_response.model_dump())
 
-        user_id_json = json.dumps([user_id])
-        prs = (
-            db.query(PullRequest)
-            .filter(text(f"assigned_reviewers::jsonb @> '{user_id_json}'::jsonb"))
-            .all()
-        )
+        # лишняя строка показывает, есть ли следующая страница
+        rows = await repo.user_reviews(user_id, status, limit + 1, after)
 
-        return prs
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        return rows[:limit], encode_review_cursor(last.pr_created_at, last.pull_request_id)
 
     @staticmethod
-    def bulk_deactivate(db: Session, request: BulkDeactivateRequest) -> Tuple[List[User], int]:
+    @track_db_time
+    async def bulk_deactivate(
+        repo: Repository, request: BulkDeactivateRequest
+    ) -> Tuple[List[UserRecord], int]:
         """
         Массовая деактивация пользователей команды;
         переназначаются ревьюверы в открытых PR для всех деактивируемых пользователей;
         возвращает кортеж (список деактивированных пользователей, количество переназначенных PR)
         """
-        users = (
-            db.query(User)
-            .filter(User.team_name == request.team_name, User.user_id.in_(request.user_ids))
-            .all()
-        )
+        users, reassigned_count = await repo.deactivate_users(request.team_name, request.user_ids)
 
         if len(users) != len(request.user_ids):
             found_user_ids = {user.user_id for user in users}
@@ -151,18 +118,4 @@ class UserService:
             )
             raise HTTPException(status_code=404, detail=error_response.model_dump())
 
-        active_user_ids = [user.user_id for user in users if user.is_active]
-
-        total_reassigned_count = 0
-
-        if active_user_ids:
-            total_reassigned_count = UserService._reassign_reviewers(db, active_user_ids)
-
-        for user in users:
-            user.is_active = False
-
-        db.commit()
-        for user in users:
-            db.refresh(user)
-
-        return users, total_reassigned_count
+        return users, reassigned_count
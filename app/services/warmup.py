@@ -0,0 +1,95 @@
+"""
+Прогрев воркера после старта: соединения пула и кэш составов команд.
+Прогрев идёт в фоне, пока он не завершён, /ready отвечает 503
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Optional, cast
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.metrics import WARMUP_DURATION
+from app.services.roster_cache import roster_cache
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Готовность воркера принимать нагрузку: прогрев завершён"""
+
+    def __init__(self):
+        self.ready = False
+        self.warmup_seconds: Optional[float] = None
+
+    def set_ready(self, warmup_seconds: float) -> None:
+        self.ready = True
+        self.warmup_seconds = warmup_seconds
+        WARMUP_DURATION.set(warmup_seconds)
+
+    def reset(self) -> None:
+        self.ready = False
+        self.warmup_seconds = None
+
+
+readiness = Readiness()
+
+
+async def open_connections(engine: AsyncEngine, count: int) -> None:
+    """Открыть count соединений пула одновременно и вернуть их в пул"""
+    async with AsyncExitStack() as stack:
+        connections = await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(count))
+        )
+        for connection in connections:
+            await connection.execute(text("SELECT 1"))
+
+
+async def warm_up(engine: AsyncEngine) -> None:
+    """
+    Открыть DB_WARMUP_CONNECTIONS соединений (не больше свободных мест в пуле)
+    и загрузить составы команд (ROSTER_CACHE_WARMUP); ошибка прогрева не мешает
+    готовности - запросы откроют соединения и загрузят составы сами
+    """
+    started = time.perf_counter()
+    # соединение подписки roster_cache уже занято: прогрев сверх остатка пула ждал бы
+    # DB_POOL_TIMEOUT, удерживая открытые соединения
+    pool = cast(QueuePool, engine.pool)
+    free = pool.size() - pool.checkedout()
+    try:
+        await open_connections(engine, max(min(settings.DB_WARMUP_CONNECTIONS, free), 0))
+        if settings.ROSTER_CACHE_WARMUP:
+            async with AsyncSession(engine) as db:
+                teams = await roster_cache.prime(db)
+            logger.info("Roster cache primed with %d teams", teams)
+    except Exception:
+        logger.exception("Warm-up failed")
+    readiness.set_ready(time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def warming_up(engine: Optional[AsyncEngine]) -> AsyncIterator[None]:
+    """
+    На время контекста: прогрев в фоне и готовность после него;
+    engine=None (хранилище в памяти) - прогревать нечего, воркер готов сразу
+    """
+    task = None
+    if engine is None:
+        readiness.set_ready(0.0)
+    else:
+        task = asyncio.create_task(warm_up(engine))
+    try:
+        yield
+    finally:
+        readiness.reset()
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
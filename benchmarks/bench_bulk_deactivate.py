@@ -0,0 +1,179 @@
+"""
+Бенчмарк массовой деактивации:
+python -m benchmarks.bench_bulk_deactivate [--prs 5000]
+
+Сравнивает прежнее переназначение (запрос кандидатов на каждый PR и ревьювера,
+refresh каждого пользователя) с переназначением по множествам
+(один запрос PR, один запрос составов команд, один UPDATE).
+Каждый прогон выполняется в транзакции, которая откатывается после замера.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Awaitable, Callable
+from typing import Counter as CounterType
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.models import PRReviewer, PRStatus, PullRequest, User
+from app.repositories import UserRecord
+from app.repositories.postgres import PostgresRepository
+from app.schemas.user import BulkDeactivateRequest
+from app.services.user_service import UserService
+from benchmarks.common import drop_schema, make_engine, print_report, reset_schema, seed, summarize
+
+BulkDeactivate = Callable[
+    [AsyncSession, BulkDeactivateRequest], Awaitable[Tuple[Sequence[UserRecord], int]]
+]
+
+
+async def legacy_reassign_reviewers(db: AsyncSession, user_ids: List[str]) -> int:
+    """Переназначение с запросом кандидатов на каждый PR и ревьювера (как до переделки)"""
+    reviewed_pr_ids = select(PRReviewer.pull_request_id).filter(
+        PRReviewer.reviewer_id.in_(user_ids)
+    )
+    open_prs = (
+        await db.scalars(
+            select(PullRequest).filter(
+                PullRequest.pull_request_id.in_(reviewed_pr_ids),
+                PullRequest.status == PRStatus.OPEN,
+            )
+        )
+    ).all()
+    users = (await db.scalars(select(User).filter(User.user_id.in_(user_ids)))).all()
+    users_dict = {user.user_id: user for user in users}
+
+    reassigned_count = 0
+    assignment_deltas: CounterType[str] = Counter()
+    for pr in open_prs:
+        for user_id in [user_id for user_id in user_ids if user_id in pr.assigned_reviewers]:
+            available_reviewers = (
+                await db.scalars(
+                    select(User).filter(
+                        User.team_name == users_dict[user_id].team_name,
+                        User.user_id != user_id,
+                        User.user_id.notin_(list(pr.assigned_reviewers)),
+                        User.user_id != pr.author_id,
+                        User.user_id.notin_(user_ids),
+                        User.is_active.is_(True),
+                    )
+                )
+            ).all()
+            pr.assigned_reviewers.remove(user_id)
+            assignment_deltas[user_id] -= 1
+            if available_reviewers:
+                new_reviewer = random.choice(available_reviewers)
+                pr.assigned_reviewers.append(new_reviewer.user_id)
+                assignment_deltas[new_reviewer.user_id] += 1
+            reassigned_count += 1
+
+    await PostgresRepository(db).change_assignment_counts(assignment_deltas)
+    return reassigned_count
+
+
+async def legacy_bulk_deactivate(
+    db: AsyncSession, request: BulkDeactivateRequest
+) -> Tuple[List[User], int]:
+    """bulk_deactivate до переделки (без проверок)"""
+    users = (
+        await db.scalars(
+            select(User).filter(
+                User.team_name == request.team_name, User.user_id.in_(request.user_ids)
+            )
+        )
+    ).all()
+    reassigned_count = await legacy_reassign_reviewers(
+        db, [user.user_id for user in users if user.is_active]
+    )
+    for user in users:
+        user.is_active = False
+    await db.commit()
+    for user in users:
+        await db.refresh(user)
+    return list(users), reassigned_count
+
+
+async def set_based_bulk_deactivate(
+    db: AsyncSession, request: BulkDeactivateRequest
+) -> Tuple[List[UserRecord], int]:
+    """bulk_deactivate сервиса (переназначение по множествам) в сессии db"""
+    return await UserService.bulk_deactivate(PostgresRepository(db), request)
+
+
+async def measure_rolled_back(
+    engine: AsyncEngine,
+    bulk_deactivate: BulkDeactivate,
+    request: BulkDeactivateRequest,
+    repeat: int,
+) -> Tuple[Dict[str, float], int]:
+    """Замер вызова в транзакции, откатываемой после каждого прогона, мс"""
+    timings = []
+    reassigned_count = 0
+    for _ in range(repeat):
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            db = AsyncSession(
+                bind=connection,
+                autoflush=False,
+                expire_on_commit=False,
+                join_transaction_mode="create_savepoint",
+            )
+            started = time.perf_counter()
+            _, reassigned_count = await bulk_deactivate(db, request)
+            timings.append((time.perf_counter() - started) * 1000)
+            await db.close()
+            await transaction.rollback()
+    return summarize(timings), reassigned_count
+
+
+async def main(prs: int, teams: int, users_per_team: int, repeat: int) -> None:
+    engine = make_engine()
+    await reset_schema(engine)
+    dataset = await seed(
+        engine, teams=teams, users_per_team=users_per_team, prs=prs, open_ratio=1.0
+    )
+
+    members = dataset.teams["team_0"]
+    scenarios = {
+        "1 пользователь": members[:1],
+        f"{users_per_team // 2} пользователей": members[: users_per_team // 2],
+        f"{users_per_team - 2} пользователей": members[: users_per_team - 2],
+    }
+    implementations: Dict[str, BulkDeactivate] = {
+        "прежний": legacy_bulk_deactivate,
+        "по множествам": set_based_bulk_deactivate,
+    }
+
+    results = {}
+    for scenario, user_ids in scenarios.items():
+        request = BulkDeactivateRequest(team_name="team_0", user_ids=user_ids)
+        for name, bulk_deactivate in implementations.items():
+            result, reassigned_count = await measure_rolled_back(
+                engine, bulk_deactivate, request, repeat
+            )
+            results[f"{scenario}, {name} ({reassigned_count} замен)"] = result
+
+    await drop_schema(engine)
+    await engine.dispose()
+
+    print_report(
+        f"/users/bulkDeactivate: {prs} открытых PR, {teams * users_per_team} пользователей",
+        results,
+        note=f"Деактивация в team_0 ({users_per_team} участников), "
+        "время вызова UserService без HTTP",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prs", type=int, default=5_000)
+    parser.add_argument("--teams", type=int, default=5)
+    parser.add_argument("--users-per-team", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.prs, args.teams, args.users_per_team, args.repeat))
@@ -0,0 +1,155 @@
+"""
+Обращения к таблицам под профилем locustfile.py с условными GET и без них:
+python -m benchmarks.bench_conditional_get [--users 100] [--duration 60]
+
+Для каждого режима схема пересоздаётся, поднимается uvicorn и запускается locust
+(LOCUST_CONDITIONAL_GET=1/0). Обращения к таблицам - приращение seq_scan + idx_scan
+в pg_stat_user_tables за прогон; ответы по эндпоинтам и статусам - из access log uvicorn.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from pathlib import Path
+from typing import Counter as CounterType
+from typing import Dict, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.common import BENCH_DATABASE_URL, drop_schema, make_engine, reset_schema
+
+TABLES = ("teams", "users", "pull_requests", "pr_reviewers", "reviewer_stats", "pr_counters")
+ENDPOINTS = ("/team/get", "/users/getReview")
+ACCESS_LOG_LINE = re.compile(r'"(?:GET|POST) (?P<path>[^ ?]+)[^"]*" (?P<status>\d{3})')
+
+
+async def table_scans(engine: AsyncEngine) -> Dict[str, int]:
+    """seq_scan + idx_scan по таблицам приложения"""
+    async with engine.connect() as connection:
+        rows = await connection.execute(
+            text(
+                "SELECT relname, coalesce(seq_scan, 0) + coalesce(idx_scan, 0) "
+                "FROM pg_stat_user_tables WHERE relname = ANY(:tables)"
+            ),
+            {"tables": list(TABLES)},
+        )
+        return {relname: int(scans) for relname, scans in rows}
+
+
+def wait_for_app(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{url}/health")
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("app did not start")
+
+
+def responses(access_log: str) -> CounterType[Tuple[str, str]]:
+    """Число ответов по (эндпоинт, статус) из access log uvicorn"""
+    counts: CounterType[Tuple[str, str]] = Counter()
+    for match in ACCESS_LOG_LINE.finditer(access_log):
+        counts[(match["path"], match["status"])] += 1
+    return counts
+
+
+def run_locust(url: str, users: int, duration: int, conditional: bool, env: Dict[str, str]):
+    subprocess.run(
+        [
+            "locust",
+            "-f",
+            "locustfile.py",
+            "--host",
+            url,
+            "--headless",
+            "-u",
+            str(users),
+            "-r",
+            str(users),
+            "-t",
+            f"{duration}s",
+            "--only-summary",
+        ],
+        env={**env, "LOCUST_CONDITIONAL_GET": "1" if conditional else "0"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+
+
+async def run(
+    conditional: bool, users: int, duration: int, port: int
+) -> Tuple[CounterType[Tuple[str, str]], Dict[str, int]]:
+    engine = make_engine()
+    await reset_schema(engine)
+    before = await table_scans(engine)
+
+    url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "DATABASE_URL": str(BENCH_DATABASE_URL)}
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = Path(directory) / "access.log"
+        with open(log_path, "w") as log_file:
+            app = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+                env=env,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+            try:
+                wait_for_app(url)
+                run_locust(url, users, duration, conditional, env)
+            finally:
+                app.terminate()
+                app.wait()
+        counts = responses(log_path.read_text())
+
+    # статистика таблиц сбрасывается процессами бд не чаще раза в секунду
+    await asyncio.sleep(2)
+    after = await table_scans(engine)
+    await drop_schema(engine)
+    await engine.dispose()
+    return counts, {table: after[table] - before.get(table, 0) for table in TABLES}
+
+
+async def main(users: int, duration: int, port: int) -> None:
+    results = {}
+    for conditional in (False, True):
+        results[conditional] = await run(conditional, users, duration, port)
+
+    print("\n### Условные GET под профилем locustfile.py\n")
+    print(f"{users} пользователей locust, {duration} s на режим\n")
+    print("| Показатель | без If-None-Match | с If-None-Match |")
+    print("|---|---|---|")
+    totals = {conditional: sum(counts.values()) for conditional, (counts, _) in results.items()}
+    print(f"| всего запросов | {totals[False]} | {totals[True]} |")
+    for endpoint in ENDPOINTS:
+        for status in ("200", "304"):
+            print(
+                f"| {endpoint} {status} | {results[False][0][(endpoint, status)]} "
+                f"| {results[True][0][(endpoint, status)]} |"
+            )
+    for table in TABLES:
+        cells = [
+            f"{scans[table]} ({scans[table] / max(1, totals[conditional]):.2f})"
+            for conditional, (_, scans) in results.items()
+        ]
+        print(f"| обращений к {table} (на запрос) | {cells[0]} | {cells[1]} |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=int, default=60)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.duration, args.port))
@@ -0,0 +1,273 @@
+"""
+Бенчмарк конкурентных переназначений:
+python -m benchmarks.bench_contention [--clients 50] [--operations 20] [--hot-prs 10]
+
+Много клиентов одновременно переназначают ревьюверов одних и тех же PR: клиент читает
+текущих ревьюверов случайного PR и просит заменить одного из них, а с долей
+--deactivate-ratio вместо этого деактивирует ревьювера (переназначение во всех его
+открытых PR) и сразу активирует обратно. Сравнивается прежняя
+замена (ревьюверы читаются и записываются без блокировок и проверки версии) с заменой
+по версии PR (compare-and-swap с повторами). Для каждой реализации схема заполняется
+заново; после прогона проверяется число ревьюверов PR и счётчики назначений.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import warnings
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError, SAWarning
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import PRReviewer, PRStatus, PullRequest
+from app.repositories.postgres import PostgresRepository
+from app.schemas.pull_request import ReassignPRRequest
+from app.schemas.user import SetIsActiveRequest
+from app.services.pull_request_service import PullRequestService
+from app.services.roster_cache import roster_cache
+from app.services.user_service import UserService
+from benchmarks.common import (
+    drop_schema,
+    make_engine,
+    make_sessionmaker,
+    reset_schema,
+    seed,
+    summarize,
+)
+
+Reassign = Callable[[AsyncSession, ReassignPRRequest], Awaitable[object]]
+
+# пользователи, у которых assignments_count не совпадает с числом их строк pr_reviewers
+COUNTER_MISMATCHES = text(
+    """
+    SELECT count(*)
+    FROM reviewer_stats s
+    FULL JOIN (
+        SELECT reviewer_id, count(*) AS assignments FROM pr_reviewers GROUP BY reviewer_id
+    ) r ON r.reviewer_id = s.user_id
+    WHERE coalesce(s.assignments_count, 0) <> coalesce(r.assignments, 0)
+    """
+)
+
+# число ревьюверов по PR
+REVIEWER_COUNTS = text(
+    "SELECT pull_request_id, count(*) FROM pr_reviewers GROUP BY pull_request_id"
+)
+
+
+def conflict(code: str) -> HTTPException:
+    return HTTPException(status_code=409, detail={"error": {"code": code, "message": code}})
+
+
+async def legacy_reassign(db: AsyncSession, request: ReassignPRRequest) -> object:
+    """reassign_reviewer до версий PR: изменённая копия ревьюверов записывается без проверки"""
+    pr = await db.get(PullRequest, request.pull_request_id)
+    assert pr is not None
+    if pr.status == PRStatus.MERGED:
+        raise conflict("PR_MERGED")
+    if request.old_user_id not in pr.assigned_reviewers:
+        raise conflict("NOT_ASSIGNED")
+    roster = await roster_cache.get_user_roster(db, request.old_user_id)
+    assert roster is not None
+    candidates = roster.candidates(
+        exclude=[request.old_user_id, pr.author_id, *pr.assigned_reviewers]
+    )
+    if not candidates:
+        raise conflict("NO_CANDIDATE")
+    new_reviewer_id = random.choice(candidates)
+    pr.assigned_reviewers.remove(request.old_user_id)
+    pr.assigned_reviewers.append(new_reviewer_id)
+    await PostgresRepository(db).change_assignment_counts(
+        {request.old_user_id: -1, new_reviewer_id: 1}
+    )
+    await db.commit()
+    return pr
+
+
+async def cas_reassign(db: AsyncSession, request: ReassignPRRequest) -> object:
+    """reassign_reviewer сервиса: замена по версии PR с повторами"""
+    return await PullRequestService.reassign_reviewer(PostgresRepository(db), request)
+
+
+async def toggle_active(db: AsyncSession, user_id: str) -> None:
+    """Деактивировать пользователя с переназначением его PR и активировать обратно"""
+    repo = PostgresRepository(db)
+    await UserService.set_is_active(repo, SetIsActiveRequest(user_id=user_id, is_active=False))
+    await UserService.set_is_active(repo, SetIsActiveRequest(user_id=user_id, is_active=True))
+
+
+async def run_client(
+    session_factory: async_sessionmaker,
+    reassign: Reassign,
+    hot_prs: List[str],
+    operations: int,
+    deactivate_ratio: float,
+    rng: random.Random,
+    outcomes: Counter,
+    db_errors: Counter,
+    timings: List[float],
+) -> None:
+    """
+    Клиент: operations раз прочитать ревьюверов случайного PR и заменить одного
+    или деактивировать его; время записывается только для успешных замен
+    """
+    for _ in range(operations):
+        pr_id = rng.choice(hot_prs)
+        async with session_factory() as db:
+            reviewers = (
+                await db.scalars(
+                    select(PRReviewer.reviewer_id).filter(PRReviewer.pull_request_id == pr_id)
+                )
+            ).all()
+            await db.commit()
+            reviewer_id = rng.choice(reviewers)
+            started = time.perf_counter()
+            try:
+                if rng.random() < deactivate_ratio:
+                    await toggle_active(db, reviewer_id)
+                    outcomes["DEACTIVATED"] += 1
+                    continue
+                await reassign(
+                    db, ReassignPRRequest(pull_request_id=pr_id, old_user_id=reviewer_id)
+                )
+            except HTTPException as error:
+                detail: Any = error.detail
+                outcomes[detail["error"]["code"]] += 1
+                continue
+            except DBAPIError as error:
+                # исключение драйвера (DeadlockDetectedError, UniqueViolationError ...)
+                db_errors[type(error.orig.__cause__ if error.orig else error).__name__] += 1
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+            outcomes["OK"] += 1
+
+
+async def run(
+    reassign: Reassign,
+    clients: int,
+    operations: int,
+    deactivate_ratio: float,
+    hot: int,
+    seed_args: Dict,
+) -> Tuple[Counter, Counter, List[float], float, Dict[str, int]]:
+    """Прогон клиентов на заново заполненной схеме; результаты и проверки данных"""
+    roster_cache.clear()
+    engine = make_engine(pool_size=clients)
+    await reset_schema(engine)
+    dataset = await seed(engine, **seed_args)
+    hot_prs = dataset.open_prs[:hot]
+    session_factory = make_sessionmaker(engine)
+
+    outcomes: Counter = Counter()
+    db_errors: Counter = Counter()
+    timings: List[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_client(
+                session_factory,
+                reassign,
+                hot_prs,
+                operations,
+                deactivate_ratio,
+                random.Random(index),
+                outcomes,
+                db_errors,
+                timings,
+            )
+            for index in range(clients)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    async with engine.connect() as connection:
+        reviewer_counts = dict((await connection.execute(REVIEWER_COUNTS)).tuples().all())
+        checks = {
+            "PR с другим числом ревьюверов": sum(
+                reviewer_counts.get(pr_id, 0) != len(dataset.reviewers[pr_id])
+                for pr_id in dataset.open_prs
+            ),
+            "расхождения счётчиков": (await connection.execute(COUNTER_MISMATCHES)).scalar_one(),
+        }
+    await drop_schema(engine)
+    await engine.dispose()
+    return outcomes, db_errors, timings, elapsed, checks
+
+
+def format_counts(counts: Counter) -> str:
+    return ", ".join(f"{name} {count}" for name, count in sorted(counts.items())) or "0"
+
+
+async def main(
+    clients: int,
+    operations: int,
+    deactivate_ratio: float,
+    hot: int,
+    teams: int,
+    users_per_team: int,
+) -> None:
+    # прежняя замена удаляет строку, которую уже удалил конкурент: SQLAlchemy только
+    # предупреждает об этом, расхождение видно в проверках после прогона
+    warnings.filterwarnings("ignore", category=SAWarning)
+    seed_args = {
+        "teams": teams,
+        "users_per_team": users_per_team,
+        "prs": hot * 5,
+        "open_ratio": 1.0,
+    }
+    implementations: Dict[str, Reassign] = {
+        "прежняя (без версии)": legacy_reassign,
+        "по версии PR (CAS)": cas_reassign,
+    }
+
+    print(
+        f"\n### Конкурентные переназначения: {clients} клиентов по {operations} операций "
+        f"(деактивации - {deactivate_ratio:.0%}), {hot} общих PR, "
+        f"команды по {users_per_team} участников\n"
+    )
+    print(
+        "| Реализация | операций/s | замен | деактиваций | median замены, ms | p95, ms "
+        "| отказы 409 | ошибки бд | PR с другим числом ревьюверов | расхождения счётчиков |"
+    )
+    print("|---|---|---|---|---|---|---|---|---|---|")
+    for name, reassign in implementations.items():
+        outcomes, db_errors, timings, elapsed, checks = await run(
+            reassign, clients, operations, deactivate_ratio, hot, seed_args
+        )
+        succeeded = outcomes.pop("OK", 0)
+        deactivated = outcomes.pop("DEACTIVATED", 0)
+        result = summarize(timings) if timings else {"median": 0.0, "p95": 0.0}
+        print(
+            f"| {name} | {clients * operations / elapsed:.0f} | {succeeded} | {deactivated} | "
+            f"{result['median']:.2f} | {result['p95']:.2f} | {format_counts(outcomes)} | "
+            f"{format_counts(db_errors)} | {checks['PR с другим числом ревьюверов']} | "
+            f"{checks['расхождения счётчиков']} |"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--operations", type=int, default=20, help="операций на клиента")
+    parser.add_argument(
+        "--deactivate-ratio", type=float, default=0.1, help="доля деактиваций среди операций"
+    )
+    parser.add_argument("--hot-prs", type=int, default=10, help="PR, которые меняют все клиенты")
+    parser.add_argument("--teams", type=int, default=2)
+    parser.add_argument("--users-per-team", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.clients,
+            args.operations,
+            args.deactivate_ratio,
+            args.hot_prs,
+            args.teams,
+            args.users_per_team,
+        )
+    )
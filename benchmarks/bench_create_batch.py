@@ -0,0 +1,84 @@
+"""
+Бенчмарк пакетного создания PR:
+python -m benchmarks.bench_create_batch [--prs 5000]
+
+Сравнивает пропускную способность create_pr по одному PR
+с create_batch пакетами разного размера.
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from typing import Dict, List
+
+from app.repositories.postgres import PostgresRepository
+from app.schemas.pull_request import PullRequestCreate
+from app.services.pull_request_service import PullRequestService
+from benchmarks.common import drop_schema, make_engine, make_sessionmaker, reset_schema, seed
+
+
+async def main(prs: int, teams: int, users_per_team: int, batch_sizes: List[int]) -> None:
+    engine = make_engine()
+    await reset_schema(engine)
+    dataset = await seed(engine, teams=teams, users_per_team=users_per_team, prs=10_000)
+    session_factory = make_sessionmaker(engine)
+    authors = dataset.user_ids
+    pr_ids = (f"bench_pr_{index}" for index in itertools.count())
+
+    def new_prs(count: int) -> List[PullRequestCreate]:
+        return [
+            PullRequestCreate(
+                pull_request_id=next(pr_ids),
+                pull_request_name="Benchmark",
+                author_id=random.choice(authors),
+            )
+            for _ in range(count)
+        ]
+
+    results: Dict[str, Dict[str, float]] = {}
+
+    started = time.perf_counter()
+    for pr_data in new_prs(prs):
+        async with session_factory() as db:
+            await PullRequestService.create_pr(PostgresRepository(db), pr_data)
+    elapsed = time.perf_counter() - started
+    results["create по одному"] = {"elapsed": elapsed, "batch": elapsed / prs * 1000}
+
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        for _ in range(prs // batch_size):
+            async with session_factory() as db:
+                batch_results = await PullRequestService.create_batch(
+                    PostgresRepository(db), new_prs(batch_size)
+                )
+                assert all(result.result == "CREATED" for result in batch_results)
+        elapsed = time.perf_counter() - started
+        results[f"createBatch по {batch_size}"] = {
+            "elapsed": elapsed,
+            "batch": elapsed / (prs // batch_size) * 1000,
+        }
+
+    await drop_schema(engine)
+    await engine.dispose()
+
+    print(f"\n### Создание {prs} PR: {teams * users_per_team} пользователей\n")
+    print("Время вызовов сервиса без HTTP, одна сессия и транзакция на вызов\n")
+    print("| Сценарий | всего, s | на вызов, ms | PR/s |")
+    print("|---|---|---|---|")
+    for name, result in results.items():
+        print(
+            f"| {name} | {result['elapsed']:.2f} | {result['batch']:.2f} "
+            f"| {prs / result['elapsed']:.0f} |"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prs", type=int, default=5000)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--users-per-team", type=int, default=10)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    asyncio.run(main(args.prs, args.teams, args.users_per_team, args.batch_sizes))
@@ -0,0 +1,158 @@
+"""
+Бенчмарк создания PR:
+python -m benchmarks.bench_create_pr [--repeat 500]
+
+Сравнивает прежние варианты create_pr (проверка PR, автор, кандидаты, вставка + refresh;
+кандидаты из кэша составов команд) с созданием одним запросом
+(CTE с INSERT ... ON CONFLICT DO NOTHING).
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+from typing import Callable, Dict, List
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.models import PRStatus, PullRequest, User
+from app.repositories.postgres import PostgresRepository
+from app.schemas.pull_request import PullRequestCreate
+from app.services.pull_request_service import PullRequestService
+from app.services.roster_cache import roster_cache
+from benchmarks.common import (
+    drop_schema,
+    make_engine,
+    make_sessionmaker,
+    measure,
+    print_report,
+    reset_schema,
+    seed,
+)
+
+
+async def legacy_create_pr(db: AsyncSession, pr_data: PullRequestCreate) -> PullRequest:
+    """create_pr до перехода на один запрос (без обработки ошибок)"""
+    assert await db.get(PullRequest, pr_data.pull_request_id) is None
+    author = await db.get(User, pr_data.author_id)
+    assert author is not None
+    team_members = (
+        await db.scalars(
+            select(User).filter(
+                User.team_name == author.team_name,
+                User.user_id != pr_data.author_id,
+                User.is_active.is_(True),
+            )
+        )
+    ).all()
+    reviewer_ids = [
+        reviewer.user_id for reviewer in random.sample(team_members, min(2, len(team_members)))
+    ]
+    pr = PullRequest(
+        pull_request_id=pr_data.pull_request_id,
+        pull_request_name=pr_data.pull_request_name,
+        author_id=pr_data.author_id,
+        status=PRStatus.OPEN,
+        assigned_reviewers=reviewer_ids,
+    )
+    db.add(pr)
+    repo = PostgresRepository(db)
+    await repo.change_pr_counters(total=1, opened=1)
+    await repo.change_assignment_counts({reviewer_id: 1 for reviewer_id in reviewer_ids})
+    await db.commit()
+    await db.refresh(pr)
+    return pr
+
+
+async def cached_create_pr(db: AsyncSession, pr_data: PullRequestCreate) -> PullRequest:
+    """create_pr с кандидатами из кэша составов команд (без обработки ошибок)"""
+    roster = await roster_cache.get_user_roster(db, pr_data.author_id)
+    assert roster is not None
+    candidates = roster.candidates(exclude=[pr_data.author_id])
+    reviewer_ids = random.sample(candidates, min(2, len(candidates)))
+    pr = PullRequest(
+        pull_request_id=pr_data.pull_request_id,
+        pull_request_name=pr_data.pull_request_name,
+        author_id=pr_data.author_id,
+        status=PRStatus.OPEN,
+        assigned_reviewers=reviewer_ids,
+    )
+    db.add(pr)
+    repo = PostgresRepository(db)
+    await repo.change_pr_counters(total=1, opened=1)
+    await repo.change_assignment_counts({reviewer_id: 1 for reviewer_id in reviewer_ids})
+    await db.commit()
+    await db.refresh(pr)
+    return pr
+
+
+async def cte_create_pr(db: AsyncSession, pr_data: PullRequestCreate) -> object:
+    """create_pr сервиса (один запрос CTE) в сессии db"""
+    return await PullRequestService.create_pr(PostgresRepository(db), pr_data)
+
+
+def count_statements(engine: AsyncEngine) -> Callable[[], int]:
+    """Счётчик запросов, отправленных в бд через движок"""
+    statements = itertools.count()
+
+    def on_execute(*args: object) -> None:
+        next(statements)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    return lambda: next(statements)
+
+
+async def main(repeat: int, teams: int, users_per_team: int, prs: int) -> None:
+    engine = make_engine()
+    await reset_schema(engine)
+    dataset = await seed(engine, teams=teams, users_per_team=users_per_team, prs=prs)
+    session_factory = make_sessionmaker(engine)
+    next_statement = count_statements(engine)
+    authors = dataset.user_ids
+    pr_ids = (f"bench_pr_{index}" for index in itertools.count())
+
+    def new_pr() -> PullRequestCreate:
+        return PullRequestCreate(
+            pull_request_id=next(pr_ids),
+            pull_request_name="Benchmark",
+            author_id=random.choice(authors),
+        )
+
+    implementations = {
+        "по шагам, без кэша": legacy_create_pr,
+        "по шагам, кэш составов команд": cached_create_pr,
+        "один запрос (CTE)": cte_create_pr,
+    }
+    results: Dict[str, Dict[str, float]] = {}
+    statements: List[str] = []
+    for name, create_pr in implementations.items():
+
+        async def create_one() -> None:
+            async with session_factory() as db:
+                await create_pr(db, new_pr())
+
+        results[name] = await measure(create_one, repeat=repeat, warmup=20)
+        before = next_statement()
+        await create_one()
+        statements.append(f"{name}: {next_statement() - before - 1}")
+
+    await drop_schema(engine)
+    await engine.dispose()
+
+    print_report(
+        f"/pullRequest/create: {prs} PR, {teams * users_per_team} пользователей",
+        results,
+        note="Время вызова create_pr с новой сессией, без HTTP. "
+        "Запросов к бд без BEGIN/COMMIT: " + "; ".join(statements),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--users-per-team", type=int, default=10)
+    parser.add_argument("--prs", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat, args.teams, args.users_per_team, args.prs))
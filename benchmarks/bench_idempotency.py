@@ -0,0 +1,121 @@
+"""
+Бенчмарк повторов POST запросов:
+python -m benchmarks.bench_idempotency [--requests 200] [--retries 5]
+
+Клиент отправляет --requests запросов /pullRequest/create, /pullRequest/merge или
+/pullRequest/reassign и повторяет каждый --retries раз, как после таймаута. Без ключа
+повтор выполняется заново; с заголовком Idempotency-Key ответ берётся из хранилища.
+Считаются запросы к бд первых запросов и повторов, время и ответы повторов.
+Приложение вызывается в процессе (httpx.ASGITransport) на бд BENCH_DATABASE_URL.
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+from sqlalchemy import event
+
+from app.database.base import get_db
+from app.main import app
+from app.services.roster_cache import roster_cache
+from benchmarks.common import (
+    Dataset,
+    drop_schema,
+    make_engine,
+    make_sessionmaker,
+    reset_schema,
+    seed,
+    summarize,
+)
+
+# тело запроса по номеру: разные запросы - разные PR
+Payload = Callable[[Dataset, int], Dict[str, Any]]
+
+ENDPOINTS: Dict[str, Payload] = {
+    "/pullRequest/create": lambda dataset, index: {
+        "pull_request_id": f"retry_{index}",
+        "pull_request_name": "Retry",
+        "author_id": dataset.user_ids[index % len(dataset.user_ids)],
+    },
+    "/pullRequest/merge": lambda dataset, index: {"pull_request_id": dataset.open_prs[index]},
+    "/pullRequest/reassign": lambda dataset, index: {
+        "pull_request_id": dataset.open_prs[index],
+        "old_user_id": dataset.reviewers[dataset.open_prs[index]][0],
+    },
+}
+
+
+async def run(
+    path: str, payload: Payload, with_key: bool, requests: int, retries: int
+) -> Tuple[Counter, List[float], Counter]:
+    """Запросы с повторами; запросы к бд по фазам (first, retry), время и статусы повторов"""
+    roster_cache.clear()
+    engine = make_engine(pool_size=2)
+    await reset_schema(engine)
+    dataset = await seed(engine, teams=20, users_per_team=10, prs=requests, open_ratio=1.0)
+    session_factory = make_sessionmaker(engine)
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    statements: Counter = Counter()
+    phase = "first"
+
+    def count(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements[phase] += 1
+
+    app.dependency_overrides[get_db] = override_get_db
+    event.listen(engine.sync_engine, "after_cursor_execute", count)
+    timings: List[float] = []
+    statuses: Counter = Counter()
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for index in range(requests):
+                body = payload(dataset, index)
+                headers = {"Idempotency-Key": f"key-{index}"} if with_key else {}
+                phase = "first"
+                await client.post(path, json=body, headers=headers)
+                phase = "retry"
+                for _ in range(retries):
+                    started = time.perf_counter()
+                    response = await client.post(path, json=body, headers=headers)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    statuses[response.status_code] += 1
+    finally:
+        event.remove(engine.sync_engine, "after_cursor_execute", count)
+        app.dependency_overrides.clear()
+        await drop_schema(engine)
+        await engine.dispose()
+    return statements, timings, statuses
+
+
+async def main(requests: int, retries: int) -> None:
+    print(f"\n### Повторы POST: {requests} запросов, каждый повторён {retries} раз\n")
+    print(
+        "| Запрос | Idempotency-Key | запросов к бд на первый запрос | на повтор "
+        "| повтор median, ms | p95, ms | ответы на повторы |"
+    )
+    print("|---|---|---|---|---|---|---|")
+    for path, payload in ENDPOINTS.items():
+        for with_key in (False, True):
+            statements, timings, statuses = await run(path, payload, with_key, requests, retries)
+            result = summarize(timings)
+            answers = ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items()))
+            print(
+                f"| {path} | {'да' if with_key else 'нет'} | {statements['first'] / requests:.1f} "
+                f"| {statements['retry'] / len(timings):.1f} "
+                f"| {result['median']:.2f} | {result['p95']:.2f} | {answers} |"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=5, help="повторов каждого запроса")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.retries))
@@ -0,0 +1,80 @@
+"""
+Бенчмарк пакетного merge PR:
+python -m benchmarks.bench_merge_batch [--prs 2000] [--batch-sizes 50 500]
+
+Сравнивает merge_pr по одному PR с merge_batch пакетами разного размера:
+время и число запросов к бд на PR, сессия и транзакция на вызов.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from sqlalchemy import event
+
+from app.repositories.postgres import PostgresRepository
+from app.services.pull_request_service import PullRequestService
+from benchmarks.common import drop_schema, make_engine, make_sessionmaker, reset_schema, seed
+
+
+async def main(prs: int, batch_sizes: List[int]) -> None:
+    engine = make_engine()
+    await reset_schema(engine)
+    # открытых PR хватает на каждый сценарий
+    dataset = await seed(
+        engine, teams=50, users_per_team=10, prs=prs * (len(batch_sizes) + 1), open_ratio=1.0
+    )
+    session_factory = make_sessionmaker(engine)
+    open_prs = iter(dataset.open_prs)
+    statements = 0
+
+    def count(conn, cursor, statement, parameters, context, executemany) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "after_cursor_execute", count)
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        statements = 0
+        started = time.perf_counter()
+        for _ in range(prs):
+            async with session_factory() as db:
+                await PullRequestService.merge_pr(PostgresRepository(db), next(open_prs))
+        elapsed = time.perf_counter() - started
+        results["merge по одному"] = {"elapsed": elapsed, "statements": statements}
+
+        for batch_size in batch_sizes:
+            statements = 0
+            started = time.perf_counter()
+            for _ in range(prs // batch_size):
+                pr_ids = [next(open_prs) for _ in range(batch_size)]
+                async with session_factory() as db:
+                    merged, not_found = await PullRequestService.merge_batch(
+                        PostgresRepository(db), pr_ids
+                    )
+                    assert len(merged) == batch_size and not not_found
+            elapsed = time.perf_counter() - started
+            results[f"mergeBatch по {batch_size}"] = {"elapsed": elapsed, "statements": statements}
+    finally:
+        event.remove(engine.sync_engine, "after_cursor_execute", count)
+        await drop_schema(engine)
+        await engine.dispose()
+
+    print(f"\n### Merge {prs} открытых PR\n")
+    print("Время вызовов сервиса без HTTP, одна сессия и транзакция на вызов\n")
+    print("| Сценарий | всего, s | PR/s | запросов к бд на PR |")
+    print("|---|---|---|---|")
+    for name, result in results.items():
+        print(
+            f"| {name} | {result['elapsed']:.2f} | {prs / result['elapsed']:.0f} "
+            f"| {result['statements'] / prs:.3f} |"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prs", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[50, 500])
+    args = parser.parse_args()
+    asyncio.run(main(args.prs, args.batch_sizes))
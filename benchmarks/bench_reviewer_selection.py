@@ -0,0 +1,146 @@
+"""
+Симуляция стратегий выбора ревьюверов:
+python -m benchmarks.bench_reviewer_selection [--operations 3000]
+
+Для каждой стратегии схема заполняется одинаковыми данными, затем выполняется поток
+создания PR (случайный автор) и merge случайного открытого PR. Печатается нагрузка
+ревьюверов (назначения в открытых PR) и время создания PR и переназначения.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.models import PRReviewer, PRStatus, PullRequest, ReviewerStats, User
+from app.repositories.postgres import PostgresRepository
+from app.schemas.pull_request import PullRequestCreate, ReassignPRRequest
+from app.services.pull_request_service import PullRequestService
+from app.services.reviewer_selection import STRATEGIES
+from app.services.roster_cache import roster_cache
+from benchmarks.common import (
+    drop_schema,
+    make_engine,
+    make_sessionmaker,
+    reset_schema,
+    seed,
+    summarize,
+)
+
+
+async def simulate(strategy: str, operations: int, merge_ratio: float, seed_args: Dict) -> Dict:
+    """Прогон потока операций с заданной стратегией"""
+    settings.REVIEWER_SELECTION_STRATEGY = strategy  # type: ignore[assignment]
+    roster_cache.clear()
+    engine = make_engine()
+    await reset_schema(engine)
+    dataset = await seed(engine, **seed_args)
+    session_factory = make_sessionmaker(engine)
+    rng = random.Random(7)
+    open_prs = list(dataset.open_prs)
+    authors = dataset.user_ids
+
+    create_timings: List[float] = []
+    reassign_timings: List[float] = []
+    for index in range(operations):
+        async with session_factory() as db:
+            if open_prs and rng.random() < merge_ratio:
+                pr_id = open_prs.pop(rng.randrange(len(open_prs)))
+                await PullRequestService.merge_pr(PostgresRepository(db), pr_id)
+                continue
+
+            pr_data = PullRequestCreate(
+                pull_request_id=f"sim_pr_{index}",
+                pull_request_name="Simulation",
+                author_id=rng.choice(authors),
+            )
+            started = time.perf_counter()
+            pr = await PullRequestService.create_pr(PostgresRepository(db), pr_data)
+            create_timings.append((time.perf_counter() - started) * 1000)
+            open_prs.append(pr.pull_request_id)
+
+            if pr.assigned_reviewers and index % 10 == 0:
+                request = ReassignPRRequest(
+                    pull_request_id=pr.pull_request_id, old_user_id=pr.assigned_reviewers[0]
+                )
+                started = time.perf_counter()
+                try:
+                    await PullRequestService.reassign_reviewer(PostgresRepository(db), request)
+                except HTTPException:
+                    continue
+                reassign_timings.append((time.perf_counter() - started) * 1000)
+
+    async with session_factory() as db:
+        load = dict(
+            (
+                await db.execute(
+                    select(User.user_id, func.count(PRReviewer.reviewer_id))
+                    .outerjoin(PRReviewer, PRReviewer.reviewer_id == User.user_id)
+                    .outerjoin(
+                        PullRequest,
+                        PullRequest.pull_request_id == PRReviewer.pull_request_id,
+                    )
+                    .filter(
+                        (PullRequest.status == PRStatus.OPEN) | PRReviewer.reviewer_id.is_(None)
+                    )
+                    .group_by(User.user_id)
+                )
+            ).all()
+        )
+        loads = [load.get(user_id, 0) for user_id in authors]
+        tracked = dict(
+            (
+                await db.execute(select(ReviewerStats.user_id, ReviewerStats.open_reviews_count))
+            ).all()
+        )
+        assert all(tracked.get(user_id, 0) == load.get(user_id, 0) for user_id in authors)
+
+    await drop_schema(engine)
+    await engine.dispose()
+    return {
+        "max": max(loads),
+        "mean": statistics.fmean(loads),
+        "stdev": statistics.pstdev(loads),
+        "create": summarize(create_timings),
+        "reassign": summarize(reassign_timings),
+    }
+
+
+async def main(operations: int, merge_ratio: float, teams: int, users_per_team: int, prs: int):
+    seed_args = {"teams": teams, "users_per_team": users_per_team, "prs": prs}
+    results = {
+        name: await simulate(name, operations, merge_ratio, seed_args) for name in STRATEGIES
+    }
+
+    print(
+        f"\n### Стратегии выбора ревьюверов: {teams * users_per_team} пользователей, "
+        f"{prs} PR в начале, {operations} операций (merge - {merge_ratio:.0%})\n"
+    )
+    print(
+        "| Стратегия | max нагрузка | mean нагрузка | stdev | create median, ms | create p95, ms "
+        "| reassign median, ms |"
+    )
+    print("|---|---|---|---|---|---|---|")
+    for name, result in results.items():
+        print(
+            f"| {name} | {result['max']} | {result['mean']:.2f} | {result['stdev']:.2f} "
+            f"| {result['create']['median']:.2f} | {result['create']['p95']:.2f} "
+            f"| {result['reassign']['median']:.2f} |"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--operations", type=int, default=3000)
+    parser.add_argument("--merge-ratio", type=float, default=0.45)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--users-per-team", type=int, default=10)
+    parser.add_argument("--prs", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.operations, args.merge_ratio, args.teams, args.users_per_team, args.prs))
@@ -0,0 +1,121 @@
+"""
+Микробенчмарк сериализации ответов:
+python -m benchmarks.bench_serialization [--members 200] [--prs 1000]
+
+Сравнивает процессорное время на один ответ: прежний путь (model_validate из объекта ORM,
+повторная валидация по response_model в FastAPI и JSONResponse) и сериализаторы
+app.schemas.serializers с FastJSONResponse. Бд не нужна: объекты ORM создаются в памяти.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from pydantic import BaseModel
+
+from app.core.responses import FastJSONResponse
+from app.main import app
+from app.models import PRStatus, PullRequest, Team, User
+from app.schemas import serializers
+from app.schemas.pull_request import PullRequestShort
+from app.schemas.team import TeamResponse
+from app.schemas.user import UserReviewResponse
+from benchmarks.common import print_report, summarize
+
+
+def route(path: str) -> APIRoute:
+    return next(
+        candidate
+        for candidate in app.routes
+        if isinstance(candidate, APIRoute) and candidate.path == path
+    )
+
+
+async def legacy_response(path: str, model: BaseModel) -> bytes:
+    """Ответ через response_model маршрута, как FastAPI обрабатывает возвращённую модель"""
+    content = await serialize_response(
+        field=route(path).secure_cloned_response_field, response_content=model
+    )
+    return JSONResponse(content).body
+
+
+def cpu_time(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Процессорное время одного вызова, мс"""
+    for _ in range(10):
+        fn()
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        timings.append((time.process_time() - started) * 1000)
+    return summarize(timings)
+
+
+def main(members: int, prs: int, repeat: int) -> None:
+    team = Team(
+        team_name="backend",
+        members=[
+            User(user_id=f"u{index}", username=f"User {index}", team_name="backend", is_active=True)
+            for index in range(members)
+        ],
+    )
+    pull_requests = [
+        PullRequest(
+            pull_request_id=f"pr-{index}",
+            pull_request_name=f"Feature {index}",
+            author_id="u0",
+            status=PRStatus.OPEN if index % 2 else PRStatus.MERGED,
+        )
+        for index in range(prs)
+    ]
+    loop = asyncio.new_event_loop()
+
+    def legacy_team() -> bytes:
+        return loop.run_until_complete(
+            legacy_response("/team/get", TeamResponse.model_validate(team))
+        )
+
+    def legacy_reviews() -> bytes:
+        model = UserReviewResponse(
+            user_id="u1",
+            pull_requests=[PullRequestShort.model_validate(pr) for pr in pull_requests],
+        )
+        return loop.run_until_complete(legacy_response("/users/getReview", model))
+
+    def fast_team() -> bytes:
+        return FastJSONResponse(serializers.team(team.team_name, team.members)).body
+
+    def fast_reviews() -> bytes:
+        return FastJSONResponse(
+            {
+                "user_id": "u1",
+                "pull_requests": [serializers.pull_request_short(pr) for pr in pull_requests],
+                "next_cursor": None,
+            }
+        ).body
+
+    results = {
+        f"/team/get, {members} участников, прежний": cpu_time(legacy_team, repeat),
+        f"/team/get, {members} участников, сериализатор": cpu_time(fast_team, repeat),
+        f"/users/getReview, {prs} PR, прежний": cpu_time(legacy_reviews, repeat),
+        f"/users/getReview, {prs} PR, сериализатор": cpu_time(fast_reviews, repeat),
+    }
+    loop.close()
+
+    print_report(
+        "Сериализация ответа",
+        results,
+        note="Процессорное время построения тела ответа из объектов ORM в памяти",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--prs", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.members, args.prs, args.repeat)
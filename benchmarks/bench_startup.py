@@ -0,0 +1,169 @@
+"""
+Бенчмарк запуска воркера:
+python -m benchmarks.bench_startup [--repeat 5] [--burst 20]
+
+Сервис python -m app.commands.serve с одним воркером запускается на заполненной бд
+(BENCH_DATABASE_URL) с разными настройками старта. Замеряется время от запуска процесса
+до ответа /health и до готовности /ready, затем время ответа первой волны из --burst
+одновременных запросов (GET /team/get, GET /users/getReview, POST /pullRequest/reassign)
+и следующей такой же волны. Значения - медианы по --repeat запускам.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import (
+    BENCH_DATABASE_URL,
+    Dataset,
+    drop_schema,
+    make_engine,
+    reset_schema,
+    seed,
+)
+
+CONFIGS: Dict[str, Dict[str, str]] = {
+    "прежний: create_all, без прогрева": {
+        "DB_CREATE_SCHEMA": "true",
+        "DB_WARMUP_CONNECTIONS": "0",
+        "ROSTER_CACHE_WARMUP": "false",
+    },
+    "без create_all, без прогрева": {
+        "DB_CREATE_SCHEMA": "false",
+        "DB_WARMUP_CONNECTIONS": "0",
+        "ROSTER_CACHE_WARMUP": "false",
+    },
+    "без create_all, прогрев": {
+        "DB_CREATE_SCHEMA": "false",
+        "DB_WARMUP_CONNECTIONS": "20",
+        "ROSTER_CACHE_WARMUP": "true",
+    },
+}
+
+
+async def wait_status(
+    client: httpx.AsyncClient, process: subprocess.Popen, path: str, timeout: float = 60
+) -> None:
+    """Дождаться ответа 200 на path"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app.commands.serve exited with code {process.returncode}")
+        try:
+            if (await client.get(path)).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.01)
+    raise RuntimeError(f"{path} did not respond")
+
+
+async def timed(client: httpx.AsyncClient, method: str, path: str, **kwargs) -> float:
+    """Время ответа на запрос, мс"""
+    started = time.perf_counter()
+    response = await client.request(method, path, **kwargs)
+    elapsed = (time.perf_counter() - started) * 1000
+    assert response.status_code < 500, f"{path}: {response.status_code} {response.text}"
+    return elapsed
+
+
+async def burst(client: httpx.AsyncClient, dataset: Dataset, size: int, offset: int) -> List[float]:
+    """size одновременных запросов; переназначения - в разных PR, начиная с offset"""
+    teams = list(dataset.teams)
+    user_ids = dataset.user_ids
+    requests = []
+    for index in range(size):
+        if index % 3 == 0:
+            team_name = teams[index % len(teams)]
+            requests.append(timed(client, "GET", "/team/get", params={"team_name": team_name}))
+        elif index % 3 == 1:
+            user_id = user_ids[index % len(user_ids)]
+            requests.append(timed(client, "GET", "/users/getReview", params={"user_id": user_id}))
+        else:
+            pr_id = dataset.open_prs[offset + index]
+            payload = {"pull_request_id": pr_id, "old_user_id": dataset.reviewers[pr_id][0]}
+            requests.append(timed(client, "POST", "/pullRequest/reassign", json=payload))
+    return list(await asyncio.gather(*requests))
+
+
+async def start_once(
+    overrides: Dict[str, str], burst_size: int, port: int
+) -> Tuple[float, float, List[float], List[float]]:
+    """Запуск сервиса: до /health, до /ready, первая и следующая волны запросов"""
+    engine = make_engine()
+    await reset_schema(engine)
+    dataset = await seed(engine, teams=20, users_per_team=10, prs=1000, open_ratio=1.0)
+    await engine.dispose()
+
+    env = {
+        **os.environ,
+        **overrides,
+        "DATABASE_URL": str(BENCH_DATABASE_URL),
+        "STORAGE_BACKEND": "postgres",
+        "APP_HOST": "127.0.0.1",
+        "APP_PORT": str(port),
+        "APP_WORKERS": "1",
+    }
+    limits = httpx.Limits(max_connections=burst_size, max_keepalive_connections=burst_size)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.commands.serve"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30
+        ) as client:
+            await wait_status(client, process, "/health")
+            live = (time.perf_counter() - started) * 1000
+            await wait_status(client, process, "/ready")
+            ready = (time.perf_counter() - started) * 1000
+            first = await burst(client, dataset, burst_size, offset=0)
+            second = await burst(client, dataset, burst_size, offset=burst_size)
+    finally:
+        process.terminate()
+        process.wait()
+        await drop_schema(engine)
+        await engine.dispose()
+    return live, ready, first, second
+
+
+async def main(repeat: int, burst_size: int, port: int) -> None:
+    print(
+        f"\n### Запуск воркера: до готовности и первые {burst_size} одновременных запросов "
+        f"(медианы по {repeat} запускам)\n"
+    )
+    print(
+        "| Запуск | до /health, ms | до /ready, ms | первая волна median, ms | max, ms "
+        "| следующая волна median, ms | max, ms |"
+    )
+    print("|---|---|---|---|---|---|---|")
+    for name, overrides in CONFIGS.items():
+        runs = [await start_once(overrides, burst_size, port) for _ in range(repeat)]
+        median = statistics.median
+        print(
+            f"| {name} | {median([run[0] for run in runs]):.0f} "
+            f"| {median([run[1] for run in runs]):.0f} "
+            f"| {median([statistics.median(run[2]) for run in runs]):.1f} "
+            f"| {median([max(run[2]) for run in runs]):.1f} "
+            f"| {median([statistics.median(run[3]) for run in runs]):.1f} "
+            f"| {median([max(run[3]) for run in runs]):.1f} |"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--burst", type=int, default=20, help="одновременных запросов в волне")
+    parser.add_argument("--port", type=int, default=8092)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat, args.burst, args.port))
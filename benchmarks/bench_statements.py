@@ -0,0 +1,170 @@
+"""
+Бенчмарк подготовленных запросов:
+python -m benchmarks.bench_statements [--calls 2000] [--max-ids 100]
+
+Запросы чтения горячего пути выполняются --calls раз (сессия на вызов, одно соединение)
+с кэшем подготовленных запросов соединения (DB_STATEMENT_CACHE_SIZE) и без него (0):
+без кэша каждый запрос заново разбирается и планируется сервером. Время планирования
+запроса на сервере - из EXPLAIN (SUMMARY). Отдельно сравниваются условия по списку
+пользователей случайной длины 1..--max-ids: IN (...) даёт свой текст запроса на каждую
+длину списка, = ANY(...) - один текст.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+from sqlalchemy import event, select
+
+from app.core.config import settings
+from app.models import ReviewerStats
+from app.repositories.postgres import PostgresRepository, any_of
+from benchmarks.common import (
+    Dataset,
+    drop_schema,
+    make_engine,
+    make_sessionmaker,
+    reset_schema,
+    seed,
+    summarize,
+)
+
+# вызов запроса: репозиторий, данные, генератор случайных чисел, --max-ids
+Call = Callable[[PostgresRepository, Dataset, random.Random, int], Awaitable[object]]
+
+QUERIES: Dict[str, Call] = {
+    "user_exists": lambda repo, dataset, rng, max_ids: repo.user_exists(
+        rng.choice(dataset.user_ids)
+    ),
+    "team_members": lambda repo, dataset, rng, max_ids: repo.team_members(
+        rng.choice(list(dataset.teams))
+    ),
+    "reviews_version": lambda repo, dataset, rng, max_ids: repo.reviews_version(
+        rng.choice(dataset.user_ids)
+    ),
+    "user_reviews": lambda repo, dataset, rng, max_ids: repo.user_reviews(
+        rng.choice(dataset.user_ids), None, 21, None
+    ),
+    "open_review_counts": lambda repo, dataset, rng, max_ids: repo.open_review_counts(
+        rng.sample(dataset.user_ids, rng.randint(1, max_ids))
+    ),
+}
+
+LIST_CONDITIONS: Dict[str, Callable[[List[str]], Any]] = {
+    "IN (...)": lambda user_ids: ReviewerStats.user_id.in_(user_ids),
+    "= ANY(...)": lambda user_ids: ReviewerStats.user_id == any_of(user_ids),
+}
+
+
+def list_query(condition: Callable[[List[str]], Any]) -> Call:
+    """Запрос open_review_counts с условием по списку condition"""
+
+    async def call(repo: PostgresRepository, dataset: Dataset, rng: random.Random, max_ids: int):
+        user_ids = rng.sample(dataset.user_ids, rng.randint(1, max_ids))
+        query = select(ReviewerStats.user_id, ReviewerStats.open_reviews_count).filter(
+            condition(user_ids)
+        )
+        return (await repo.db.execute(query)).all()
+
+    return call
+
+
+async def run(
+    dataset: Dataset, call: Call, cache_size: int, calls: int, max_ids: int
+) -> Tuple[Dict[str, float], Set[str]]:
+    """calls вызовов на одном соединении; время вызова и разные тексты запросов"""
+    engine = make_engine(pool_size=1, statement_cache_size=cache_size)
+    session_factory = make_sessionmaker(engine)
+    statements: Set[str] = set()
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.add(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    rng = random.Random(42)
+    timings = []
+    try:
+        for _ in range(calls):
+            started = time.perf_counter()
+            async with session_factory() as db:
+                await call(PostgresRepository(db), dataset, rng, max_ids)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        await engine.dispose()
+    return summarize(timings), statements
+
+
+async def planning_time(dataset: Dataset, call: Call, max_ids: int, samples: int = 50) -> float:
+    """Среднее время планирования запросов вызова на сервере (EXPLAIN SUMMARY), мс"""
+    engine = make_engine(pool_size=1)
+    captured: List[Tuple[str, Any]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        captured.append((statement, parameters))
+
+    rng = random.Random(7)
+    async with make_sessionmaker(engine)() as db:
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        for _ in range(samples):
+            await call(PostgresRepository(db), dataset, rng, max_ids)
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+        total = 0.0
+        connection = await db.connection()
+        for statement, parameters in captured:
+            result = await connection.exec_driver_sql(
+                "EXPLAIN (SUMMARY, FORMAT JSON) " + statement, parameters
+            )
+            document = result.scalar_one()
+            plan = (json.loads(document) if isinstance(document, str) else document)[0]
+            total += plan["Planning Time"]
+    await engine.dispose()
+    return total / samples
+
+
+async def main(calls: int, max_ids: int) -> None:
+    engine = make_engine()
+    await reset_schema(engine)
+    dataset = await seed(engine, teams=100, users_per_team=10, prs=20000)
+    cache_size = settings.DB_STATEMENT_CACHE_SIZE
+    try:
+        print(f"\n### Подготовленные запросы: {calls} вызовов каждого запроса\n")
+        print(
+            "| Запрос | разных текстов | планирование на сервере, ms "
+            f"| без кэша median, ms | p95, ms | кэш {cache_size} median, ms | p95, ms |"
+        )
+        print("|---|---|---|---|---|---|---|")
+        for name, call in QUERIES.items():
+            planning = await planning_time(dataset, call, max_ids)
+            uncached, statements = await run(dataset, call, 0, calls, max_ids)
+            cached, _ = await run(dataset, call, cache_size, calls, max_ids)
+            print(
+                f"| {name} | {len(statements)} | {planning:.3f} "
+                f"| {uncached['median']:.3f} | {uncached['p95']:.3f} "
+                f"| {cached['median']:.3f} | {cached['p95']:.3f} |"
+            )
+
+        print(f"\n### Условие по списку из 1..{max_ids} пользователей: {calls} вызовов\n")
+        print("| Условие | кэш | разных текстов | median, ms | p95, ms |")
+        print("|---|---|---|---|---|")
+        for name, condition in LIST_CONDITIONS.items():
+            for size in (0, cache_size):
+                result, statements = await run(dataset, list_query(condition), size, calls, max_ids)
+                print(
+                    f"| {name} | {size} | {len(statements)} "
+                    f"| {result['median']:.3f} | {result['p95']:.3f} |"
+                )
+    finally:
+        await drop_schema(engine)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--max-ids", type=int, default=100, help="наибольшая длина списка")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.max_ids))
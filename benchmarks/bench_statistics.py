@@ -0,0 +1,91 @@
+"""
+Бенчмарк /statistics на 100k PR:
+python -m benchmarks.bench_statistics [--prs 100000]
+
+Сравнивает прежний подсчёт в Python (все PR в память + запрос на ревьювера)
+со счётчиками и агрегацией GROUP BY в бд.
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import PRStatus, PullRequest, User
+from app.repositories.postgres import PostgresRepository
+from app.schemas.statistics import StatisticsFilters
+from app.services.statistics_service import StatisticsService
+from benchmarks.common import (
+    drop_schema,
+    make_engine,
+    make_sessionmaker,
+    measure,
+    print_report,
+    reset_schema,
+    seed,
+)
+
+
+async def python_side_statistics(db: AsyncSession) -> int:
+    """Подсчёт статистики в Python поверх ORM объектов (как до счётчиков)"""
+    all_prs = (await db.scalars(select(PullRequest))).all()
+    reviewer_counts: Counter = Counter()
+    for pr in all_prs:
+        for reviewer_id in pr.assigned_reviewers:
+            reviewer_counts[reviewer_id] += 1
+    for user_id in reviewer_counts:
+        await db.get(User, user_id)
+    db.expunge_all()
+    return len(all_prs)
+
+
+async def main(prs: int, teams: int, users_per_team: int) -> None:
+    engine = make_engine()
+    await reset_schema(engine)
+    await seed(engine, teams=teams, users_per_team=users_per_team, prs=prs)
+    session_factory = make_sessionmaker(engine)
+    now = datetime.now(timezone.utc)
+
+    scenarios = {
+        "без фильтров (счётчики)": StatisticsFilters(),
+        "без фильтров, limit=10": StatisticsFilters(limit=10),
+        "team_name": StatisticsFilters(team_name="team_7"),
+        "status=OPEN": StatisticsFilters(status=PRStatus.OPEN),
+        "status=OPEN, limit=10": StatisticsFilters(status=PRStatus.OPEN, limit=10),
+        "created_at за 30 дней": StatisticsFilters(created_from=now - timedelta(days=30)),
+        "merged_at за 7 дней, limit=10": StatisticsFilters(
+            merged_from=now - timedelta(days=7), limit=10
+        ),
+    }
+
+    results = {}
+    async with session_factory() as db:
+        results["подсчёт в Python (ORM + N+1)"] = await measure(
+            lambda: python_side_statistics(db), repeat=2, warmup=0
+        )
+        for name, filters in scenarios.items():
+            results[name] = await measure(
+                partial(StatisticsService.get_statistics, PostgresRepository(db), filters)
+            )
+
+    await drop_schema(engine)
+    await engine.dispose()
+
+    print_report(
+        f"/statistics: {prs} PR, {teams * users_per_team} пользователей",
+        results,
+        note="Время вызова StatisticsService, без HTTP",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prs", type=int, default=100_000)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--users-per-team", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.prs, args.teams, args.users_per_team))
@@ -0,0 +1,42 @@
+"""
+Бенчмарк хранилищ: python -m benchmarks.bench_storage [--scales 1 10] [--repeat 50]
+
+Те же вызовы сервисов, что в benchmarks.suite, на одинаковых данных: сначала
+с PostgresRepository, затем с MemoryRepository. Разница показывает, сколько
+времени метода приходится на бд (сеть, планирование, транзакции) - хранилище
+в памяти оставляет только логику сервисов и сериализацию записей.
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import List
+
+from benchmarks.suite import SCALES, run_scale
+
+
+async def main(scales: List[int], repeat: int, warmup: int) -> None:
+    for factor in scales:
+        scale = SCALES[factor]
+        print(
+            f"{factor}x: {scale.teams} команд, {scale.users} пользователей, {scale.prs} PR",
+            file=sys.stderr,
+        )
+        postgres = await run_scale(scale, repeat, warmup, backend="postgres")
+        memory = await run_scale(scale, repeat, warmup, backend="memory")
+
+        print(f"\n### Хранилища, {factor}x: {scale.users} пользователей, {scale.prs} PR\n")
+        print("| Метод | postgres median, ms | memory median, ms | postgres / memory |")
+        print("|---|---|---|---|")
+        for method, result in postgres.items():
+            before, after = result["median"], memory[method]["median"]
+            print(f"| {method} | {before:.2f} | {after:.3f} | {before / after:.0f}x |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", choices=sorted(SCALES), default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.scales, args.repeat, args.warmup))
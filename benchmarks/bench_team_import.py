@@ -0,0 +1,84 @@
+"""
+Бенчмарк импорта команд:
+python -m benchmarks.bench_team_import [--users 100000]
+
+Сравнивает создание команд по одной (TeamService.create_team)
+с потоковым импортом NDJSON (TeamService.import_teams) на пустой бд.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List, Tuple
+
+from app.repositories.postgres import PostgresRepository
+from app.schemas.team import TeamCreate
+from app.services.team_service import TeamService
+from benchmarks.common import drop_schema, make_engine, make_sessionmaker, reset_schema
+
+CHUNK_SIZE = 64 * 1024
+
+
+def make_teams(users: int, users_per_team: int, prefix: str) -> List[Dict]:
+    return [
+        {
+            "team_name": f"{prefix}_team_{team_index}",
+            "members": [
+                {
+                    "user_id": f"{prefix}_u_{team_index}_{member}",
+                    "username": f"User {team_index} {member}",
+                    "is_active": True,
+                }
+                for member in range(users_per_team)
+            ],
+        }
+        for team_index in range(users // users_per_team)
+    ]
+
+
+async def chunked(body: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start : start + CHUNK_SIZE]
+
+
+async def main(users: int, users_per_team: int, one_by_one_users: int) -> None:
+    engine = make_engine()
+    await reset_schema(engine)
+    session_factory = make_sessionmaker(engine)
+    results: Dict[str, Tuple[int, float]] = {}
+
+    teams = make_teams(one_by_one_users, users_per_team, "single")
+    started = time.perf_counter()
+    for team in teams:
+        async with session_factory() as db:
+            await TeamService.create_team(PostgresRepository(db), TeamCreate.model_validate(team))
+    results["/team/add по одной"] = (one_by_one_users, time.perf_counter() - started)
+
+    body = "\n".join(json.dumps(team) for team in make_teams(users, users_per_team, "ndjson"))
+    started = time.perf_counter()
+    async with session_factory() as db:
+        import_results = await TeamService.import_teams(
+            PostgresRepository(db), chunked(body.encode())
+        )
+    results["/team/import"] = (users, time.perf_counter() - started)
+    assert all(result.result == "CREATED" for result in import_results)
+
+    await drop_schema(engine)
+    await engine.dispose()
+
+    print(f"\n### Импорт команд по {users_per_team} участников\n")
+    print("Время вызовов сервиса без HTTP, NDJSON подаётся частями по 64 KiB\n")
+    print("| Сценарий | пользователей | всего, s | пользователей/s |")
+    print("|---|---|---|---|")
+    for name, (count, elapsed) in results.items():
+        print(f"| {name} | {count} | {elapsed:.2f} | {count / elapsed:.0f} |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--users-per-team", type=int, default=10)
+    parser.add_argument("--one-by-one-users", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.users_per_team, args.one_by_one_users))
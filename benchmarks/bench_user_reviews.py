@@ -0,0 +1,110 @@
+"""
+Бенчмарк постраничной выдачи PR ревьювера:
+python -m benchmarks.bench_user_reviews [--sizes 1000 10000 100000]
+
+Для каждого размера истории бд пересоздаётся; команда из нескольких пользователей,
+поэтому на каждого ревьювера приходится заметная доля всех PR.
+Сравнивает прежнюю выдачу (полный список через соединение с pull_requests)
+со страницами по курсору: первая страница, страница из середины истории,
+первая страница с фильтром по статусу.
+"""
+
+import argparse
+import asyncio
+from typing import Dict, List
+
+from sqlalchemy import func, select
+
+from app.models import PRReviewer, PRStatus, PullRequest
+from app.repositories.postgres import PostgresRepository
+from app.services.user_service import UserService, encode_review_cursor
+from benchmarks.common import (
+    drop_schema,
+    make_engine,
+    make_sessionmaker,
+    measure,
+    print_report,
+    reset_schema,
+    seed,
+)
+
+
+async def main(sizes: List[int], users_per_team: int, limit: int, repeat: int) -> None:
+    engine = make_engine()
+    sessionmaker = make_sessionmaker(engine)
+    results: Dict[str, Dict[str, float]] = {}
+
+    for prs in sizes:
+        await reset_schema(engine)
+        dataset = await seed(engine, teams=1, users_per_team=users_per_team, prs=prs)
+        reviewer_id = dataset.teams["team_0"][0]
+
+        async with sessionmaker() as db:
+            history = await db.scalar(
+                select(func.count()).filter(PRReviewer.reviewer_id == reviewer_id)
+            )
+            middle = (
+                await db.execute(
+                    select(PRReviewer.pr_created_at, PRReviewer.pull_request_id)
+                    .filter(PRReviewer.reviewer_id == reviewer_id)
+                    .order_by(PRReviewer.pr_created_at.desc(), PRReviewer.pull_request_id.desc())
+                    .offset(history // 2)
+                    .limit(1)
+                )
+            ).one()
+        middle_cursor = encode_review_cursor(middle.pr_created_at, middle.pull_request_id)
+
+        async def legacy_full_list() -> None:
+            async with sessionmaker() as db:
+                (
+                    await db.scalars(
+                        select(PullRequest)
+                        .join(PRReviewer, PRReviewer.pull_request_id == PullRequest.pull_request_id)
+                        .filter(PRReviewer.reviewer_id == reviewer_id)
+                    )
+                ).all()
+
+        async def first_page() -> None:
+            async with sessionmaker() as db:
+                await UserService.get_user_reviews(PostgresRepository(db), reviewer_id, limit=limit)
+
+        async def middle_page() -> None:
+            async with sessionmaker() as db:
+                await UserService.get_user_reviews(
+                    PostgresRepository(db), reviewer_id, limit=limit, cursor=middle_cursor
+                )
+
+        async def first_open_page() -> None:
+            async with sessionmaker() as db:
+                await UserService.get_user_reviews(
+                    PostgresRepository(db), reviewer_id, status=PRStatus.OPEN, limit=limit
+                )
+
+        scenarios = {
+            "полный список (прежний)": legacy_full_list,
+            "первая страница": first_page,
+            "страница из середины": middle_page,
+            "первая страница OPEN": first_open_page,
+        }
+        for name, fn in scenarios.items():
+            results[f"{history} PR ревьювера, {name}"] = await measure(fn, repeat=repeat)
+
+    await drop_schema(engine)
+    await engine.dispose()
+
+    print_report(
+        "/users/getReview: стоимость страницы от размера истории",
+        results,
+        note=f"limit={limit}, команда из {users_per_team} пользователей, "
+        "время вызова UserService без HTTP",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--users-per-team", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.users_per_team, args.limit, args.repeat))
@@ -0,0 +1,217 @@
+"""
+Бенчмарк масштабирования по воркерам:
+python -m benchmarks.bench_workers [--workers 1 2 4] [--duration 20] [--concurrency 64]
+
+Для каждого числа воркеров на заново заполненной бд (BENCH_DATABASE_URL) запускается
+python -m app.commands.serve с общим лимитом соединений --max-connections, и клиент httpx
+с --concurrency параллельными запросами в течение --duration секунд шлёт смесь запросов:
+GET /team/get, GET /users/getReview и POST /pullRequest/create. Печатаются запросы
+в секунду, время ответа и наибольшее число соединений сервиса с бд (pg_stat_activity).
+Клиент работает на той же машине, поэтому прирост ограничен числом свободных ядер.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+from sqlalchemy import text
+
+from app.core.config import Settings
+from benchmarks.common import (
+    BENCH_DATABASE_URL,
+    drop_schema,
+    make_engine,
+    reset_schema,
+    seed,
+    summarize,
+)
+
+# клиентские соединения с бд бенчмарка (без autovacuum), кроме соединения, которое их считает
+SERVICE_CONNECTIONS = text(
+    """
+    SELECT count(*) FROM pg_stat_activity
+    WHERE datname = current_database()
+      AND backend_type = 'client backend'
+      AND pid <> pg_backend_pid()
+    """
+)
+
+
+async def wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float):
+    """Дождаться ответа /health от запущенного сервиса"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app.commands.serve exited with code {process.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("service did not become ready")
+
+
+async def sample_connections(stop: asyncio.Event) -> int:
+    """Наибольшее число соединений с бд, пока не выставлен stop"""
+    engine = make_engine(pool_size=1)
+    highest = 0
+    async with engine.connect() as connection:
+        while not stop.is_set():
+            highest = max(highest, (await connection.execute(SERVICE_CONNECTIONS)).scalar_one())
+            await connection.commit()
+            await asyncio.sleep(0.1)
+    await engine.dispose()
+    return highest
+
+
+async def run_client(
+    client: httpx.AsyncClient,
+    teams: List[str],
+    user_ids: List[str],
+    pr_ids: "itertools.count[int]",
+    deadline: float,
+    rng: random.Random,
+    timings: List[float],
+    errors: List[int],
+) -> None:
+    """Клиент: запросы смеси подряд до deadline"""
+    while time.monotonic() < deadline:
+        kind = rng.random()
+        started = time.perf_counter()
+        try:
+            if kind < 0.4:
+                response = await client.get("/team/get", params={"team_name": rng.choice(teams)})
+            elif kind < 0.8:
+                response = await client.get(
+                    "/users/getReview", params={"user_id": rng.choice(user_ids)}
+                )
+            else:
+                response = await client.post(
+                    "/pullRequest/create",
+                    json={
+                        "pull_request_id": f"bench_{next(pr_ids)}",
+                        "pull_request_name": "Bench",
+                        "author_id": rng.choice(user_ids),
+                    },
+                )
+        except httpx.TransportError:
+            errors.append(0)
+            continue
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+
+
+async def run(
+    workers: int, concurrency: int, duration: float, max_connections: int, port: int
+) -> Tuple[int, float, Dict[str, float], int, int]:
+    """Прогон смеси запросов против сервиса с workers воркерами"""
+    engine = make_engine()
+    await reset_schema(engine)
+    dataset = await seed(engine, teams=20, users_per_team=10, prs=1000)
+    # не держать соединение бенчмарка в pg_stat_activity во время прогона
+    await engine.dispose()
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": str(BENCH_DATABASE_URL),
+        "STORAGE_BACKEND": "postgres",
+        "APP_HOST": "127.0.0.1",
+        "APP_PORT": str(port),
+        "APP_WORKERS": str(workers),
+        "DB_MAX_CONNECTIONS": str(max_connections),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.commands.serve"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30
+        ) as client:
+            await wait_ready(client, process, timeout=60)
+            # /health отвечает первый поднявшийся воркер: дать запуститься остальным
+            await asyncio.sleep(1 + workers / 2)
+
+            timings: List[float] = []
+            errors: List[int] = []
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(sample_connections(stop))
+            pr_ids = itertools.count()
+            started = time.monotonic()
+            await asyncio.gather(
+                *(
+                    run_client(
+                        client,
+                        list(dataset.teams),
+                        dataset.user_ids,
+                        pr_ids,
+                        started + duration,
+                        random.Random(index),
+                        timings,
+                        errors,
+                    )
+                    for index in range(concurrency)
+                )
+            )
+            elapsed = time.monotonic() - started
+            stop.set()
+            highest = await sampler
+    finally:
+        process.terminate()
+        process.wait()
+        await drop_schema(engine)
+        await engine.dispose()
+
+    return len(timings), elapsed, summarize(timings), len(errors), highest
+
+
+async def main(
+    workers: List[int], concurrency: int, duration: float, max_connections: int, port: int
+) -> None:
+    print(
+        f"\n### Воркеры: {concurrency} параллельных клиентов, {duration:.0f} s, "
+        f"DB_MAX_CONNECTIONS={max_connections}, ядер: {len(os.sched_getaffinity(0))}\n"
+    )
+    print(
+        "| Воркеры | пул воркера | запросов/s | median, ms | p95, ms | ошибки "
+        "| соединений с бд (max) |"
+    )
+    print("|---|---|---|---|---|---|---|")
+    for count in workers:
+        budget = Settings(APP_WORKERS=count, DB_MAX_CONNECTIONS=max_connections)
+        done, elapsed, result, errors, highest = await run(
+            count, concurrency, duration, max_connections, port
+        )
+        print(
+            f"| {count} | {budget.DB_POOL_SIZE} + {budget.DB_MAX_OVERFLOW} | "
+            f"{done / elapsed:.0f} | {result['median']:.2f} | {result['p95']:.2f} | "
+            f"{errors} | {highest} |"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64, help="параллельных клиентов")
+    parser.add_argument("--duration", type=float, default=20, help="секунд на прогон")
+    parser.add_argument(
+        "--max-connections", type=int, default=40, help="DB_MAX_CONNECTIONS сервиса"
+    )
+    parser.add_argument("--port", type=int, default=8091)
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.workers, args.concurrency, args.duration, args.max_connections, args.port)
+    )
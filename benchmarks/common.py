@@ -0,0 +1,239 @@
+"""
+Общие утилиты бенчмарков: отдельная бд, генерация синтетических данных, замер времени.
+
+Бенчмарки пересоздают схему, поэтому используют BENCH_DATABASE_URL,
+а если он не задан - тестовую бд (TEST_DATABASE_URL). Те же данные можно загрузить
+в хранилище в памяти (seed_memory).
+"""
+
+import os
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.database.base import Base, async_url
+from app.models import PRStatus
+from app.repositories.memory import MemoryStorage
+from app.repositories.postgres import PostgresRepository
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL") or settings.TEST_DATABASE_URL
+
+
+@dataclass
+class Dataset:
+    """Сгенерированные данные: команды, пользователи и PR"""
+
+    teams: Dict[str, List[str]] = field(default_factory=dict)
+    open_prs: List[str] = field(default_factory=list)
+    merged_prs: List[str] = field(default_factory=list)
+    # ревьюверы PR при генерации
+    reviewers: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def user_ids(self) -> List[str]:
+        return [user_id for members in self.teams.values() for user_id in members]
+
+
+@dataclass
+class Rows:
+    """Строки таблиц в порядке колонок COPY"""
+
+    teams: List[Tuple[Any, ...]] = field(default_factory=list)
+    users: List[Tuple[Any, ...]] = field(default_factory=list)
+    pull_requests: List[Tuple[Any, ...]] = field(default_factory=list)
+    reviewers: List[Tuple[Any, ...]] = field(default_factory=list)
+
+
+def make_engine(
+    pool_size: int = 5, statement_cache_size: int = settings.DB_STATEMENT_CACHE_SIZE
+) -> AsyncEngine:
+    """Движок бд для бенчмарков; кэш подготовленных запросов - как у приложения"""
+    assert BENCH_DATABASE_URL is not None, "BENCH_DATABASE_URL or TEST_DATABASE_URL must be set"
+    return create_async_engine(
+        async_url(BENCH_DATABASE_URL),
+        pool_size=pool_size,
+        connect_args={"prepared_statement_cache_size": statement_cache_size},
+    )
+
+
+def make_sessionmaker(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+async def reset_schema(engine: AsyncEngine) -> None:
+    """Пересоздать все таблицы"""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+
+async def drop_schema(engine: AsyncEngine) -> None:
+    """Удалить все таблицы после бенчмарка"""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+
+
+def generate(
+    teams: int,
+    users_per_team: int,
+    prs: int,
+    open_ratio: float = 0.5,
+    reviewers_per_pr: int = 2,
+    rng_seed: int = 42,
+) -> Tuple[Dataset, Rows]:
+    """
+    Синтетические данные: строки таблиц teams, users, pull_requests и pr_reviewers;
+    PR создаются за последний год, ревьюверы - из команды автора
+    """
+    rng = random.Random(rng_seed)
+    dataset = Dataset()
+    now = datetime.now(timezone.utc)
+    rows = Rows()
+
+    for team_index in range(teams):
+        team_name = f"team_{team_index}"
+        rows.teams.append((team_name,))
+        members = [f"u_{team_index}_{member}" for member in range(users_per_team)]
+        dataset.teams[team_name] = members
+        rows.users.extend((user_id, f"User {user_id}", team_name, True) for user_id in members)
+
+    team_names = list(dataset.teams)
+    for pr_index in range(prs):
+        pr_id = f"pr_{pr_index}"
+        members = dataset.teams[rng.choice(team_names)]
+        author_id = rng.choice(members)
+        created_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        if rng.random() < open_ratio:
+            status, merged_at = PRStatus.OPEN.value, None
+            dataset.open_prs.append(pr_id)
+        else:
+            status = PRStatus.MERGED.value
+            merged_at = created_at + timedelta(seconds=rng.randrange(7 * 24 * 3600))
+            dataset.merged_prs.append(pr_id)
+        rows.pull_requests.append(
+            (pr_id, f"Feature {pr_index}", author_id, status, created_at, merged_at)
+        )
+
+        candidates = [user_id for user_id in members if user_id != author_id]
+        reviewer_ids = rng.sample(candidates, min(reviewers_per_pr, len(candidates)))
+        dataset.reviewers[pr_id] = reviewer_ids
+        for reviewer_id in reviewer_ids:
+            rows.reviewers.append((pr_id, reviewer_id, created_at, status, created_at))
+
+    return dataset, rows
+
+
+async def copy_rows(driver: Any, rows: Rows) -> None:
+    """Загрузить строки таблиц через COPY соединения asyncpg (в его текущей транзакции)"""
+    await driver.copy_records_to_table("teams", records=rows.teams, columns=["team_name"])
+    await driver.copy_records_to_table(
+        "users",
+        records=rows.users,
+        columns=["user_id", "username", "team_name", "is_active"],
+    )
+    await driver.copy_records_to_table(
+        "pull_requests",
+        records=rows.pull_requests,
+        columns=[
+            "pull_request_id",
+            "pull_request_name",
+            "author_id",
+            "status",
+            "created_at",
+            "merged_at",
+        ],
+    )
+    await driver.copy_records_to_table(
+        "pr_reviewers",
+        records=rows.reviewers,
+        columns=[
+            "pull_request_id",
+            "reviewer_id",
+            "assigned_at",
+            "pr_status",
+            "pr_created_at",
+        ],
+    )
+
+
+async def seed(
+    engine: AsyncEngine, teams: int, users_per_team: int, prs: int, **options: Any
+) -> Dataset:
+    """Заполнить бд синтетическими данными (generate) через COPY"""
+    dataset, rows = generate(teams, users_per_team, prs, **options)
+
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver = raw_connection.driver_connection
+        assert driver is not None
+        await copy_rows(driver, rows)
+
+    async with make_sessionmaker(engine)() as db:
+        await PostgresRepository(db).rebuild_counters()
+
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("ANALYZE"))
+
+    return dataset
+
+
+def seed_memory(
+    storage: MemoryStorage, teams: int, users_per_team: int, prs: int, **options: Any
+) -> Dataset:
+    """Заполнить хранилище в памяти теми же синтетическими данными, что и seed"""
+    dataset, rows = generate(teams, users_per_team, prs, **options)
+    storage.load(
+        teams=(team_name for team_name, in rows.teams),
+        users=rows.users,
+        pull_requests=rows.pull_requests,
+        reviewers=(
+            (pr_id, reviewer_id, assigned_at)
+            for pr_id, reviewer_id, assigned_at, _, _ in rows.reviewers
+        ),
+    )
+    return dataset
+
+
+async def measure(
+    fn: Callable[[], Awaitable[object]], repeat: int = 20, warmup: int = 2
+) -> Dict[str, float]:
+    """Замер времени выполнения корутины, мс"""
+    for _ in range(warmup):
+        await fn()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return summarize(timings)
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """min/median/p95/mean по списку замеров, мс"""
+    timings = sorted(timings)
+    return {
+        "min": timings[0],
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "mean": statistics.fmean(timings),
+    }
+
+
+def print_report(title: str, results: Dict[str, Dict[str, float]], note: Optional[str] = None):
+    """Вывести результаты замеров в виде markdown таблицы"""
+    print(f"\n### {title}\n")
+    if note:
+        print(f"{note}\n")
+    print("| Сценарий | min, ms | median, ms | p95, ms |")
+    print("|---|---|---|---|")
+    for name, result in results.items():
+        print(f"| {name} | {result['min']:.2f} | {result['median']:.2f} | {result['p95']:.2f} |")
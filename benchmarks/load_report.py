@@ -0,0 +1,180 @@
+"""
+Отчёт нагрузочного теста по CSV locust (--csv PREFIX):
+python -m benchmarks.load_report light=PREFIX [medium=PREFIX heavy=PREFIX]
+    [--endpoints] [--save results.json] [--baseline baseline.json] [--threshold 0.2]
+
+Строит таблицу в формате tests_results.md (столбец на профиль) из строки Aggregated
+файла PREFIX_stats.csv. Вместо PREFIX можно передать JSON, сохранённый через --save.
+С --baseline показатели сравниваются с сохранённым прогоном тех же профилей:
+рост медианы, 95 и 99 перцентилей или падение RPS больше порога, а также рост
+доли отказов больше 0.1% считаются регрессией, и скрипт завершается с кодом 1.
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+Metrics = Dict[str, float]
+
+# ключ, название строки в tests_results.md
+METRICS = [
+    ("requests", "Total Requests"),
+    ("rps", "avg RPS"),
+    ("median_ms", "Median Response Time"),
+    ("p95_ms", "95th percentile"),
+    ("p99_ms", "99th percentile"),
+    ("max_ms", "Max Response Time"),
+    ("failure_rate", "Failure Rate"),
+]
+# рост показателя - замедление
+LATENCY_METRICS = ("median_ms", "p95_ms", "p99_ms")
+FAILURE_RATE_TOLERANCE = 0.001
+
+
+def stats_file(source: str) -> Path:
+    """Файл статистики locust по префиксу --csv или пути к нему"""
+    path = Path(source)
+    if path.suffix == ".csv":
+        return path
+    return path.with_name(f"{path.name}_stats.csv")
+
+
+def parse_row(row: Dict[str, str]) -> Metrics:
+    requests = int(row["Request Count"])
+    failures = int(row["Failure Count"])
+    return {
+        "requests": requests,
+        "rps": float(row["Requests/s"]),
+        "median_ms": float(row["Median Response Time"]),
+        "p95_ms": float(row["95%"]),
+        "p99_ms": float(row["99%"]),
+        "max_ms": float(row["Max Response Time"]),
+        "failure_rate": failures / requests if requests else 0.0,
+    }
+
+
+def load_stats(label: str, source: str) -> Tuple[Metrics, Dict[str, Metrics]]:
+    """Итоговые показатели прогона и показатели по запросам ("GET /team/get")"""
+    if source.endswith(".json"):
+        saved = json.loads(Path(source).read_text())[label]
+        return saved["total"], saved["endpoints"]
+
+    total: Metrics = {}
+    endpoints: Dict[str, Metrics] = {}
+    with stats_file(source).open(newline="") as file:
+        for row in csv.DictReader(file):
+            if row["Name"] == "Aggregated":
+                total = parse_row(row)
+            else:
+                endpoints[f"{row['Type']} {row['Name']}"] = parse_row(row)
+    if not total:
+        raise ValueError(f"{source}: нет строки Aggregated")
+    return total, endpoints
+
+
+def format_value(key: str, value: float) -> str:
+    if key == "requests":
+        return str(int(value))
+    if key == "rps":
+        return f"{value:.1f}"
+    if key == "failure_rate":
+        return f"{value * 100:.2f}".rstrip("0").rstrip(".") + "%"
+    return f"{value:g}ms"
+
+
+def print_table(runs: Dict[str, Metrics]) -> None:
+    """Таблица показателей в формате tests_results.md"""
+    print("| Метрика | " + " | ".join(runs) + " |")
+    print("|---|" + "---|" * len(runs))
+    for key, title in METRICS:
+        cells = [format_value(key, metrics[key]) for metrics in runs.values()]
+        print(f"| {title} | " + " | ".join(cells) + " |")
+
+
+def print_endpoints(label: str, endpoints: Dict[str, Metrics]) -> None:
+    """Показатели по запросам одного прогона"""
+    print(f"\n{label}:\n")
+    print("| Запрос | Requests | Median | 95th | 99th | Failure Rate |")
+    print("|---|---|---|---|---|---|")
+    for name, metrics in sorted(endpoints.items(), key=lambda item: -item[1]["requests"]):
+        cells = [
+            format_value(key, metrics[key])
+            for key in ("requests", "median_ms", "p95_ms", "p99_ms", "failure_rate")
+        ]
+        print(f"| {name} | " + " | ".join(cells) + " |")
+
+
+def is_regression(key: str, before: float, after: float, threshold: float) -> bool:
+    if key in LATENCY_METRICS:
+        return after > before * (1 + threshold)
+    if key == "rps":
+        return after < before * (1 - threshold)
+    if key == "failure_rate":
+        return after > before + FAILURE_RATE_TOLERANCE
+    return False
+
+
+def compare(baseline: Dict[str, Metrics], runs: Dict[str, Metrics], threshold: float) -> List[str]:
+    """Вывести сравнение с сохранённым прогоном; вернуть регрессии"""
+    regressions = []
+    print("\n| Профиль | Метрика | было | стало | изменение |")
+    print("|---|---|---|---|---|")
+    for label, metrics in runs.items():
+        previous = baseline.get(label)
+        if previous is None:
+            print(f"| {label} | - | - | - | нет в baseline |")
+            continue
+        for key, title in METRICS:
+            before, after = previous[key], metrics[key]
+            change = f"{(after / before - 1) * 100:+.1f}%" if before else "-"
+            if is_regression(key, before, after, threshold):
+                regressions.append(f"{label} {title}")
+                change += " (регрессия)"
+            print(
+                f"| {label} | {title} | {format_value(key, before)} | "
+                f"{format_value(key, after)} | {change} |"
+            )
+    return regressions
+
+
+def main(args: argparse.Namespace) -> int:
+    runs: Dict[str, Metrics] = {}
+    endpoints: Dict[str, Dict[str, Metrics]] = {}
+    for run in args.runs:
+        label, _, source = run.partition("=")
+        if not source:
+            parser.error(f"ожидается ПРОФИЛЬ=PREFIX: {run}")
+        runs[label], endpoints[label] = load_stats(label, source)
+
+    print_table(runs)
+    if args.endpoints:
+        for label, run_endpoints in endpoints.items():
+            print_endpoints(label, run_endpoints)
+
+    if args.save is not None:
+        saved = {label: {"total": runs[label], "endpoints": endpoints[label]} for label in runs}
+        args.save.write_text(json.dumps(saved, indent=2) + "\n")
+
+    if args.baseline is None:
+        return 0
+
+    baseline = {label: run["total"] for label, run in json.loads(args.baseline.read_text()).items()}
+    regressions = compare(baseline, runs, args.threshold)
+    if regressions:
+        print(f"\nРегрессии относительно {args.baseline}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("runs", nargs="+", metavar="ПРОФИЛЬ=PREFIX")
+parser.add_argument("--endpoints", action="store_true", help="таблица по запросам")
+parser.add_argument("--save", type=Path, help="сохранить показатели в JSON")
+parser.add_argument("--baseline", type=Path, help="сохранённый прогон для сравнения")
+parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение (доля)")
+
+if __name__ == "__main__":
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,319 @@
+"""
+Набор бенчмарков методов сервисов на синтетических данных разного масштаба:
+python -m benchmarks.suite [--scales 1 10 100] [--repeat 100] [--backend memory]
+    [--output benchmarks/results/latest.json]
+    [--baseline benchmarks/results/baseline.json] [--threshold 0.25]
+
+Для каждого масштаба схема пересоздаётся и заполняется: 1x - объём из ТЗ
+(20 команд, 200 пользователей, 1000 PR), 10x и 100x - в 10 и 100 раз больше.
+Каждый метод вызывается отдельно, с новой сессией на вызов; с --backend memory
+те же данные загружаются в хранилище в памяти. Результаты пишутся в JSON;
+с --baseline медианы сравниваются с прошлым прогоном, и при замедлении больше
+порога скрипт завершается с кодом 1. Сравнить два готовых файла без прогона:
+python -m benchmarks.suite --results new.json --baseline old.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.repositories import Repository
+from app.repositories.memory import MemoryRepository, MemoryStorage
+from app.repositories.postgres import PostgresRepository
+from app.schemas.pull_request import PullRequestCreate, ReassignPRRequest
+from app.schemas.team import TeamCreate, TeamMember
+from app.schemas.user import BulkDeactivateRequest
+from app.services.pull_request_service import PullRequestService
+from app.services.roster_cache import roster_cache
+from app.services.statistics_service import StatisticsService
+from app.services.team_service import TeamService
+from app.services.user_service import UserService
+from benchmarks.common import (
+    Dataset,
+    drop_schema,
+    make_engine,
+    make_sessionmaker,
+    measure,
+    reset_schema,
+    seed,
+    seed_memory,
+)
+
+USERS_PER_TEAM = 10
+PRS_PER_USER = 5
+DEFAULT_OUTPUT = Path("benchmarks/results/latest.json")
+
+Results = Dict[str, Dict[str, Dict[str, float]]]
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Объём синтетических данных"""
+
+    teams: int
+    users_per_team: int = USERS_PER_TEAM
+
+    @property
+    def users(self) -> int:
+        return self.teams * self.users_per_team
+
+    @property
+    def prs(self) -> int:
+        return self.users * PRS_PER_USER
+
+
+# 1x - 20 команд и 200 пользователей из ТЗ
+SCALES = {1: Scale(teams=20), 10: Scale(teams=200), 100: Scale(teams=2000)}
+
+Call = Callable[[], Awaitable[object]]
+
+
+RepositoryFactory = Callable[[], AsyncContextManager[Repository]]
+
+
+def postgres_repositories(session_factory: async_sessionmaker) -> RepositoryFactory:
+    """Хранилище PostgreSQL с новой сессией на вызов"""
+
+    @asynccontextmanager
+    async def open_repository() -> AsyncIterator[Repository]:
+        async with session_factory() as db:
+            yield PostgresRepository(db)
+
+    return open_repository
+
+
+def memory_repositories(storage: MemoryStorage) -> RepositoryFactory:
+    """Хранилище в памяти поверх общих данных"""
+
+    @asynccontextmanager
+    async def open_repository() -> AsyncIterator[Repository]:
+        yield MemoryRepository(storage)
+
+    return open_repository
+
+
+def open_pr_reviewers(dataset: Dataset, pr_ids: List[str]) -> List[Tuple[str, str]]:
+    """Пары (PR, один из его ревьюверов) для открытых PR"""
+    open_pr_ids = set(dataset.open_prs)
+    return [
+        (pr_id, min(dataset.reviewers[pr_id]))
+        for pr_id in sorted(pr_ids)
+        if pr_id in open_pr_ids and dataset.reviewers[pr_id]
+    ]
+
+
+def make_calls(repository: RepositoryFactory, dataset: Dataset) -> Dict[str, Call]:
+    """
+    Вызовы методов сервисов: каждый следующий вызов работает с новыми данными
+    (новый PR, ещё не слитый PR, ещё активный пользователь), поэтому повторы
+    измеряют одну и ту же работу; bulk_deactivate - последним, он меняет составы команд
+    """
+    user_ids = dataset.user_ids
+    merge_pr_ids = iter(dataset.open_prs[::2])
+    reassignments = iter(open_pr_reviewers(dataset, dataset.open_prs[1::2]))
+    new_pr_ids = (f"bench_pr_{index}" for index in itertools.count())
+    new_team_names = (f"bench_team_{index}" for index in itertools.count())
+    # по одному пользователю из каждой команды по кругу, чтобы в командах оставались кандидаты
+    deactivations = iter(
+        [(team_name, members[index]) for index in range(1, USERS_PER_TEAM)]
+        for team_name, members in dataset.teams.items()
+    )
+    deactivation_queue = (pair for round_ in zip(*deactivations) for pair in round_)
+
+    async def create_pr() -> None:
+        async with repository() as repo:
+            await PullRequestService.create_pr(
+                repo,
+                PullRequestCreate(
+                    pull_request_id=next(new_pr_ids),
+                    pull_request_name="Benchmark",
+                    author_id=random.choice(user_ids),
+                ),
+            )
+
+    async def merge_pr() -> None:
+        async with repository() as repo:
+            await PullRequestService.merge_pr(repo, next(merge_pr_ids))
+
+    async def reassign_reviewer() -> None:
+        pr_id, reviewer_id = next(reassignments)
+        async with repository() as repo:
+            await PullRequestService.reassign_reviewer(
+                repo, ReassignPRRequest(pull_request_id=pr_id, old_user_id=reviewer_id)
+            )
+
+    async def get_user_reviews() -> None:
+        async with repository() as repo:
+            await UserService.get_user_reviews(repo, random.choice(user_ids))
+
+    async def get_statistics() -> None:
+        async with repository() as repo:
+            await StatisticsService.get_statistics(repo)
+
+    async def create_team() -> None:
+        team_name = next(new_team_names)
+        members = [
+            TeamMember(user_id=f"{team_name}_u{index}", username="Benchmark", is_active=True)
+            for index in range(USERS_PER_TEAM)
+        ]
+        async with repository() as repo:
+            await TeamService.create_team(repo, TeamCreate(team_name=team_name, members=members))
+
+    async def bulk_deactivate() -> None:
+        team_name, user_id = next(deactivation_queue)
+        async with repository() as repo:
+            await UserService.bulk_deactivate(
+                repo, BulkDeactivateRequest(team_name=team_name, user_ids=[user_id])
+            )
+
+    return {
+        "create_pr": create_pr,
+        "merge_pr": merge_pr,
+        "reassign_reviewer": reassign_reviewer,
+        "get_user_reviews": get_user_reviews,
+        "get_statistics": get_statistics,
+        "create_team": create_team,
+        "bulk_deactivate": bulk_deactivate,
+    }
+
+
+async def run_scale(
+    scale: Scale, repeat: int, warmup: int, backend: str = "postgres"
+) -> Dict[str, Dict[str, float]]:
+    """Заполнить хранилище в заданном масштабе и замерить все методы"""
+    random.seed(42)
+    results: Dict[str, Dict[str, float]] = {}
+    if backend == "memory":
+        storage = MemoryStorage()
+        dataset = seed_memory(
+            storage, teams=scale.teams, users_per_team=scale.users_per_team, prs=scale.prs
+        )
+        for name, call in make_calls(memory_repositories(storage), dataset).items():
+            results[name] = await measure(call, repeat=repeat, warmup=warmup)
+        return results
+
+    roster_cache.clear()
+    engine = make_engine()
+    await reset_schema(engine)
+    dataset = await seed(
+        engine, teams=scale.teams, users_per_team=scale.users_per_team, prs=scale.prs
+    )
+    repository = postgres_repositories(make_sessionmaker(engine))
+    try:
+        for name, call in make_calls(repository, dataset).items():
+            results[name] = await measure(call, repeat=repeat, warmup=warmup)
+    finally:
+        await drop_schema(engine)
+        await engine.dispose()
+    return results
+
+
+def compare(
+    baseline: Results, current: Results, threshold: float, min_delta_ms: float
+) -> List[str]:
+    """
+    Вывести сравнение медиан с прошлым прогоном; вернуть замедлившиеся методы:
+    медиана выросла больше чем в (1 + threshold) раз и больше чем на min_delta_ms
+    """
+    regressions = []
+    print("\n| Масштаб | Метод | было, ms | стало, ms | изменение |")
+    print("|---|---|---|---|---|")
+    for scale_name, methods in current.items():
+        for method, result in methods.items():
+            previous = baseline.get(scale_name, {}).get(method)
+            if previous is None:
+                print(f"| {scale_name} | {method} | - | {result['median']:.2f} | новый |")
+                continue
+            before, after = previous["median"], result["median"]
+            change = after / before - 1
+            regressed = change > threshold and after - before > min_delta_ms
+            mark = " (регрессия)" if regressed else ""
+            print(
+                f"| {scale_name} | {method} | {before:.2f} | {after:.2f} | "
+                f"{change * 100:+.1f}%{mark} |"
+            )
+            if regressed:
+                regressions.append(f"{scale_name} {method}")
+    return regressions
+
+
+def print_results(results: Results) -> None:
+    """Результаты в виде markdown таблицы: медиана и p95 по масштабам"""
+    scale_names = list(results)
+    print("\n| Метод | " + " | ".join(f"{name} median / p95, ms" for name in scale_names) + " |")
+    print("|---|" + "---|" * len(scale_names))
+    methods = list(dict.fromkeys(method for scale in results.values() for method in scale))
+    for method in methods:
+        cells = [
+            f"{results[name][method]['median']:.2f} / {results[name][method]['p95']:.2f}"
+            if method in results[name]
+            else "-"
+            for name in scale_names
+        ]
+        print(f"| {method} | " + " | ".join(cells) + " |")
+
+
+async def run(scales: List[int], repeat: int, warmup: int, backend: str) -> Results:
+    results: Results = {}
+    for factor in scales:
+        scale = SCALES[factor]
+        print(
+            f"{factor}x: {scale.teams} команд, {scale.users} пользователей, {scale.prs} PR",
+            file=sys.stderr,
+        )
+        results[f"{factor}x"] = await run_scale(scale, repeat, warmup, backend)
+    return results
+
+
+def main(args: argparse.Namespace) -> int:
+    if args.results is not None:
+        report: Dict[str, Any] = json.loads(args.results.read_text())
+    else:
+        report = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "repeat": args.repeat,
+            "backend": args.backend,
+            "results": asyncio.run(run(args.scales, args.repeat, args.warmup, args.backend)),
+        }
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+        print(f"Результаты записаны в {args.output}", file=sys.stderr)
+
+    print_results(report["results"])
+    if args.baseline is None:
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(baseline["results"], report["results"], args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\nРегрессии относительно {args.baseline}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", choices=sorted(SCALES), default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--backend", choices=["postgres", "memory"], default="postgres")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--results", type=Path, help="сравнить готовый файл вместо прогона")
+    parser.add_argument("--baseline", type=Path, help="прошлый прогон для сравнения")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="допустимый рост медианы (доля)"
+    )
+    parser.add_argument(
+        "--min-delta-ms", type=float, default=0.5, help="рост медианы меньше этого - шум"
+    )
+    sys.exit(main(parser.parse_args()))
@@ -1,4 +1,10 @@
 #!/bin/bash
+# Нагрузочное тестирование: ./load_test.sh [light|medium|heavy|rate|saturation]
+#   light, medium, heavy - сценарии из tests_results.md (ожидание 1-3 с между задачами)
+#   rate       - постоянная интенсивность LOAD_RPS запросов в секунду (по умолчанию 200)
+#   saturation - задачи без ожидания: предел пропускной способности сервиса
+# Переопределение параметров профиля: LOAD_USERS, LOAD_SPAWN_RATE, LOAD_DURATION
+# Сравнение с сохранённым результатом: LOAD_BASELINE=load_test_results/baseline.json
 
 if [ -f .env ]; then
     export $(cat .env | grep -v '^#' | xargs)
@@ -8,7 +14,35 @@ APP_HOST=${APP_HOST:-localhost}
 APP_PORT=${APP_PORT:-8080}
 LOCUST_HOST="http://${APP_HOST}:${APP_PORT}"
 
-echo -e "Нагрузочное тестирование\n"
+PROFILE=${1:-heavy}
+case "$PROFILE" in
+    light)
+        USERS=50; SPAWN_RATE=5; DURATION=2m; WAIT_MODE=think ;;
+    medium)
+        USERS=125; SPAWN_RATE=10; DURATION=3m; WAIT_MODE=think ;;
+    heavy)
+        USERS=200; SPAWN_RATE=15; DURATION=5m; WAIT_MODE=think ;;
+    rate)
+        # интенсивность делится между пользователями; пользователей должно хватать,
+        # чтобы каждый успевал выполнить свою долю задач при росте времени ответа
+        LOAD_RPS=${LOAD_RPS:-200}
+        USERS=200; SPAWN_RATE=50; DURATION=3m; WAIT_MODE=rate ;;
+    saturation)
+        USERS=50; SPAWN_RATE=10; DURATION=2m; WAIT_MODE=none ;;
+    *)
+        echo "Неизвестный профиль: $PROFILE (light, medium, heavy, rate, saturation)"
+        exit 1 ;;
+esac
+USERS=${LOAD_USERS:-$USERS}
+SPAWN_RATE=${LOAD_SPAWN_RATE:-$SPAWN_RATE}
+DURATION=${LOAD_DURATION:-$DURATION}
+
+export LOCUST_WAIT_MODE=$WAIT_MODE
+if [ "$WAIT_MODE" = "rate" ]; then
+    export LOCUST_USER_RPS=$(python -c "print(${LOAD_RPS} / ${USERS})")
+fi
+
+echo -e "Нагрузочное тестирование: профиль $PROFILE, $USERS пользователей, $DURATION\n"
 
 if ! curl -s "${LOCUST_HOST}/health" > /dev/null; then
     echo -e "Сервис не доступен на ${LOCUST_HOST}\n"
@@ -19,21 +53,30 @@ RESULTS_DIR="load_test_results"
 mkdir -p "$RESULTS_DIR"
 
 TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
-RESULTS_FILE="$RESULTS_DIR/results_$TIMESTAMP.html"
-CSV_FILE="$RESULTS_DIR/stats_$TIMESTAMP.csv"
+RESULTS_FILE="$RESULTS_DIR/results_${PROFILE}_$TIMESTAMP.html"
+CSV_PREFIX="$RESULTS_DIR/stats_${PROFILE}_$TIMESTAMP"
 
 
 locust -f locustfile.py \
     --host="${LOCUST_HOST}" \
-    -u 200 \
-    -r 15 \
-    -t 5m \
+    -u "$USERS" \
+    -r "$SPAWN_RATE" \
+    -t "$DURATION" \
     --headless \
     --html "$RESULTS_FILE" \
-    --csv "$RESULTS_DIR/stats_$TIMESTAMP" \
+    --csv "$CSV_PREFIX" \
     --loglevel INFO
 
 if [ $? -eq 0 ]; then
     echo -e "\nТестирование завершено\n"
     echo -e "HTML отчет: $RESULTS_FILE"
 fi
+
+# locust завершается с ошибкой и при отдельных неуспешных запросах, отчёт строится в любом случае
+if [ -f "${CSV_PREFIX}_stats.csv" ]; then
+    REPORT_ARGS=("$PROFILE=$CSV_PREFIX" --save "$CSV_PREFIX.json")
+    if [ -n "$LOAD_BASELINE" ]; then
+        REPORT_ARGS+=(--baseline "$LOAD_BASELINE")
+    fi
+    python -m benchmarks.load_report "${REPORT_ARGS[@]}"
+fi
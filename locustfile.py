@@ -1,7 +1,22 @@
-from locust import HttpUser, task, between
+from locust import HttpUser, task, between, constant, constant_throughput
+import os
 import random
 import string
 
+# LOCUST_CONDITIONAL_GET=0 - клиенты без кэша: GET без If-None-Match
+CONDITIONAL_GET = os.environ.get("LOCUST_CONDITIONAL_GET", "1") != "0"
+
+# Ожидание между задачами пользователя (профили load_test.sh):
+# think - 1-3 секунды, как у реальных клиентов; rate - LOCUST_USER_RPS задач в секунду
+# на пользователя (постоянная интенсивность); none - без ожидания (предел пропускной способности)
+WAIT_MODE = os.environ.get("LOCUST_WAIT_MODE", "think")
+USER_RPS = float(os.environ.get("LOCUST_USER_RPS", "1"))
+WAIT_TIMES = {
+    "think": between(1, 3),
+    "rate": constant_throughput(USER_RPS),
+    "none": constant(0),
+}
+
 
 def generate_random_string(length=8):
     return "".join(random.choices(string.ascii_lowercase + string.digits, k=length))
@@ -10,7 +25,7 @@ def generate_random_string(length=8):
 class PRReviewerUser(HttpUser):
     """Пользователь для нагрузочного тестирования"""
 
-    wait_time = between(1, 3)
+    wait_time = WAIT_TIMES[WAIT_MODE]
 
     def on_start(self):
         self.team_name = f"team_{generate_random_string()}"
@@ -29,6 +44,15 @@ class PRReviewerUser(HttpUser):
             print(f"Failed to create team: {response.status_code}")
 
         self.created_prs = []
+        # ETag последнего ответа по URL: клиенты повторяют GET с If-None-Match
+        self.etags = {}
+
+    def conditional_get(self, url):
+        headers = {}
+        if CONDITIONAL_GET and url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        # статистика locust группируется по пути без параметров запроса
+        return self.client.get(url, headers=headers, name=url.split("?")[0], catch_response=True)
 
     @task(3)
     def create_team(self):
@@ -52,12 +76,13 @@ class PRReviewerUser(HttpUser):
 
     @task(5)
     def get_team(self):
-        with self.client.get(
-            f"/team/get?team_name={self.team_name}", catch_response=True
-        ) as response:
+        url = f"/team/get?team_name={self.team_name}"
+        with self.conditional_get(url) as response:
             if response.status_code == 200:
+                if "ETag" in response.headers:
+                    self.etags[url] = response.headers["ETag"]
                 response.success()
-            elif response.status_code == 404:
+            elif response.status_code in [304, 404]:
                 response.success()
             else:
                 response.failure(f"Unexpected status code: {response.status_code}")
@@ -166,10 +191,13 @@ class PRReviewerUser(HttpUser):
             return
 
         user_id = random.choice(self.user_ids)
-        with self.client.get(
-            f"/users/getReview?user_id={user_id}", catch_response=True
-        ) as response:
-            if response.status_code in [200, 404]:
+        url = f"/users/getReview?user_id={user_id}"
+        with self.conditional_get(url) as response:
+            if response.status_code == 200:
+                if "ETag" in response.headers:
+                    self.etags[url] = response.headers["ETag"]
+                response.success()
+            elif response.status_code in [304, 404]:
                 response.success()
             else:
                 response.failure(f"Unexpected status code: {response.status_code}")
@@ -16,6 +16,9 @@ from app.core.config import settings
 from app.models.team import Team  # noqa: F401
 from app.models.user import User  # noqa: F401
 from app.models.pull_request import PullRequest, PRStatus  # noqa: F401
+from app.models.pr_reviewer import PRReviewer  # noqa: F401
+from app.models.statistics import PRCounters, ReviewerStats  # noqa: F401
+from app.models.idempotency import IdempotencyKey  # noqa: F401
 
 config = context.config
 
@@ -0,0 +1,84 @@
+"""Normalize assigned reviewers into pr_reviewers
+
+Revision ID: 002_pr_reviewers
+Revises: 001_initial
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "002_pr_reviewers"
+down_revision: Union[str, None] = "001_initial"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pr_reviewers",
+        sa.Column("pull_request_id", sa.String(), nullable=False),
+        sa.Column("reviewer_id", sa.String(), nullable=False),
+        sa.Column(
+            "assigned_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["pull_request_id"], ["pull_requests.pull_request_id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["reviewer_id"], ["users.user_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("pull_request_id", "reviewer_id"),
+    )
+    op.create_index(
+        op.f("ix_pr_reviewers_reviewer_id"), "pr_reviewers", ["reviewer_id"], unique=False
+    )
+
+    # порядок ревьюверов из JSON сохраняется через сдвиг assigned_at на номер позиции;
+    # ссылки на несуществующих пользователей и дубликаты отбрасываются
+    op.execute(
+        """
+        INSERT INTO pr_reviewers (pull_request_id, reviewer_id, assigned_at)
+        SELECT pr.pull_request_id,
+               r.reviewer_id,
+               pr.created_at + r.position * interval '1 microsecond'
+        FROM pull_requests pr
+        CROSS JOIN LATERAL json_array_elements_text(pr.assigned_reviewers)
+            WITH ORDINALITY AS r(reviewer_id, position)
+        JOIN users u ON u.user_id = r.reviewer_id
+        ON CONFLICT (pull_request_id, reviewer_id) DO NOTHING
+        """
+    )
+
+    op.drop_column("pull_requests", "assigned_reviewers")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "pull_requests",
+        sa.Column(
+            "assigned_reviewers",
+            postgresql.JSON(astext_type=sa.Text()),
+            nullable=False,
+            server_default="[]",
+        ),
+    )
+    op.execute(
+        """
+        UPDATE pull_requests pr
+        SET assigned_reviewers = r.reviewers
+        FROM (
+            SELECT pull_request_id,
+                   json_agg(reviewer_id ORDER BY assigned_at, reviewer_id) AS reviewers
+            FROM pr_reviewers
+            GROUP BY pull_request_id
+        ) r
+        WHERE r.pull_request_id = pr.pull_request_id
+        """
+    )
+    op.drop_index(op.f("ix_pr_reviewers_reviewer_id"), table_name="pr_reviewers")
+    op.drop_table("pr_reviewers")
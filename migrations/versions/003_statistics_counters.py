@@ -0,0 +1,65 @@
+"""Add statistics counters
+
+Revision ID: 003_statistics_counters
+Revises: 002_pr_reviewers
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "003_statistics_counters"
+down_revision: Union[str, None] = "002_pr_reviewers"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pr_counters",
+        sa.Column("slot", sa.SmallInteger(), autoincrement=False, nullable=False),
+        sa.Column("total_prs", sa.Integer(), nullable=False),
+        sa.Column("open_prs", sa.Integer(), nullable=False),
+        sa.Column("merged_prs", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("slot"),
+    )
+    op.create_table(
+        "reviewer_stats",
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("assignments_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.user_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_index(
+        op.f("ix_reviewer_stats_assignments_count"),
+        "reviewer_stats",
+        ["assignments_count"],
+        unique=False,
+    )
+
+    op.execute(
+        """
+        INSERT INTO pr_counters (slot, total_prs, open_prs, merged_prs)
+        SELECT 0,
+               count(*),
+               count(*) FILTER (WHERE status = 'OPEN'),
+               count(*) FILTER (WHERE status = 'MERGED')
+        FROM pull_requests
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO reviewer_stats (user_id, assignments_count)
+        SELECT reviewer_id, count(*)
+        FROM pr_reviewers
+        GROUP BY reviewer_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_reviewer_stats_assignments_count"), table_name="reviewer_stats")
+    op.drop_table("reviewer_stats")
+    op.drop_table("pr_counters")
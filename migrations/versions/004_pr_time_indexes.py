@@ -0,0 +1,29 @@
+"""Index pull request timestamps for statistics windows
+
+Revision ID: 004_pr_time_indexes
+Revises: 003_statistics_counters
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "004_pr_time_indexes"
+down_revision: Union[str, None] = "003_statistics_counters"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f("ix_pull_requests_created_at"), "pull_requests", ["created_at"], unique=False
+    )
+    op.create_index(
+        op.f("ix_pull_requests_merged_at"), "pull_requests", ["merged_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_pull_requests_merged_at"), table_name="pull_requests")
+    op.drop_index(op.f("ix_pull_requests_created_at"), table_name="pull_requests")
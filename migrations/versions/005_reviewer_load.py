@@ -0,0 +1,57 @@
+"""Track open review load per reviewer
+
+Revision ID: 005_reviewer_load
+Revises: 004_pr_time_indexes
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005_reviewer_load"
+down_revision: Union[str, None] = "004_pr_time_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "reviewer_stats",
+        sa.Column("open_reviews_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "reviewer_stats",
+        sa.Column("last_assigned_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    op.execute(
+        """
+        UPDATE reviewer_stats rs
+        SET open_reviews_count = r.open_reviews_count,
+            last_assigned_at = r.last_assigned_at
+        FROM (
+            SELECT prr.reviewer_id,
+                   count(*) FILTER (WHERE pr.status = 'OPEN') AS open_reviews_count,
+                   max(prr.assigned_at) AS last_assigned_at
+            FROM pr_reviewers prr
+            JOIN pull_requests pr ON pr.pull_request_id = prr.pull_request_id
+            GROUP BY prr.reviewer_id
+        ) r
+        WHERE r.reviewer_id = rs.user_id
+        """
+    )
+
+    op.create_index(
+        op.f("ix_reviewer_stats_open_reviews_count"),
+        "reviewer_stats",
+        ["open_reviews_count"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_reviewer_stats_open_reviews_count"), table_name="reviewer_stats")
+    op.drop_column("reviewer_stats", "last_assigned_at")
+    op.drop_column("reviewer_stats", "open_reviews_count")
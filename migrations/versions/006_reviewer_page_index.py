@@ -0,0 +1,73 @@
+"""Copy PR status and creation time to reviewer assignments for keyset pagination
+
+Revision ID: 006_reviewer_page_index
+Revises: 005_reviewer_load
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "006_reviewer_page_index"
+down_revision: Union[str, None] = "005_reviewer_load"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "pr_reviewers",
+        sa.Column(
+            "pr_status",
+            postgresql.ENUM("OPEN", "MERGED", name="prstatus", create_type=False),
+            server_default="OPEN",
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "pr_reviewers",
+        sa.Column(
+            "pr_created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+
+    op.execute(
+        """
+        UPDATE pr_reviewers prr
+        SET pr_status = pr.status,
+            pr_created_at = pr.created_at
+        FROM pull_requests pr
+        WHERE pr.pull_request_id = prr.pull_request_id
+        """
+    )
+
+    op.create_index(
+        "ix_pr_reviewers_reviewer_page",
+        "pr_reviewers",
+        ["reviewer_id", "pr_created_at", "pull_request_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_pr_reviewers_reviewer_status_page",
+        "pr_reviewers",
+        ["reviewer_id", "pr_status", "pr_created_at", "pull_request_id"],
+        unique=False,
+    )
+    # reviewer_id - префикс ix_pr_reviewers_reviewer_page
+    op.drop_index(op.f("ix_pr_reviewers_reviewer_id"), table_name="pr_reviewers")
+
+
+def downgrade() -> None:
+    op.create_index(
+        op.f("ix_pr_reviewers_reviewer_id"), "pr_reviewers", ["reviewer_id"], unique=False
+    )
+    op.drop_index("ix_pr_reviewers_reviewer_status_page", table_name="pr_reviewers")
+    op.drop_index("ix_pr_reviewers_reviewer_page", table_name="pr_reviewers")
+    op.drop_column("pr_reviewers", "pr_created_at")
+    op.drop_column("pr_reviewers", "pr_status")
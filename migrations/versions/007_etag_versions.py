@@ -0,0 +1,32 @@
+"""Version counters for conditional GET of teams and reviewer PRs
+
+Revision ID: 007_etag_versions
+Revises: 006_reviewer_page_index
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "007_etag_versions"
+down_revision: Union[str, None] = "006_reviewer_page_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "teams",
+        sa.Column("version", sa.BigInteger(), server_default="1", nullable=False),
+    )
+    op.add_column(
+        "reviewer_stats",
+        sa.Column("reviews_version", sa.BigInteger(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("reviewer_stats", "reviews_version")
+    op.drop_column("teams", "version")
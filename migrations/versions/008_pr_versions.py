@@ -0,0 +1,27 @@
+"""Version column of pull requests for compare-and-swap reviewer updates
+
+Revision ID: 008_pr_versions
+Revises: 007_etag_versions
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008_pr_versions"
+down_revision: Union[str, None] = "007_etag_versions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "pull_requests",
+        sa.Column("version", sa.BigInteger(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("pull_requests", "version")
@@ -1,62 +1,149 @@
+import asyncio
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
-from app.database.base import Base, get_db
+from app.core.query_stats import QueryStats, instrument_queries
+from app.database.base import Base, async_url, get_db
 from app.main import app
+from app.repositories.dependencies import get_repository
+from app.repositories.memory import MemoryRepository, MemoryStorage
+from app.services.roster_cache import roster_cache
 
 assert settings.TEST_DATABASE_URL is not None, "TEST_DATABASE_URL must be set"
 TEST_DATABASE_URL = settings.TEST_DATABASE_URL
+# STORAGE_BACKEND=memory pytest - те же тесты API на хранилище в памяти
+MEMORY_BACKEND = settings.STORAGE_BACKEND == "memory"
+# без прогрева при старте приложения: данные тестов не закоммичены, и в каждом тесте
+# клиент запускает приложение заново
+settings.DB_WARMUP_CONNECTIONS = 0
+settings.ROSTER_CACHE_WARMUP = False
 
-engine = create_engine(
-    TEST_DATABASE_URL,
+engine = create_async_engine(
+    async_url(TEST_DATABASE_URL),
     poolclass=NullPool,
     echo=False,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_queries()
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False, join_transaction_mode="create_savepoint"
+)
+
+
+async def _create_schema():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+
+async def _drop_schema():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+
+
+def pytest_collection_modifyitems(config, items):
+    """Тесты с пометкой postgres проверяют работу с бд и пропускаются для хранилища в памяти"""
+    if not MEMORY_BACKEND:
+        return
+    skip = pytest.mark.skip(reason="STORAGE_BACKEND=memory")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
 
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_db():
     """Создает и удаляет тестовую бд"""
+    if MEMORY_BACKEND:
+        yield
+        return
 
-    Base.metadata.create_all(bind=engine)
+    asyncio.run(_create_schema())
     yield
-    Base.metadata.drop_all(bind=engine)
+    asyncio.run(_drop_schema())
+
+
+@pytest.fixture(scope="function", autouse=True)
+def clear_roster_cache():
+    """Очищает кэш составов команд: данные каждого теста откатываются"""
+    roster_cache.clear()
+    yield
+    roster_cache.clear()
 
 
 @pytest.fixture(scope="function")
-def db_session():
-    """Создает новую сессию бд"""
-    connection = engine.connect()
-    transaction = connection.begin()
+def test_client():
+    """Тестовый клиент с запущенным приложением"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="function")
+def portal(test_client):
+    """Event loop тестового клиента для вызова корутин из тестов"""
+    assert test_client.portal is not None
+    return test_client.portal
+
+
+@pytest.fixture(scope="function")
+def db_session(portal):
+    """Создает новую сессию бд в event loop клиента и откатывает изменения после теста"""
+    connection = portal.call(engine.connect().start)
+    transaction = portal.call(connection.begin().start)
     session = TestingSessionLocal(bind=connection)
 
     try:
         yield session
-        session.flush()
-    except Exception:
-        transaction.rollback()
-        raise
     finally:
-        session.close()
-        transaction.rollback()
-        connection.close()
+        portal.call(session.close)
+        portal.call(transaction.rollback)
+        portal.call(connection.close)
 
 
 @pytest.fixture(scope="function")
-def client(db_session):
-    """Тестовый клиент"""
+def client(request, test_client):
+    """Тестовый клиент; для хранилища в памяти - новое пустое хранилище на тест"""
+    if MEMORY_BACKEND:
+        storage = MemoryStorage()
+        app.dependency_overrides[get_repository] = lambda: MemoryRepository(storage)
+    else:
+        db_session = request.getfixturevalue("db_session")
 
-    def override_get_db():
-        try:
+        async def override_get_db():
             yield db_session
-        finally:
-            pass
 
-    app.dependency_overrides[get_db] = override_get_db
-    yield TestClient(app)
+        app.dependency_overrides[get_db] = override_get_db
+    yield test_client
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="function")
+def max_queries():
+    """
+    Проверка верхней границы числа запросов к бд в блоке:
+    with max_queries(3): client.get(...)
+    """
+
+    @contextmanager
+    def check(limit: int):
+        stats = QueryStats()
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            stats.record(statement, 0.0)
+
+        event.listen(engine.sync_engine, "after_cursor_execute", record)
+        try:
+            yield stats
+        finally:
+            event.remove(engine.sync_engine, "after_cursor_execute", record)
+
+        shapes = "\n".join(f"{count} x {shape}" for shape, count in stats.shapes.most_common())
+        assert (
+            stats.statements <= limit
+        ), f"{stats.statements} queries, expected at most {limit}:\n{shapes}"
+
+    return check
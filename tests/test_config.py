@@ -0,0 +1,22 @@
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings
+
+
+def test_connection_budget_split_between_workers():
+    """Тест: пул воркера урезается до его доли DB_MAX_CONNECTIONS"""
+    settings = Settings(APP_WORKERS=4, DB_MAX_CONNECTIONS=100, DB_POOL_SIZE=20, DB_MAX_OVERFLOW=40)
+    assert (settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW) == (20, 5)
+
+    settings = Settings(APP_WORKERS=8, DB_MAX_CONNECTIONS=100, DB_POOL_SIZE=20, DB_MAX_OVERFLOW=40)
+    assert (settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW) == (12, 0)
+
+    settings = Settings(APP_WORKERS=8, DB_POOL_SIZE=20, DB_MAX_OVERFLOW=40)
+    assert (settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW) == (20, 40)
+
+
+def test_connection_budget_too_small():
+    """Тест: меньше 2 соединений на воркер - ошибка конфигурации"""
+    with pytest.raises(ValidationError, match="DB_MAX_CONNECTIONS"):
+        Settings(APP_WORKERS=4, DB_MAX_CONNECTIONS=7)
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.database.base import async_url, engine
+from app.main import app
+from app.services.roster_cache import roster_cache
+from app.services.warmup import readiness, warm_up
+from tests.conftest import TEST_DATABASE_URL
+
+
+def _wait_ready(client, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    response = client.get("/ready")
+    while response.status_code == 503 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        response = client.get("/ready")
+    return response
+
+
+def test_ready_after_warm_up(monkeypatch):
+    """Тест готовности: /ready отвечает 200 после прогрева и сбрасывается при остановке"""
+    monkeypatch.setattr(settings, "DB_WARMUP_CONNECTIONS", 3)
+    monkeypatch.setattr(settings, "ROSTER_CACHE_WARMUP", True)
+    with TestClient(app) as client:
+        response = _wait_ready(client)
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert response.json()["warmup_ms"] >= 0
+        assert client.get("/health").status_code == 200
+    assert not readiness.ready
+
+
+@pytest.mark.postgres
+def test_warm_up_opens_pool_connections(monkeypatch):
+    """Тест прогрева: соединения пула открыты до первого запроса"""
+    monkeypatch.setattr(settings, "DB_WARMUP_CONNECTIONS", 3)
+    with TestClient(app) as client:
+        assert _wait_ready(client).status_code == 200
+        # соединения прогрева свободны в пуле, ещё одно занято подпиской LISTEN
+        assert engine.pool.checkedin() >= 3  # type: ignore[attr-defined]
+
+
+@pytest.mark.postgres
+def test_warm_up_small_pool(monkeypatch):
+    """Тест прогрева при пуле меньше DB_WARMUP_CONNECTIONS: открываются только свободные места"""
+    monkeypatch.setattr(settings, "DB_WARMUP_CONNECTIONS", 5)
+    monkeypatch.setattr(settings, "ROSTER_CACHE_WARMUP", False)
+    small = create_async_engine(
+        async_url(TEST_DATABASE_URL), pool_size=3, max_overflow=0, pool_timeout=5
+    )
+
+    async def scenario():
+        # соединение занято, как подпиской LISTEN кэша составов
+        async with small.connect():
+            await warm_up(small)
+            checked_in = small.pool.checkedin()  # type: ignore[attr-defined]
+        await small.dispose()
+        return checked_in
+
+    try:
+        assert asyncio.run(scenario()) == 2
+        assert readiness.warmup_seconds is not None and readiness.warmup_seconds < 5
+    finally:
+        readiness.reset()
+
+
+@pytest.mark.postgres
+def test_roster_cache_prime(client, db_session, portal):
+    """Тест загрузки составов всех команд в кэш одним запросом"""
+    for team_name, user_id in (("prime_a", "pa1"), ("prime_b", "pb1")):
+        team_data = {
+            "team_name": team_name,
+            "members": [{"user_id": user_id, "username": user_id, "is_active": True}],
+        }
+        assert client.post("/team/add", json=team_data).status_code == 201
+
+    assert portal.call(roster_cache.prime, db_session) == 2
+    roster = portal.call(roster_cache.get_user_roster, db_session, "pb1")
+    assert roster is not None and roster.member_ids == {"pb1"}
+    stats = client.get("/health/cache").json()["roster"]
+    assert stats["teams"] == 2
+    assert stats["hits"] == 1 and stats["misses"] == 0
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from prometheus_client import generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.metrics import POOL_TIMEOUTS, InstrumentedQueuePool, metrics_registry
+from app.database.base import async_url
+from tests.conftest import TEST_DATABASE_URL
+
+
+def _parse(text):
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+def _samples(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return _parse(response.text)
+
+
+@pytest.mark.postgres
+def test_metrics(client):
+    """Тест метрик: запросы по шаблону маршрута, время бд методов сервисов, состояние пула"""
+    before = _samples(client)
+    team_data = {
+        "team_name": "metrics",
+        "members": [{"user_id": "m1", "username": "Alice", "is_active": True}],
+    }
+    client.post("/team/add", json=team_data)
+    client.get("/team/get", params={"team_name": "metrics"})
+    client.get("/team/get", params={"team_name": "missing"})
+    after = _samples(client)
+
+    def delta(name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        return after.get(key, 0) - before.get(key, 0)
+
+    assert delta("http_requests_total", method="GET", route="/team/get", status="200") == 1
+    assert delta("http_requests_total", method="GET", route="/team/get", status="404") == 1
+    assert delta("http_request_duration_seconds_count", method="GET", route="/team/get") == 2
+    assert delta("service_db_duration_seconds_count", method="TeamService.get_members") == 1
+    assert delta("service_db_statements_total", method="TeamService.get_team_version") == 2
+    assert ("db_pool_size", ()) in after
+    assert ("db_pool_checked_out", ()) in after
+
+
+def test_import_db_time_per_batch(client, monkeypatch):
+    """Тест времени бд импорта команд: учитываются записи пачек, а не чтение тела запроса"""
+    monkeypatch.setattr(settings, "TEAM_IMPORT_BATCH_SIZE", 1)
+    before = _samples(client)
+    body = b"\n".join(
+        json.dumps(
+            {"team_name": name, "members": [{"user_id": name, "username": name, "is_active": True}]}
+        ).encode()
+        for name in ("import_a", "import_b")
+    )
+    response = client.post(
+        "/team/import", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    after = _samples(client)
+
+    def count(method):
+        key = ("service_db_duration_seconds_count", (("method", method),))
+        return after.get(key, 0) - before.get(key, 0)
+
+    assert count("TeamService._import_batch") == 2
+    assert count("TeamService.import_teams") == 0
+
+
+# воркер: один запрос и два выданных соединения; остановленный воркер вызывает mark_process_dead
+WORKER = """
+import sys
+from app.core.config import settings
+from app.core.metrics import HTTP_REQUESTS, POOL_CHECKED_OUT, mark_process_dead
+HTTP_REQUESTS.labels("GET", "/team/get", "200").inc()
+POOL_CHECKED_OUT.set(2)
+if sys.argv[1] == "stopped":
+    mark_process_dead()
+"""
+
+
+def test_metrics_multiprocess(tmp_path, monkeypatch):
+    """Тест метрик нескольких воркеров: счётчики суммируются по всем, пул - по живым"""
+    root = Path(__file__).resolve().parent.parent
+    for state in ("running", "stopped"):
+        subprocess.run(
+            [sys.executable, "-c", WORKER, state],
+            cwd=root,
+            env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)},
+            check=True,
+        )
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    samples = _parse(generate_latest(metrics_registry()).decode())
+    labels = (("method", "GET"), ("route", "/team/get"), ("status", "200"))
+    assert samples[("http_requests_total", labels)] == 2
+    assert samples[("db_pool_checked_out", ())] == 2
+
+
+@pytest.mark.postgres
+def test_pool_timeout_metric():
+    """Тест: исчерпание пула учитывается в db_pool_timeouts_total"""
+
+    async def exhaust_pool():
+        engine = create_async_engine(
+            async_url(TEST_DATABASE_URL),
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.1,
+        )
+        try:
+            async with engine.connect():
+                with pytest.raises(exc.TimeoutError):
+                    async with engine.connect():
+                        pass
+        finally:
+            await engine.dispose()
+
+    before = POOL_TIMEOUTS._value.get()
+    asyncio.run(exhaust_pool())
+    assert POOL_TIMEOUTS._value.get() == before + 1
@@ -1,4 +1,20 @@
+import hashlib
+import time
+from typing import Tuple, Type
+
 import pytest
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.database.base import engine
+from app.models import ReviewerStats
+from app.repositories import postgres
+from app.repositories.base import Repository
+from app.repositories.memory import MemoryRepository
+from app.repositories.postgres import PostgresRepository
+from app.schemas.pull_request import MergePRRequest
+from app.services.pull_request_service import PullRequestService
+from app.services.roster_cache import ROSTER_CHANNEL
 
 
 @pytest.fixture
@@ -154,3 +170,424 @@ def test_reassign_reviewer_no_candidate(client, setup_team):
     )
     assert response.status_code == 409
     assert response.json()["error"]["code"] == "NO_CANDIDATE"
+
+
+def test_create_pr_skips_deactivated_reviewer(client, setup_team):
+    """Тест: после деактивации пользователь не назначается, даже если состав был в кэше"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    assert client.post("/pullRequest/create", json=pr_data).status_code == 201
+
+    client.post("/users/setIsActive", json={"user_id": "u2", "is_active": False})
+
+    for index in range(2, 7):
+        pr_data = {
+            "pull_request_id": f"pr-{index}",
+            "pull_request_name": "Add feature",
+            "author_id": "u1",
+        }
+        response = client.post("/pullRequest/create", json=pr_data)
+        assert sorted(response.json()["pr"]["assigned_reviewers"]) == ["u3", "u4"]
+
+
+@pytest.mark.postgres
+def test_roster_cache_stats(client, setup_team):
+    """Тест счётчиков кэша составов команд"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    reviewers = client.post("/pullRequest/create", json=pr_data).json()["pr"]["assigned_reviewers"]
+    assert len(reviewers) == 2
+
+    response = client.post(
+        "/pullRequest/reassign", json={"pull_request_id": "pr-1", "old_user_id": reviewers[0]}
+    )
+    client.post(
+        "/pullRequest/reassign",
+        json={"pull_request_id": "pr-1", "old_user_id": response.json()["replaced_by"]},
+    )
+
+    stats = client.get("/health/cache").json()["roster"]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+    client.post("/users/setIsActive", json={"user_id": "u2", "is_active": False})
+    invalidations = client.get("/health/cache").json()["roster"]["invalidations"]
+    assert invalidations >= 1
+    # флаг не изменился: кэш составов не сбрасывается
+    client.post("/users/setIsActive", json={"user_id": "u2", "is_active": False})
+    assert client.get("/health/cache").json()["roster"]["invalidations"] == invalidations
+
+
+@pytest.mark.postgres
+def test_roster_cache_invalidated_by_notification(client, setup_team, portal):
+    """Тест: уведомление об изменении состава из другого воркера сбрасывает кэш"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    reviewers = client.post("/pullRequest/create", json=pr_data).json()["pr"]["assigned_reviewers"]
+    client.post(
+        "/pullRequest/reassign", json={"pull_request_id": "pr-1", "old_user_id": reviewers[0]}
+    )
+    assert client.get("/health/cache").json()["roster"]["teams"] == 1
+
+    async def notify():
+        # запись в другом процессе: своё соединение, уведомление доставляется при коммите
+        async with engine.connect() as connection:
+            await connection.execute(
+                text("SELECT pg_notify(:channel, 'backend')"), {"channel": ROSTER_CHANNEL}
+            )
+            await connection.commit()
+
+    portal.call(notify)
+    deadline = time.monotonic() + 5
+    while client.get("/health/cache").json()["roster"]["teams"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert client.get("/health/cache").json()["roster"]["teams"] == 0
+
+
+def test_create_pr_duplicate_keeps_statistics(client, setup_team):
+    """Тест: повторное создание PR не меняет назначения и счётчики"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    reviewers = client.post("/pullRequest/create", json=pr_data).json()["pr"]["assigned_reviewers"]
+
+    other_author = {**pr_data, "pull_request_name": "Other", "author_id": "u2"}
+    assert client.post("/pullRequest/create", json=other_author).status_code == 409
+
+    stats = client.get("/statistics").json()
+    assert stats["pr_stats"] == {"total_prs": 1, "open_prs": 1, "merged_prs": 0}
+    assert sorted(item["user_id"] for item in stats["user_review_stats"]) == sorted(reviewers)
+    for reviewer_id in reviewers:
+        response = client.get("/users/getReview", params={"user_id": reviewer_id})
+        assert [pr["pull_request_id"] for pr in response.json()["pull_requests"]] == ["pr-1"]
+
+
+def test_create_pr_least_loaded_strategy(client, setup_team, monkeypatch):
+    """Тест стратегии least_loaded: назначения распределяются поровну"""
+    monkeypatch.setattr(settings, "REVIEWER_SELECTION_STRATEGY", "least_loaded")
+    for index in range(3):
+        pr_data = {
+            "pull_request_id": f"pr-{index}",
+            "pull_request_name": "Add feature",
+            "author_id": "u1",
+        }
+        assert client.post("/pullRequest/create", json=pr_data).status_code == 201
+
+    stats = client.get("/statistics").json()["user_review_stats"]
+    assert {item["user_id"]: item["assignments_count"] for item in stats} == {
+        "u2": 2,
+        "u3": 2,
+        "u4": 2,
+    }
+
+
+def test_reassign_round_robin_strategy(client, setup_team, monkeypatch):
+    """Тест стратегии round_robin: первыми назначаются ни разу не назначенные"""
+    monkeypatch.setattr(settings, "REVIEWER_SELECTION_STRATEGY", "round_robin")
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u2"}
+    response = client.post("/pullRequest/create", json=pr_data)
+    assert response.json()["pr"]["assigned_reviewers"] == ["u1", "u3"]
+
+    response = client.post(
+        "/pullRequest/reassign", json={"pull_request_id": "pr-1", "old_user_id": "u1"}
+    )
+    assert response.json()["replaced_by"] == "u4"
+
+
+def patch_replace_reviewer(monkeypatch, before_replace):
+    """Вызывать before_replace(repo, original, args) перед каждой заменой ревьювера"""
+    repository_classes: Tuple[Type[Repository], ...] = (PostgresRepository, MemoryRepository)
+    for repository_class in repository_classes:
+        original = repository_class.replace_reviewer
+
+        async def replace_reviewer(repo, *args, original=original):
+            return await before_replace(repo, original, *args)
+
+        monkeypatch.setattr(repository_class, "replace_reviewer", replace_reviewer)
+
+
+def test_reassign_retries_after_concurrent_change(client, setup_team, monkeypatch):
+    """Тест: замена по устаревшей версии PR не записывается, переназначение повторяется"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    reviewers = client.post("/pullRequest/create", json=pr_data).json()["pr"]["assigned_reviewers"]
+    first, second = reviewers
+    (free,) = {"u2", "u3", "u4"} - {first, second}
+    calls = []
+
+    async def before_replace(repo, original, pull_request_id, old_id, new_id, version):
+        calls.append(new_id)
+        if len(calls) == 1:
+            # конкурентная замена второго ревьювера между чтением PR и записью
+            assert await original(repo, pull_request_id, second, free, version) is not None
+        return await original(repo, pull_request_id, old_id, new_id, version)
+
+    patch_replace_reviewer(monkeypatch, before_replace)
+    response = client.post(
+        "/pullRequest/reassign", json={"pull_request_id": "pr-1", "old_user_id": first}
+    )
+    assert response.status_code == 200
+    assert calls == [free, second]
+    assert response.json()["replaced_by"] == second
+    assert sorted(response.json()["pr"]["assigned_reviewers"]) == sorted([free, second])
+
+    stats = client.get("/statistics").json()["user_review_stats"]
+    assert {
+        item["user_id"]: item["assignments_count"] for item in stats if item["assignments_count"]
+    } == {free: 1, second: 1}
+
+
+def test_reassign_gives_up_after_attempts(client, setup_team, monkeypatch):
+    """Тест: если PR меняется на каждой попытке, ответ 409 CONCURRENT_UPDATE без изменений"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    reviewers = client.post("/pullRequest/create", json=pr_data).json()["pr"]["assigned_reviewers"]
+    calls = []
+
+    async def before_replace(repo, original, pull_request_id, old_id, new_id, version):
+        calls.append(new_id)
+        return await original(repo, pull_request_id, old_id, new_id, version - 1)
+
+    patch_replace_reviewer(monkeypatch, before_replace)
+    response = client.post(
+        "/pullRequest/reassign", json={"pull_request_id": "pr-1", "old_user_id": reviewers[0]}
+    )
+    assert response.status_code == 409
+    assert response.json()["error"]["code"] == "CONCURRENT_UPDATE"
+    assert len(calls) == settings.PR_UPDATE_ATTEMPTS
+
+    response = client.get("/users/getReview", params={"user_id": reviewers[0]})
+    assert [pr["pull_request_id"] for pr in response.json()["pull_requests"]] == ["pr-1"]
+
+
+def test_create_pr_batch(client, setup_team):
+    """Тест пакетного создания PR с результатами по каждому элементу"""
+    pr_data = {"pull_request_id": "pr-0", "pull_request_name": "Existing", "author_id": "u1"}
+    client.post("/pullRequest/create", json=pr_data)
+
+    items = [
+        {"pull_request_id": "pr-0", "pull_request_name": "Existing", "author_id": "u1"},
+        {"pull_request_id": "pr-1", "pull_request_name": "First", "author_id": "u1"},
+        {"pull_request_id": "pr-2", "pull_request_name": "Second", "author_id": "u2"},
+        {"pull_request_id": "pr-1", "pull_request_name": "Repeated", "author_id": "u3"},
+        {"pull_request_id": "pr-3", "pull_request_name": "Unknown", "author_id": "nobody"},
+    ]
+    response = client.post("/pullRequest/createBatch", json={"items": items})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["created"] == 2
+    assert [(item["pull_request_id"], item["result"]) for item in data["results"]] == [
+        ("pr-0", "PR_EXISTS"),
+        ("pr-1", "CREATED"),
+        ("pr-2", "CREATED"),
+        ("pr-1", "PR_EXISTS"),
+        ("pr-3", "NOT_FOUND"),
+    ]
+    created = data["results"][2]["pr"]
+    assert created["author_id"] == "u2"
+    assert created["status"] == "OPEN"
+    assert len(created["assigned_reviewers"]) == 2
+    assert "u2" not in created["assigned_reviewers"]
+
+    stats = client.get("/statistics").json()
+    assert stats["pr_stats"] == {"total_prs": 3, "open_prs": 3, "merged_prs": 0}
+    assert sum(item["assignments_count"] for item in stats["user_review_stats"]) == 6
+    for reviewer_id in created["assigned_reviewers"]:
+        response = client.get("/users/getReview", params={"user_id": reviewer_id})
+        assert "pr-2" in [pr["pull_request_id"] for pr in response.json()["pull_requests"]]
+
+
+def test_create_pr_batch_validation(client):
+    """Тест ограничения размера пакета"""
+    assert client.post("/pullRequest/createBatch", json={"items": []}).status_code == 422
+    items = [
+        {"pull_request_id": f"pr-{index}", "pull_request_name": "PR", "author_id": "u1"}
+        for index in range(1001)
+    ]
+    assert client.post("/pullRequest/createBatch", json={"items": items}).status_code == 422
+
+
+def test_merge_pr_batch(client, setup_team):
+    """Тест пакетного merge: порядок запроса без повторов, ненайденные PR, идемпотентность"""
+    for index in range(1, 4):
+        pr_data = {"pull_request_id": f"pr-{index}", "pull_request_name": "PR", "author_id": "u1"}
+        client.post("/pullRequest/create", json=pr_data)
+    merged_at = client.post("/pullRequest/merge", json={"pull_request_id": "pr-1"}).json()["pr"][
+        "mergedAt"
+    ]
+
+    request = {"pull_request_ids": ["pr-2", "missing", "pr-1", "pr-2"]}
+    response = client.post("/pullRequest/mergeBatch", json=request)
+    assert response.status_code == 200
+    data = response.json()
+    assert [pr["pull_request_id"] for pr in data["prs"]] == ["pr-2", "pr-1"]
+    assert all(pr["status"] == "MERGED" for pr in data["prs"])
+    assert len(data["prs"][0]["assigned_reviewers"]) == 2
+    assert data["prs"][1]["mergedAt"] == merged_at
+    assert data["not_found"] == ["missing"]
+
+    stats = client.get("/statistics").json()
+    assert stats["pr_stats"] == {"total_prs": 3, "open_prs": 1, "merged_prs": 2}
+    for reviewer_id in data["prs"][0]["assigned_reviewers"]:
+        params = {"user_id": reviewer_id, "status": "OPEN"}
+        response = client.get("/users/getReview", params=params)
+        assert "pr-2" not in [pr["pull_request_id"] for pr in response.json()["pull_requests"]]
+
+    # повтор ничего не меняет
+    repeated = client.post("/pullRequest/mergeBatch", json=request).json()
+    assert repeated == data
+    assert client.get("/statistics").json() == stats
+
+
+def test_merge_pr_batch_validation(client):
+    """Тест ограничения размера пакета merge"""
+    response = client.post("/pullRequest/mergeBatch", json={"pull_request_ids": []})
+    assert response.status_code == 422
+    request = {"pull_request_ids": [f"pr-{index}" for index in range(1001)]}
+    assert client.post("/pullRequest/mergeBatch", json=request).status_code == 422
+
+
+@pytest.mark.postgres
+def test_merge_pr_batch_single_query(client, setup_team, db_session, portal, max_queries):
+    """Тест пакетного merge одним запросом к бд; нагрузка ревьюверов совпадает с пересчётом"""
+    for index in range(1, 6):
+        pr_data = {"pull_request_id": f"pr-{index}", "pull_request_name": "PR", "author_id": "u1"}
+        client.post("/pullRequest/create", json=pr_data)
+    version = client.get("/users/getReview", params={"user_id": "u2"}).headers["ETag"]
+
+    request = {"pull_request_ids": [f"pr-{index}" for index in range(1, 5)]}
+    with max_queries(1):
+        response = client.post("/pullRequest/mergeBatch", json=request)
+    assert len(response.json()["prs"]) == 4
+
+    def open_review_counts():
+        result = portal.call(
+            db_session.execute, select(ReviewerStats.user_id, ReviewerStats.open_reviews_count)
+        )
+        return dict(result.all())
+
+    counts = open_review_counts()
+    assert sum(counts.values()) == 2
+    portal.call(PostgresRepository(db_session).rebuild_counters)
+    assert open_review_counts() == counts
+    assert client.get("/users/getReview", params={"user_id": "u2"}).headers["ETag"] != version
+
+
+def test_reassign_idempotency_key_replays_response(client, setup_team):
+    """Тест повтора reassign с Idempotency-Key: ответ первого запроса, без новой замены"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    reviewers = client.post("/pullRequest/create", json=pr_data).json()["pr"]["assigned_reviewers"]
+    reassign_data = {"pull_request_id": "pr-1", "old_user_id": reviewers[0]}
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = client.post("/pullRequest/reassign", json=reassign_data, headers=headers)
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    replay = client.post("/pullRequest/reassign", json=reassign_data, headers=headers)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == first.json()
+
+    # тот же запрос без ключа выполняется заново: старый ревьювер уже заменён
+    response = client.post("/pullRequest/reassign", json=reassign_data)
+    assert response.status_code == 409
+    assert response.json()["error"]["code"] == "NOT_ASSIGNED"
+
+
+def test_reassign_idempotency_key_after_concurrent_update(client, setup_team, monkeypatch):
+    """Тест повтора reassign с Idempotency-Key после CONCURRENT_UPDATE: запрос выполняется заново"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    reviewers = client.post("/pullRequest/create", json=pr_data).json()["pr"]["assigned_reviewers"]
+    reassign_data = {"pull_request_id": "pr-1", "old_user_id": reviewers[0]}
+    headers = {"Idempotency-Key": "retry-conflict"}
+
+    async def modified_concurrently(repo, request):
+        return None
+
+    with monkeypatch.context() as patch:
+        patch.setattr(PullRequestService, "_try_reassign", modified_concurrently)
+        response = client.post("/pullRequest/reassign", json=reassign_data, headers=headers)
+    assert response.status_code == 409
+    assert response.json()["error"]["code"] == "CONCURRENT_UPDATE"
+
+    response = client.post("/pullRequest/reassign", json=reassign_data, headers=headers)
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
+    assert response.json()["replaced_by"] not in reviewers
+
+
+def test_create_pr_idempotency_key(client, setup_team):
+    """Тест повтора create с Idempotency-Key: 201 вместо PR_EXISTS, ошибки тоже повторяются"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    headers = {"Idempotency-Key": "create-1"}
+    first = client.post("/pullRequest/create", json=pr_data, headers=headers)
+    replay = client.post("/pullRequest/create", json=pr_data, headers=headers)
+    assert first.status_code == replay.status_code == 201
+    assert replay.json() == first.json()
+
+    missing = {"pull_request_id": "missing"}
+    headers = {"Idempotency-Key": "merge-1"}
+    assert client.post("/pullRequest/merge", json=missing, headers=headers).status_code == 404
+    client.post("/pullRequest/create", json={**pr_data, "pull_request_id": "missing"})
+    replay = client.post("/pullRequest/merge", json=missing, headers=headers)
+    assert replay.status_code == 404
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+
+def test_idempotency_key_reused_with_other_request(client, setup_team):
+    """Тест ключа, повторённого с другим телом запроса"""
+    headers = {"Idempotency-Key": "shared"}
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    assert client.post("/pullRequest/create", json=pr_data, headers=headers).status_code == 201
+
+    other = {**pr_data, "pull_request_id": "pr-2"}
+    response = client.post("/pullRequest/create", json=other, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["error"]["code"] == "IDEMPOTENCY_KEY_REUSED"
+    # ключи разных маршрутов не пересекаются
+    response = client.post("/pullRequest/merge", json={"pull_request_id": "pr-1"}, headers=headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.postgres
+def test_idempotency_key_in_progress_and_replay_queries(
+    client, setup_team, db_session, portal, max_queries
+):
+    """Тест ключа, занятого незавершённым запросом, и числа запросов к бд при повторе"""
+    merge_data = MergePRRequest(pull_request_id="pr-1")
+    fingerprint = hashlib.sha256(merge_data.model_dump_json().encode()).hexdigest()
+    repo = PostgresRepository(db_session)
+    portal.call(repo.reserve_idempotency_key, "/pullRequest/merge", "busy", fingerprint, 60)
+
+    headers = {"Idempotency-Key": "busy"}
+    response = client.post("/pullRequest/merge", json=merge_data.model_dump(), headers=headers)
+    assert response.status_code == 409
+    assert response.json()["error"]["code"] == "IDEMPOTENCY_KEY_IN_USE"
+
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    headers = {"Idempotency-Key": "create-1"}
+    client.post("/pullRequest/create", json=pr_data, headers=headers)
+    # повтор - один запрос: попытка занять ключ возвращает сохранённый ответ
+    with max_queries(1):
+        response = client.post("/pullRequest/create", json=pr_data, headers=headers)
+    assert response.status_code == 201
+
+
+@pytest.mark.postgres
+def test_idempotency_key_contended(client, setup_team, monkeypatch, max_queries):
+    """Тест ключа, который конкуренты занимают и освобождают между попытками: 409, без рекурсии"""
+    # ключ занят после начала снимка и освобождён до следующей попытки: строк нет каждый раз
+    monkeypatch.setattr(
+        postgres, "RESERVE_IDEMPOTENCY_KEY", text("SELECT true AS reserved WHERE false")
+    )
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Add feature", "author_id": "u1"}
+    with max_queries(postgres.RESERVE_IDEMPOTENCY_ATTEMPTS):
+        response = client.post(
+            "/pullRequest/create", json=pr_data, headers={"Idempotency-Key": "contended"}
+        )
+    assert response.status_code == 409
+    assert response.json()["error"]["code"] == "IDEMPOTENCY_KEY_IN_USE"
+
+
+@pytest.mark.postgres
+def test_purge_idempotency_keys(client, db_session, portal):
+    """Тест удаления истёкших ключей идемпотентности"""
+    repo = PostgresRepository(db_session)
+    portal.call(repo.reserve_idempotency_key, "/pullRequest/merge", "expired", "f", 0)
+    portal.call(repo.reserve_idempotency_key, "/pullRequest/merge", "alive", "f", 60)
+    assert portal.call(repo.purge_idempotency_keys, 10) == 1
+    assert portal.call(repo.reserve_idempotency_key, "/pullRequest/merge", "alive", "f", 60)
@@ -0,0 +1,371 @@
+"""
+Регрессии планов запросов сервисов. На синтетических данных (40000 PR, 20000 пользователей)
+выполняются сценарии TeamService, UserService, PullRequestService и StatisticsService;
+каждый запрос к бд сценария объясняется EXPLAIN (FORMAT JSON). Тест падает, если в плане
+появился Seq Scan по pull_requests или users (кроме разрешённых сценарию), сценарий не
+читает по индексу таблицы, которые отбирает фильтром или пакетом, или оценка стоимости
+выше базовой больше чем на PLAN_COST_TOLERANCE. Данные загружаются в транзакции теста и
+откатываются.
+
+Записать базовые стоимости заново (после намеренного изменения запросов):
+UPDATE_PLAN_BASELINE=1 pytest tests/test_query_plans.py
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    TypedDict,
+)
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models.pull_request import PRStatus
+from app.repositories.postgres import PostgresRepository
+from app.schemas.pull_request import PullRequestCreate, ReassignPRRequest
+from app.schemas.statistics import StatisticsFilters
+from app.schemas.team import TeamCreate, TeamMember
+from app.schemas.user import BulkDeactivateRequest, SetIsActiveRequest
+from app.services.pull_request_service import PullRequestService
+from app.services.statistics_service import StatisticsService
+from app.services.team_service import TeamService
+from app.services.user_service import UserService
+from benchmarks.common import Dataset, copy_rows, generate
+from tests.conftest import TestingSessionLocal, engine
+
+BASELINE_PATH = Path(__file__).with_name("query_plans_baseline.json")
+PLAN_COST_TOLERANCE = 0.25
+# рост стоимости меньше этого не считается: стоимость дешёвых запросов зависит от случайного
+# выбора ревьюверов
+PLAN_COST_MIN_DELTA = 1.0
+# таблицы, по которым Seq Scan - регрессия
+CHECKED_TABLES = frozenset({"pull_requests", "users"})
+INDEX_SCANS = frozenset({"Index Scan", "Index Only Scan", "Bitmap Heap Scan"})
+EXPLAINED = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+Run = Callable[[PostgresRepository, Dataset], Awaitable[object]]
+
+
+@dataclass
+class Scenario:
+    """
+    Вызов сервиса; allow_seq_scan - таблицы, которые сценарий читает целиком по смыслу,
+    require_index - таблицы, которые сценарий отбирает фильтром или пакетом и должен
+    читать по индексу
+    """
+
+    name: str
+    run: Run
+    allow_seq_scan: FrozenSet[str] = field(default_factory=frozenset)
+    require_index: FrozenSet[str] = field(default_factory=frozenset)
+
+
+async def _ndjson(*teams: TeamCreate) -> AsyncIterator[bytes]:
+    for team in teams:
+        yield team.model_dump_json().encode() + b"\n"
+
+
+def _member(user_id: str) -> TeamMember:
+    return TeamMember(user_id=user_id, username=user_id, is_active=True)
+
+
+def _reviewer(dataset: Dataset, index: int) -> str:
+    return dataset.reviewers[dataset.open_prs[index]][0]
+
+
+NOW = datetime.now(timezone.utc)
+
+SCENARIOS = [
+    Scenario(
+        "TeamService.create_team",
+        lambda repo, dataset: TeamService.create_team(
+            repo,
+            TeamCreate(
+                team_name="plan_team",
+                members=[_member("plan_u1"), _member("u_0_1")],
+            ),
+        ),
+    ),
+    Scenario(
+        "TeamService.import_teams",
+        lambda repo, dataset: TeamService.import_teams(
+            repo,
+            _ndjson(
+                TeamCreate(team_name="plan_import", members=[_member("plan_u2")]),
+                TeamCreate(team_name="team_2", members=[_member("u_2_0")]),
+            ),
+        ),
+    ),
+    Scenario(
+        "TeamService.get_team_version",
+        lambda repo, dataset: TeamService.get_team_version(repo, "team_7"),
+    ),
+    Scenario(
+        "TeamService.get_members", lambda repo, dataset: TeamService.get_members(repo, "team_7")
+    ),
+    Scenario(
+        "UserService.set_is_active",
+        lambda repo, dataset: UserService.set_is_active(
+            repo, SetIsActiveRequest(user_id=_reviewer(dataset, 0), is_active=False)
+        ),
+    ),
+    Scenario(
+        "UserService.bulk_deactivate",
+        lambda repo, dataset: UserService.bulk_deactivate(
+            repo, BulkDeactivateRequest(team_name="team_3", user_ids=["u_3_1", "u_3_2"])
+        ),
+        require_index=frozenset({"users"}),
+    ),
+    Scenario(
+        "UserService.get_reviews_version",
+        lambda repo, dataset: UserService.get_reviews_version(repo, "u_5_5"),
+    ),
+    Scenario(
+        "UserService.get_user_reviews",
+        lambda repo, dataset: UserService.get_user_reviews(repo, "u_5_5", limit=20),
+    ),
+    Scenario(
+        "UserService.get_user_reviews status",
+        lambda repo, dataset: UserService.get_user_reviews(
+            repo, "u_5_5", status=PRStatus.OPEN, limit=20
+        ),
+    ),
+    Scenario(
+        "PullRequestService.create_pr",
+        lambda repo, dataset: PullRequestService.create_pr(
+            repo,
+            PullRequestCreate(
+                pull_request_id="plan_pr", pull_request_name="Plan", author_id="u_9_0"
+            ),
+        ),
+    ),
+    Scenario(
+        "PullRequestService.create_batch",
+        lambda repo, dataset: PullRequestService.create_batch(
+            repo,
+            [
+                PullRequestCreate(
+                    pull_request_id=f"plan_batch_{index}",
+                    pull_request_name="Plan",
+                    author_id=f"u_{index}_0",
+                )
+                for index in range(10, 15)
+            ],
+        ),
+        require_index=frozenset({"pull_requests", "users"}),
+    ),
+    Scenario(
+        "PullRequestService.merge_pr",
+        lambda repo, dataset: PullRequestService.merge_pr(repo, dataset.open_prs[10]),
+    ),
+    Scenario(
+        "PullRequestService.merge_batch",
+        lambda repo, dataset: PullRequestService.merge_batch(
+            repo, dataset.open_prs[30:80] + dataset.merged_prs[:10] + ["plan_missing"]
+        ),
+        require_index=frozenset({"pull_requests"}),
+    ),
+    Scenario(
+        "PullRequestService.reassign_reviewer",
+        lambda repo, dataset: PullRequestService.reassign_reviewer(
+            repo,
+            ReassignPRRequest(
+                pull_request_id=dataset.open_prs[20], old_user_id=_reviewer(dataset, 20)
+            ),
+        ),
+    ),
+    # без фильтров читаются счётчики: рейтинг соединяется с users по всем ревьюверам
+    Scenario(
+        "StatisticsService.get_statistics",
+        lambda repo, dataset: StatisticsService.get_statistics(repo),
+        allow_seq_scan=frozenset({"users"}),
+    ),
+    Scenario(
+        "StatisticsService.get_statistics team",
+        lambda repo, dataset: StatisticsService.get_statistics(
+            repo, StatisticsFilters(team_name="team_4", limit=10)
+        ),
+        require_index=frozenset({"pull_requests", "users"}),
+    ),
+    Scenario(
+        "StatisticsService.get_statistics created window",
+        lambda repo, dataset: StatisticsService.get_statistics(
+            repo, StatisticsFilters(created_from=NOW - timedelta(days=7), limit=10)
+        ),
+        require_index=frozenset({"pull_requests", "users"}),
+    ),
+    Scenario(
+        "StatisticsService.get_statistics merged window",
+        lambda repo, dataset: StatisticsService.get_statistics(
+            repo, StatisticsFilters(merged_from=NOW - timedelta(days=7), merged_to=NOW, limit=10)
+        ),
+        require_index=frozenset({"pull_requests", "users"}),
+    ),
+    Scenario(
+        "StatisticsService.get_statistics status",
+        lambda repo, dataset: StatisticsService.get_statistics(
+            repo, StatisticsFilters(status=PRStatus.OPEN, limit=10)
+        ),
+        require_index=frozenset({"pull_requests", "users"}),
+    ),
+    # пересчёт читает все PR и назначения
+    Scenario(
+        "StatisticsService.rebuild_counters",
+        lambda repo, dataset: StatisticsService.rebuild_counters(repo),
+        allow_seq_scan=frozenset({"pull_requests"}),
+    ),
+]
+
+
+@dataclass
+class Plan:
+    """План запроса сценария"""
+
+    scenario: str
+    key: str
+    sql: str
+    cost: float
+    seq_scans: FrozenSet[str]
+    index_scans: FrozenSet[str]
+
+
+class BaselineEntry(TypedDict):
+    """Базовая стоимость запроса"""
+
+    cost: float
+    sql: str
+
+
+def _nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def _statement_key(scenario: str, statement: str) -> str:
+    return f"{scenario} {hashlib.sha1(statement.encode()).hexdigest()[:10]}"
+
+
+async def _explain(connection: AsyncConnection, scenario: str, statement: str, params) -> Plan:
+    result = await connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, params)
+    document = result.scalar_one()
+    plan = (json.loads(document) if isinstance(document, str) else document)[0]["Plan"]
+    return Plan(
+        scenario=scenario,
+        key=_statement_key(scenario, statement),
+        sql=" ".join(statement.split())[:160],
+        cost=plan["Total Cost"],
+        seq_scans=frozenset(
+            node["Relation Name"]
+            for node in _nodes(plan)
+            if node["Node Type"] == "Seq Scan" and "Relation Name" in node
+        ),
+        index_scans=frozenset(
+            node["Relation Name"]
+            for node in _nodes(plan)
+            if node["Node Type"] in INDEX_SCANS and "Relation Name" in node
+        ),
+    )
+
+
+async def _collect_plans() -> List[Plan]:
+    """Загрузить данные, выполнить сценарии и объяснить их запросы; всё откатывается"""
+    dataset, rows = generate(teams=1000, users_per_team=20, prs=40000)
+    captured: List[tuple] = []
+    capturing = False
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        # executemany объясняется по первому набору параметров
+        if capturing and EXPLAINED.match(statement):
+            captured.append((statement, parameters[0] if executemany else parameters))
+
+    # откаченные данные других тестов остаются в таблицах мёртвыми строками и увеличивают
+    # оценки стоимости: VACUUM возвращает таблицы к одинаковому состоянию перед загрузкой
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("VACUUM"))
+
+    async with engine.connect() as connection:
+        await connection.begin()
+        # asyncpg открывает транзакцию при первом запросе: COPY должен попасть в неё
+        await connection.execute(text("SELECT 1"))
+        raw_connection = await connection.get_raw_connection()
+        await copy_rows(raw_connection.driver_connection, rows)
+        session = TestingSessionLocal(bind=connection)
+        repo = PostgresRepository(session)
+        await repo.rebuild_counters()
+        await connection.execute(text("ANALYZE"))
+
+        plans = []
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            for scenario in SCENARIOS:
+                captured.clear()
+                capturing = True
+                await scenario.run(repo, dataset)
+                capturing = False
+                for statement, params in captured:
+                    plans.append(await _explain(connection, scenario.name, statement, params))
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+            await session.close()
+            await connection.rollback()
+    return plans
+
+
+@pytest.mark.postgres
+def test_query_plans():
+    """
+    Тест планов запросов сервисов: без Seq Scan по PR и пользователям, отбор по индексам,
+    стоимость не выросла
+    """
+    plans = asyncio.run(_collect_plans())
+    allowed = {scenario.name: scenario.allow_seq_scan for scenario in SCENARIOS}
+    # одинаковые запросы сценария (например, в цикле) сравниваются по наибольшей стоимости
+    by_key: Dict[str, Plan] = {}
+    indexed: Dict[str, FrozenSet[str]] = {scenario.name: frozenset() for scenario in SCENARIOS}
+    for plan in plans:
+        if plan.key not in by_key or plan.cost > by_key[plan.key].cost:
+            by_key[plan.key] = plan
+        indexed[plan.scenario] |= plan.index_scans
+
+    if os.environ.get("UPDATE_PLAN_BASELINE"):
+        entries = {key: {"cost": plan.cost, "sql": plan.sql} for key, plan in by_key.items()}
+        BASELINE_PATH.write_text(json.dumps(entries, indent=2, ensure_ascii=False) + "\n")
+    baseline: Dict[str, BaselineEntry] = json.loads(BASELINE_PATH.read_text())
+
+    problems = []
+    for scenario in SCENARIOS:
+        missing = scenario.require_index - indexed[scenario.name]
+        if missing:
+            problems.append(f"{scenario.name}: no index scan on {', '.join(sorted(missing))}")
+    for key, plan in sorted(by_key.items()):
+        seq_scans = (plan.seq_scans & CHECKED_TABLES) - allowed[plan.scenario]
+        if seq_scans:
+            problems.append(f"{key}: Seq Scan on {', '.join(sorted(seq_scans))}\n  {plan.sql}")
+        if key not in baseline:
+            problems.append(f"{key}: no baseline cost (UPDATE_PLAN_BASELINE=1)\n  {plan.sql}")
+        elif plan.cost > max(
+            baseline[key]["cost"] * (1 + PLAN_COST_TOLERANCE),
+            baseline[key]["cost"] + PLAN_COST_MIN_DELTA,
+        ):
+            problems.append(
+                f"{key}: cost {plan.cost:.1f} > baseline {baseline[key]['cost']:.1f}\n"
+                f"  {plan.sql}"
+            )
+    assert not problems, "\n".join(problems)
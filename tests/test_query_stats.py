@@ -0,0 +1,127 @@
+import logging
+
+import pytest
+
+from app.core.config import settings
+from app.core.query_stats import QueryStats, statement_shape
+
+
+@pytest.fixture
+def setup_team(client):
+    """Создание команды с пользователями"""
+    team_data = {
+        "team_name": "backend",
+        "members": [
+            {"user_id": f"u{index}", "username": f"User {index}", "is_active": True}
+            for index in range(1, 9)
+        ],
+    }
+    client.post("/team/add", json=team_data)
+    return team_data
+
+
+def create_prs(client, count, prefix="pr"):
+    """Создание count PR автора u1"""
+    items = [
+        {"pull_request_id": f"{prefix}-{index}", "pull_request_name": "PR", "author_id": "u1"}
+        for index in range(count)
+    ]
+    response = client.post("/pullRequest/createBatch", json={"items": items})
+    assert response.status_code == 200
+    return response.json()["results"]
+
+
+def test_statement_shape():
+    """Тест: запросы, отличающиеся только параметрами, имеют один вид"""
+    single = "SELECT * FROM users WHERE user_id IN ($1::VARCHAR) AND team_name = $2::VARCHAR"
+    many = (
+        "SELECT * FROM users\n"
+        "WHERE user_id IN ($1::VARCHAR, $2::VARCHAR, $3::VARCHAR) AND team_name = $4::VARCHAR"
+    )
+    assert statement_shape(single) == statement_shape(many)
+    assert statement_shape(single) == "SELECT * FROM users WHERE user_id IN (?) AND team_name = ?"
+
+    stats = QueryStats()
+    for index in range(3):
+        stats.record(f"SELECT * FROM users WHERE user_id = ${index + 1}", 0.001)
+    stats.record("SAVEPOINT sa_savepoint_1", 0.001)
+    assert stats.statements == 3
+    assert stats.repeated(3) == [("SELECT * FROM users WHERE user_id = ?", 3)]
+    assert stats.repeated(4) == []
+
+
+@pytest.mark.postgres
+def test_query_budget(client, setup_team, max_queries):
+    """Тест: число запросов к бд на эндпоинтах не растёт незаметно"""
+    reviewer_id = create_prs(client, 3)[0]["pr"]["assigned_reviewers"][0]
+
+    with max_queries(2):
+        client.get("/team/get", params={"team_name": "backend"})
+    with max_queries(2):
+        client.get("/users/getReview", params={"user_id": reviewer_id})
+    # пользователь без назначений: версия не найдена, существование проверяется отдельно
+    with max_queries(3):
+        client.get("/users/getReview", params={"user_id": "u1"})
+    with max_queries(2):
+        client.get("/statistics")
+    with max_queries(2):
+        client.get("/statistics", params={"status": "OPEN"})
+    with max_queries(1):
+        client.post(
+            "/pullRequest/create",
+            json={"pull_request_id": "pr-new", "pull_request_name": "PR", "author_id": "u1"},
+        )
+    with max_queries(8):
+        client.post("/pullRequest/merge", json={"pull_request_id": "pr-0"})
+    # + блокировка PR ревьювера с увеличением их версий перед переназначением
+    with max_queries(9):
+        client.post("/users/setIsActive", json={"user_id": reviewer_id, "is_active": False})
+
+
+@pytest.mark.postgres
+def test_query_count_independent_of_batch_size(client, setup_team, max_queries):
+    """Тест: пакетные эндпоинты выполняют одно и то же число запросов при любом размере пакета"""
+    with max_queries(100) as small:
+        create_prs(client, 2, prefix="small")
+    with max_queries(small.statements):
+        create_prs(client, 20, prefix="large")
+
+    with max_queries(100) as single:
+        client.post("/users/bulkDeactivate", json={"team_name": "backend", "user_ids": ["u2"]})
+    with max_queries(single.statements) as several:
+        client.post(
+            "/users/bulkDeactivate", json={"team_name": "backend", "user_ids": ["u3", "u4", "u5"]}
+        )
+    assert several.repeated(2) == []
+
+
+@pytest.mark.postgres
+def test_query_stats_headers(client, setup_team, monkeypatch):
+    """Тест: в режиме DEBUG ответ содержит число и время запросов к бд"""
+    response = client.get("/team/get", params={"team_name": "backend"})
+    assert "X-DB-Queries" not in response.headers
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+    response = client.get("/team/get", params={"team_name": "backend"})
+    assert response.headers["X-DB-Queries"] == "2"
+    assert float(response.headers["X-DB-Time-Ms"]) > 0
+
+    response = client.get("/health")
+    assert response.headers["X-DB-Queries"] == "0"
+
+
+@pytest.mark.postgres
+def test_query_stats_logging(client, setup_team, monkeypatch, caplog):
+    """Тест: медленные запросы пишутся в лог с параметрами, повторы - как возможный N+1"""
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.000001)
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 1)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        client.get("/team/get", params={"team_name": "backend"})
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith("slow query") and "'backend'" in message for message in messages)
+    assert any(
+        message.startswith("possible N+1: 1 identical queries in GET /team/get")
+        for message in messages
+    )
@@ -0,0 +1,51 @@
+import json
+from datetime import datetime, timezone
+
+from app.core.responses import FastJSONResponse
+from app.models import PRStatus, PullRequest, Team, User
+from app.schemas import serializers
+from app.schemas.pull_request import (
+    PullRequestMergeResponseItem,
+    PullRequestReassignResponseItem,
+    PullRequestShort,
+)
+from app.schemas.team import TeamResponse
+from app.schemas.user import UserResponse
+
+
+def _render(content):
+    return json.loads(FastJSONResponse(content).body)
+
+
+def test_serializers_match_response_schemas():
+    """Тест: сериализаторы дают тот же JSON, что и схемы ответов"""
+    members = [
+        User(
+            user_id=f"u{index}",
+            username=f"User{index}",
+            team_name="backend",
+            is_active=bool(index % 2),
+        )
+        for index in range(3)
+    ]
+    team = Team(team_name="backend", members=members)
+    pr = PullRequest(
+        pull_request_id="pr-1",
+        pull_request_name="Test PR",
+        author_id="u0",
+        status=PRStatus.MERGED,
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        merged_at=datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc),
+    )
+    pr.assigned_reviewers.extend(["u1", "u2"])
+
+    cases = [
+        (serializers.team(team.team_name, team.members), TeamResponse.model_validate(team)),
+        (serializers.user(members[0]), UserResponse.model_validate(members[0])),
+        (serializers.pull_request_short(pr), PullRequestShort.model_validate(pr)),
+        (serializers.pull_request(pr), PullRequestReassignResponseItem.model_validate(pr)),
+        (serializers.merged_pull_request(pr), PullRequestMergeResponseItem.model_validate(pr)),
+    ]
+    for content, model in cases:
+        assert _render(content) == _render(model)
+        assert _render(content) == json.loads(model.model_dump_json(by_alias=True))
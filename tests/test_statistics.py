@@ -1,4 +1,15 @@
+import asyncio
+
 import pytest
+from sqlalchemy import select, text
+
+from app.models import ReviewerStats
+from app.repositories.memory import MemoryRepository, MemoryStorage
+from app.repositories.postgres import PostgresRepository
+from app.schemas.pull_request import PullRequestCreate
+from app.schemas.statistics import StatisticsFilters
+from app.schemas.team import TeamCreate
+from app.services.statistics_service import StatisticsService
 
 
 @pytest.fixture
@@ -56,3 +67,154 @@ def test_get_statistics_empty(client):
     assert data["pr_stats"]["merged_prs"] == 0
 
     assert len(data["user_review_stats"]) == 0
+
+
+def test_get_statistics_follows_reassignment(client, setup_team_and_prs):
+    """Тест обновления счётчиков назначений при переназначении и деактивации"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "frontend",
+            "members": [
+                {"user_id": "f1", "username": "Frank", "is_active": True},
+                {"user_id": "f2", "username": "Grace", "is_active": True},
+                {"user_id": "f3", "username": "Heidi", "is_active": True},
+                {"user_id": "f4", "username": "Ivan", "is_active": True},
+            ],
+        },
+    )
+    pr_data = {"pull_request_id": "pr-3", "pull_request_name": "Feature 3", "author_id": "f1"}
+    reviewers = client.post("/pullRequest/create", json=pr_data).json()["pr"]["assigned_reviewers"]
+
+    response = client.post(
+        "/pullRequest/reassign", json={"pull_request_id": "pr-3", "old_user_id": reviewers[0]}
+    )
+    new_reviewer = response.json()["replaced_by"]
+    client.post("/users/setIsActive", json={"user_id": new_reviewer, "is_active": False})
+
+    counts = {
+        stats["user_id"]: stats["assignments_count"]
+        for stats in client.get("/statistics").json()["user_review_stats"]
+    }
+    assert new_reviewer not in counts
+    assert sorted(counts[user_id] for user_id in ("f2", "f3", "f4") if user_id in counts) == [1, 1]
+    assert client.get("/statistics").json()["pr_stats"]["open_prs"] == 2
+
+
+@pytest.mark.postgres
+def test_rebuild_counters(client, db_session, portal, setup_team_and_prs):
+    """Тест пересчёта счётчиков статистики с нуля"""
+    expected = client.get("/statistics").json()
+
+    portal.call(db_session.execute, text("UPDATE reviewer_stats SET assignments_count = 100"))
+    portal.call(db_session.execute, text("UPDATE pr_counters SET open_prs = 100"))
+    assert client.get("/statistics").json() != expected
+
+    portal.call(StatisticsService.rebuild_counters, PostgresRepository(db_session))
+    assert client.get("/statistics").json() == expected
+
+
+@pytest.mark.postgres
+def test_open_review_counts(client, db_session, portal, setup_team_and_prs):
+    """Тест нагрузки ревьюверов: назначения только в открытых PR, пересчёт даёт то же"""
+
+    def open_review_counts():
+        result = portal.call(
+            db_session.execute, select(ReviewerStats.user_id, ReviewerStats.open_reviews_count)
+        )
+        return {user_id: count for user_id, count in result}
+
+    assert open_review_counts() == {"u1": 1, "u2": 0, "u3": 1}
+
+    portal.call(StatisticsService.rebuild_counters, PostgresRepository(db_session))
+    assert open_review_counts() == {"u1": 1, "u3": 1, "u2": 0}
+
+
+def test_memory_rebuild_counters():
+    """Тест хранилища в памяти: пересчёт даёт те же счётчики, что и пути записи"""
+    storage = MemoryStorage()
+    repo = MemoryRepository(storage)
+    team = TeamCreate.model_validate(
+        {
+            "team_name": "backend",
+            "members": [
+                {"user_id": f"u{index}", "username": f"User {index}", "is_active": True}
+                for index in range(1, 5)
+            ],
+        }
+    )
+
+    async def scenario():
+        await repo.create_team(team)
+        await repo.create_batch(
+            [
+                PullRequestCreate(
+                    pull_request_id=f"pr-{index}", pull_request_name="PR", author_id="u1"
+                )
+                for index in range(5)
+            ]
+        )
+        await repo.merge_pr("pr-0")
+        await repo.set_is_active("u2", False)
+        return await repo.statistics(StatisticsFilters())
+
+    expected = asyncio.run(scenario())
+    counts = {
+        user_id: counters.open_reviews_count for user_id, counters in storage.reviewer_stats.items()
+    }
+    asyncio.run(repo.rebuild_counters())
+    assert asyncio.run(repo.statistics(StatisticsFilters())) == expected
+    assert {
+        user_id: counters.open_reviews_count for user_id, counters in storage.reviewer_stats.items()
+    } == counts
+
+
+def test_get_statistics_filtered_by_status(client, setup_team_and_prs):
+    """Тест статистики по PR с фильтром по статусу"""
+    response = client.get("/statistics?status=OPEN")
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["pr_stats"] == {"total_prs": 1, "open_prs": 1, "merged_prs": 0}
+    assert data["filters"]["status"] == "OPEN"
+    counts = {stats["user_id"]: stats["assignments_count"] for stats in data["user_review_stats"]}
+    assert counts == {"u1": 1, "u3": 1}
+
+
+def test_get_statistics_filtered_by_team_and_window(client, setup_team_and_prs):
+    """Тест статистики по PR с фильтром по команде и временному окну"""
+    data = client.get("/statistics?team_name=backend").json()
+    assert data["pr_stats"] == {"total_prs": 2, "open_prs": 1, "merged_prs": 1}
+
+    data = client.get("/statistics?team_name=frontend").json()
+    assert data["pr_stats"] == {"total_prs": 0, "open_prs": 0, "merged_prs": 0}
+    assert data["user_review_stats"] == []
+
+    data = client.get("/statistics?merged_from=2000-01-01T00:00:00Z").json()
+    assert data["pr_stats"] == {"total_prs": 1, "open_prs": 0, "merged_prs": 1}
+
+    data = client.get("/statistics?created_to=2000-01-01T00:00:00Z").json()
+    assert data["pr_stats"]["total_prs"] == 0
+
+
+def test_get_statistics_naive_window_is_utc(client, setup_team_and_prs):
+    """Тест окна без часового пояса: считается UTC в любом хранилище"""
+    aware = client.get("/statistics?merged_from=2000-01-01T00:00:00Z").json()
+    naive = client.get("/statistics?merged_from=2000-01-01T00:00:00").json()
+    assert naive == aware
+    assert naive["filters"]["merged_from"] == "2000-01-01T00:00:00Z"
+
+
+def test_get_statistics_limit(client, setup_team_and_prs):
+    """Тест ограничения статистики топ-N ревьюверами"""
+    full = client.get("/statistics").json()["user_review_stats"]
+
+    for query in ("/statistics?limit=1", "/statistics?limit=1&status=MERGED"):
+        response = client.get(query)
+        assert response.status_code == 200
+        assert len(response.json()["user_review_stats"]) == 1
+
+    top = client.get("/statistics?limit=1").json()["user_review_stats"][0]
+    assert top["assignments_count"] == full[0]["assignments_count"]
+
+    assert client.get("/statistics?limit=0").status_code == 422
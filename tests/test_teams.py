@@ -1,3 +1,9 @@
+import json
+from typing import Any, Dict
+
+from app.core.config import settings
+
+
 def test_create_team_success(client):
     """Тест успешного создания команды"""
     team_data = {
@@ -73,3 +79,136 @@ def test_get_team_not_found(client):
     response = client.get("/team/get?team_name=nonexistent")
     assert response.status_code == 404
     assert response.json()["error"]["code"] == "NOT_FOUND"
+
+
+def _ndjson(*teams):
+    return "\n".join(json.dumps(team) for team in teams).encode()
+
+
+def test_import_teams(client, monkeypatch):
+    """Тест импорта команд из NDJSON с результатом по каждой строке"""
+    monkeypatch.setattr(settings, "TEAM_IMPORT_BATCH_SIZE", 2)
+    backend = {
+        "team_name": "backend",
+        "members": [
+            {"user_id": "u1", "username": "Alice", "is_active": True},
+            {"user_id": "u2", "username": "Bob", "is_active": True},
+        ],
+    }
+    frontend: Dict[str, Any] = {
+        "team_name": "frontend",
+        "members": [{"user_id": "u3", "username": "Charlie", "is_active": True}],
+    }
+    body = _ndjson(backend) + b"\n\n" + b'{"team_name": "broken"}\n' + _ndjson(frontend)
+    response = client.post(
+        "/team/import", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["teams"] == 2
+    assert data["users"] == 3
+    assert [(item["line"], item["team_name"], item["result"]) for item in data["results"]] == [
+        (1, "backend", "CREATED"),
+        (3, None, "INVALID"),
+        (4, "frontend", "CREATED"),
+    ]
+    assert data["results"][1]["error"] == "members: Field required"
+
+    # повторный импорт обновляет пользователей, u2 переходит в frontend
+    frontend["members"].append({"user_id": "u2", "username": "Robert", "is_active": False})
+    response = client.post(
+        "/team/import",
+        content=iter([_ndjson(backend, frontend)[:30], _ndjson(backend, frontend)[30:]]),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert [item["result"] for item in response.json()["results"]] == ["UPDATED", "UPDATED"]
+
+    members = client.get("/team/get", params={"team_name": "frontend"}).json()["members"]
+    assert sorted(
+        (member["user_id"], member["username"], member["is_active"]) for member in members
+    ) == [
+        ("u2", "Robert", False),
+        ("u3", "Charlie", True),
+    ]
+
+
+def test_import_teams_line_limit(client, monkeypatch):
+    """Тест импорта: строка длиннее TEAM_IMPORT_MAX_LINE_BYTES - INVALID, следующие разбираются"""
+    monkeypatch.setattr(settings, "TEAM_IMPORT_MAX_LINE_BYTES", 200)
+    backend = {
+        "team_name": "backend",
+        "members": [{"user_id": "u1", "username": "Alice", "is_active": True}],
+    }
+    huge = {"team_name": "huge", "members": [{"user_id": "u2", "username": "B" * 500}]}
+    body = _ndjson(huge, backend, huge)
+    # тело частями по 16 байт: длинная строка приходит во многих частях
+    chunks = [body[start : start + 16] for start in range(0, len(body), 16)]
+    response = client.post(
+        "/team/import", content=iter(chunks), headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(item["line"], item["result"]) for item in results] == [
+        (1, "INVALID"),
+        (2, "CREATED"),
+        (3, "INVALID"),
+    ]
+    assert results[0]["error"] == "line exceeds 200 bytes"
+
+
+def test_get_team_etag(client):
+    """Тест условного GET команды: 304 до изменения состава, новый ETag после"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "backend",
+            "members": [
+                {"user_id": "u1", "username": "Alice", "is_active": True},
+                {"user_id": "u2", "username": "Bob", "is_active": True},
+            ],
+        },
+    )
+    response = client.get("/team/get", params={"team_name": "backend"})
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        "/team/get", params={"team_name": "backend"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    client.post("/users/setIsActive", json={"user_id": "u2", "is_active": False})
+    response = client.get(
+        "/team/get", params={"team_name": "backend"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    etag = response.headers["ETag"]
+
+    # повторная деактивация не меняет состав и версию команды
+    client.post("/users/setIsActive", json={"user_id": "u2", "is_active": False})
+    client.post("/users/bulkDeactivate", json={"team_name": "backend", "user_ids": ["u2"]})
+    response = client.get(
+        "/team/get", params={"team_name": "backend"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    # переход участника в другую команду меняет версию прежней команды
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "frontend",
+            "members": [{"user_id": "u1", "username": "Alice", "is_active": True}],
+        },
+    )
+    response = client.get(
+        "/team/get", params={"team_name": "backend"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert [member["user_id"] for member in response.json()["members"]] == ["u2"]
+
+    response = client.get(
+        "/team/get", params={"team_name": "missing"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 404
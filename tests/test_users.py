@@ -1,5 +1,9 @@
+from datetime import datetime
+
 import pytest
 
+from app.services.user_service import encode_review_cursor
+
 
 @pytest.fixture
 def setup_team(client):
@@ -51,6 +55,23 @@ def test_get_user_reviews_success(client, setup_team):
     assert len(data["pull_requests"]) >= 0
 
 
+def test_get_user_reviews_lists_assigned_prs(client, setup_team):
+    """Тест получения PR, где пользователь назначен ревьювером"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Test PR", "author_id": "u1"}
+    create_response = client.post("/pullRequest/create", json=pr_data)
+    reviewers = create_response.json()["pr"]["assigned_reviewers"]
+    assert sorted(reviewers) == ["u2", "u3"]
+
+    for reviewer_id in reviewers:
+        response = client.get(f"/users/getReview?user_id={reviewer_id}")
+        assert response.status_code == 200
+        pull_requests = response.json()["pull_requests"]
+        assert [pr["pull_request_id"] for pr in pull_requests] == ["pr-1"]
+
+    response = client.get("/users/getReview?user_id=u1")
+    assert response.json()["pull_requests"] == []
+
+
 def test_get_user_reviews_not_found(client):
     """Тест получения PR для несуществующего пользователя"""
     response = client.get("/users/getReview?user_id=nonexistent")
@@ -67,6 +88,95 @@ def test_get_user_reviews_empty(client, setup_team):
     assert len(data["pull_requests"]) == 0
 
 
+def test_get_user_reviews_pagination(client, setup_team):
+    """Тест постраничного получения PR ревьювера с фильтром по статусу"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "reviews",
+            "members": [
+                {"user_id": "r1", "username": "Author", "is_active": True},
+                {"user_id": "r2", "username": "Reviewer", "is_active": True},
+            ],
+        },
+    )
+    pr_ids = [f"pr-{index:02d}" for index in range(5)]
+    for pr_id in pr_ids:
+        client.post(
+            "/pullRequest/create",
+            json={"pull_request_id": pr_id, "pull_request_name": "PR", "author_id": "r1"},
+        )
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-03"})
+
+    pages = []
+    params = {"user_id": "r2", "limit": 2}
+    while True:
+        response = client.get("/users/getReview", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        pages.append([pr["pull_request_id"] for pr in data["pull_requests"]])
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+    # PR созданы в одной транзакции теста, порядок определяет pull_request_id
+    assert pages == [["pr-04", "pr-03"], ["pr-02", "pr-01"], ["pr-00"]]
+
+    response = client.get("/users/getReview", params={"user_id": "r2", "status": "MERGED"})
+    assert [pr["pull_request_id"] for pr in response.json()["pull_requests"]] == ["pr-03"]
+    response = client.get(
+        "/users/getReview", params={"user_id": "r2", "status": "OPEN", "limit": 3}
+    )
+    data = response.json()
+    assert [pr["pull_request_id"] for pr in data["pull_requests"]] == ["pr-04", "pr-02", "pr-01"]
+    assert all(pr["status"] == "OPEN" for pr in data["pull_requests"])
+
+    response = client.get(
+        "/users/getReview",
+        params={"user_id": "r2", "status": "OPEN", "cursor": data["next_cursor"]},
+    )
+    assert [pr["pull_request_id"] for pr in response.json()["pull_requests"]] == ["pr-00"]
+    assert response.json()["next_cursor"] is None
+
+    response = client.get("/users/getReview", params={"user_id": "r2", "cursor": "garbage"})
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == "INVALID_CURSOR"
+
+    # курсор со временем без часового пояса - не из сервиса
+    naive = encode_review_cursor(datetime(2025, 1, 1), "pr-00")
+    response = client.get("/users/getReview", params={"user_id": "r2", "cursor": naive})
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == "INVALID_CURSOR"
+
+
+def test_get_user_reviews_etag(client, setup_team):
+    """Тест условного GET PR ревьювера: 304 до изменения его PR, новый ETag после"""
+    pr_data = {"pull_request_id": "pr-1", "pull_request_name": "Test PR", "author_id": "u1"}
+    client.post("/pullRequest/create", json=pr_data)
+
+    response = client.get("/users/getReview", params={"user_id": "u2"})
+    etag = response.headers["ETag"]
+    response = client.get(
+        "/users/getReview", params={"user_id": "u2"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    # другие параметры страницы - другой ETag
+    response = client.get(
+        "/users/getReview",
+        params={"user_id": "u2", "status": "OPEN"},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 200
+
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-1"})
+    response = client.get(
+        "/users/getReview", params={"user_id": "u2"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["pull_requests"][0]["status"] == "MERGED"
+    assert response.headers["ETag"] != etag
+
+
 def test_bulk_deactivate_success(client, setup_team):
     """Тест успешной массовой деактивации пользователей"""
     request_data = {"team_name": "backend", "user_ids": ["u2", "u3"]}
@@ -153,3 +263,47 @@ def test_bulk_deactivate_already_inactive(client, setup_team):
 
     assert len(data["deactivated_users"]) == 2
     assert all(user["is_active"] == False for user in data["deactivated_users"])
+
+
+def test_bulk_deactivate_replaces_all_reviewers(client):
+    """Тест: оба ревьювера PR заменяются разными активными участниками команды"""
+    team_data = {
+        "team_name": "platform",
+        "members": [
+            {"user_id": f"u{index}", "username": f"User{index}", "is_active": True}
+            for index in range(1, 7)
+        ],
+    }
+    client.post("/team/add", json=team_data)
+    reviewers_by_pr = {}
+    for index in range(3):
+        pr_data = {"pull_request_id": f"pr-{index}", "pull_request_name": "PR", "author_id": "u1"}
+        response = client.post("/pullRequest/create", json=pr_data)
+        reviewers_by_pr[f"pr-{index}"] = response.json()["pr"]["assigned_reviewers"]
+    deactivating_users = sorted(reviewers_by_pr["pr-0"])
+
+    request_data = {"team_name": "platform", "user_ids": deactivating_users}
+    response = client.post("/users/bulkDeactivate", json=request_data)
+    assert response.status_code == 200
+    expected_count = sum(
+        len(set(reviewers) & set(deactivating_users)) for reviewers in reviewers_by_pr.values()
+    )
+    assert response.json()["reassigned_prs"] == expected_count
+
+    active_candidates = {"u2", "u3", "u4", "u5", "u6"} - set(deactivating_users)
+    assignments: dict = {}
+    for user_id in ["u2", "u3", "u4", "u5", "u6"]:
+        response = client.get("/users/getReview", params={"user_id": user_id})
+        for pr in response.json()["pull_requests"]:
+            assignments.setdefault(pr["pull_request_id"], []).append(user_id)
+    for pr_id in reviewers_by_pr:
+        assert len(assignments[pr_id]) == 2
+        assert set(assignments[pr_id]) <= active_candidates
+
+    stats = client.get("/statistics").json()["user_review_stats"]
+    counts = {item["user_id"]: item["assignments_count"] for item in stats}
+    assert counts == {
+        user_id: len([pr_id for pr_id in assignments if user_id in assignments[pr_id]])
+        for user_id in active_candidates
+        if any(user_id in reviewers for reviewers in assignments.values())
+    }